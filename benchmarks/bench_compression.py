@@ -0,0 +1,130 @@
+"""
+Бенчмарк сжатия ответов NMservices: байты по сети и задержка.
+
+1. Для тела /orders/active заданного размера и каждой доступной кодировки
+   (identity / gzip / br / zstd) — размер, время сжатия на сервере,
+   распаковки на клиенте и оценка задержки на канале с заданными
+   пропускной способностью и RTT: rtt + передача + сжатие + распаковка.
+2. Сквозной прогон RemoteApiClient против локального stand-in'а со
+   сжатием и без: фактические байты по сети (на localhost задержку
+   определяет CPU, а не канал).
+
+Запуск:
+    python benchmarks/bench_compression.py --orders 2000 --bandwidth-mbps 10 --rtt-ms 60
+"""
+
+import argparse
+import asyncio
+import gzip
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+from aiohttp.test_utils import TestServer
+
+from bench_json_codec import make_payload
+from nomus.devtools.nmservices_standin import StandInState, build_app
+from nomus.infrastructure.services.compression import compress, encoding_available
+from nomus.infrastructure.services.remote_api_client import RemoteApiClient, RemoteApiConfig
+
+
+def _decompressor(encoding: str) -> Callable[[bytes], bytes]:
+    if encoding == "gzip":
+        return gzip.decompress
+    if encoding == "br":
+        try:
+            import brotli
+        except ImportError:
+            import brotlicffi as brotli
+        return brotli.decompress
+    if encoding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress
+    return lambda data: data
+
+
+def _median_time(fn: Callable[[], object], repeat: int) -> float:
+    fn()  # прогрев
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def offline(payload: bytes, level: int, repeat: int, bandwidth_mbps: float, rtt_ms: float) -> None:
+    bytes_per_second = bandwidth_mbps * 1_000_000 / 8
+    print(
+        f"/orders/active: {len(payload) / 1024:.0f} KiB, level={level}, "
+        f"link {bandwidth_mbps:g} Mbit/s, RTT {rtt_ms:g} ms"
+    )
+    print(
+        f"{'encoding':<10}{'KiB':>10}{'ratio':>8}{'compress ms':>14}"
+        f"{'decompress ms':>16}{'latency ms':>13}{'saved ms':>11}"
+    )
+    baseline: Optional[float] = None
+    for encoding in ("identity", "gzip", "br", "zstd"):
+        if encoding != "identity" and not encoding_available(encoding):
+            print(f"{encoding:<10}  not installed (pip install nomus[compression])")
+            continue
+        if encoding == "identity":
+            body, compress_time = payload, 0.0
+        else:
+            body = compress(payload, encoding, level)
+            compress_time = _median_time(lambda: compress(payload, encoding, level), repeat)
+        decompress = _decompressor(encoding)
+        assert decompress(body) == payload
+        decompress_time = _median_time(lambda: decompress(body), repeat)
+        latency = rtt_ms / 1000 + len(body) / bytes_per_second + compress_time + decompress_time
+        baseline = baseline if baseline is not None else latency
+        print(
+            f"{encoding:<10}{len(body) / 1024:>10.1f}{len(body) / len(payload):>8.3f}"
+            f"{compress_time * 1000:>14.2f}{decompress_time * 1000:>16.2f}"
+            f"{latency * 1000:>13.1f}{(baseline - latency) * 1000:>11.1f}"
+        )
+
+
+async def end_to_end(orders: int, requests: int) -> None:
+    state = StandInState.seeded(users=1, orders_per_user=orders)
+    print(f"\nRemoteApiClient ↔ stand-in (localhost), {requests} x GET /orders/active")
+    print(f"{'server':<20}{'wire KiB/req':>14}{'decoded KiB/req':>17}{'median ms':>12}")
+    for label, min_size in (("uncompressed", None), ("compressed ≥1KiB", 1024)):
+        server = TestServer(build_app(state, compress_min_size=min_size), host="127.0.0.1")
+        await server.start_server()
+        try:
+            config = RemoteApiConfig(base_url=str(server.make_url("")), api_key="bench")
+            config.single_flight = False
+            async with RemoteApiClient(config) as client:
+                samples: List[float] = []
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    await client.get("/orders/active", {"telegram_id": 1})
+                    samples.append(time.perf_counter() - started)
+                stats: Dict = client.stats()["compression"]
+        finally:
+            await server.close()
+        print(
+            f"{label:<20}{stats['wire_bytes'] / requests / 1024:>14.1f}"
+            f"{stats['decoded_bytes'] / requests / 1024:>17.1f}"
+            f"{statistics.median(samples) * 1000:>12.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--level", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--bandwidth-mbps", type=float, default=10.0)
+    parser.add_argument("--rtt-ms", type=float, default=60.0)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    offline(make_payload(args.orders), args.level, args.repeat, args.bandwidth_mbps, args.rtt_ms)
+    asyncio.run(end_to_end(args.orders, args.requests))
+
+
+if __name__ == "__main__":
+    main()
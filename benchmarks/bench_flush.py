@@ -0,0 +1,88 @@
+"""
+Бенчмарк RemoteStorage.flush против локального stand-in'а NMservices.
+
+Помечает --records пользователей dirty и измеряет записи в секунду для
+режимов синхронизации:
+- sequential — по одной записи, flush_concurrency=1 (как было изначально);
+- parallel   — по одной записи, flush_concurrency=--concurrency;
+- bulk       — пачками через /users/bulk (--batch записей в пачке).
+
+Задержка stand-in'а (--latency distribution:p50:p99) имитирует RTT до
+NMservices: без нее на localhost все режимы упираются в CPU.
+
+Запуск:
+    python benchmarks/bench_flush.py --records 2000 --latency fixed:0.02
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Optional
+
+from aiohttp.test_utils import TestServer
+
+from nomus.devtools.fault_injection import FaultInjector, FaultProfile, LatencyProfile
+from nomus.devtools.nmservices_standin import StandInState, build_app
+from nomus.infrastructure.database.bulk_sync import BulkSyncConfig
+from nomus.infrastructure.database.remote_storage import RemoteStorage, RemoteStorageConfig
+from nomus.infrastructure.database.write_behind import WriteBehindConfig
+from nomus.infrastructure.services.remote_api_client import RemoteApiClient, RemoteApiConfig
+
+
+async def measure(
+    records: int, concurrency: int, batch: Optional[int], latency: Optional[str]
+) -> float:
+    state = StandInState.seeded(users=0)
+    profile = FaultProfile(latency=LatencyProfile.parse(latency) if latency else LatencyProfile())
+    server = TestServer(build_app(state, faults=FaultInjector([profile])), host="127.0.0.1")
+    await server.start_server()
+    try:
+        config = RemoteApiConfig(base_url=str(server.make_url("")), api_key="bench")
+        async with RemoteApiClient(config) as client:
+            storage = RemoteStorage(
+                client,
+                RemoteStorageConfig(
+                    write_behind=WriteBehindConfig(enabled=False),
+                    flush_concurrency=concurrency,
+                    bulk=BulkSyncConfig(enabled=batch is not None, max_records=batch or 1),
+                ),
+            )
+            for telegram_id in range(1, records + 1):
+                await storage.save_or_update_user(
+                    telegram_id,
+                    {"telegram_id": telegram_id, "phone_number": f"+99890{telegram_id:07d}"},
+                )
+            started = time.perf_counter()
+            await storage.flush()
+            elapsed = time.perf_counter() - started
+            assert storage.dirty_count() == 0, storage.stats()
+    finally:
+        await server.close()
+    assert len(state.users) == records
+    return records / elapsed
+
+
+async def run(args: argparse.Namespace) -> None:
+    print(f"{args.records} dirty users, latency={args.latency or 'none'}")
+    print(f"{'mode':<12}{'concurrency':>12}{'batch':>8}{'records/s':>12}")
+    modes = (
+        ("sequential", 1, None),
+        ("parallel", args.concurrency, None),
+        ("bulk", args.concurrency, args.batch),
+    )
+    for label, concurrency, batch in modes:
+        rate = await measure(args.records, concurrency, batch, args.latency)
+        print(f"{label:<12}{concurrency:>12}{batch or '-':>8}{rate:>12.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--latency", default="fixed:0.02", help="distribution:p50[:p99], секунды")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
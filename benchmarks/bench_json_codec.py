@@ -0,0 +1,122 @@
+"""
+Бенчмарк разбора больших ответов GET /orders/active.
+
+Сравнивает текущий путь (response.json() в dict + обращения через .get(),
+как в show_my_orders) с типизированным разбором через JsonCodec для каждого
+установленного бэкенда (stdlib / orjson / msgspec).
+
+Запуск:
+    python benchmarks/bench_json_codec.py --orders 5000 --repeat 30
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from nomus.presentation.bot.handlers.my_order import _format_price
+from nomus.domain.entities.order import ActiveOrderList
+from nomus.infrastructure.services.json_codec import (
+    CODEC_PREFERENCE,
+    codec_available,
+    select_codec,
+)
+
+_STATUSES = ["pending", "confirmed", "in_progress"]
+_SERVICES = ["Классический массаж", "Спортивный массаж", "Расслабляющий массаж"]
+
+
+def make_payload(orders: int, seed: int = 42) -> bytes:
+    """Тело ответа /orders/active с заданным количеством заказов."""
+    rnd = random.Random(seed)
+    body = {
+        "orders": [
+            {
+                "order_id": 100_000 + i,
+                "status": rnd.choice(_STATUSES),
+                "service_name": rnd.choice(_SERVICES),
+                "total_amount": f"{rnd.randrange(50, 500) * 1000}.00",
+                "address_text": f"Ташкент, ул. Навои, д. {rnd.randrange(1, 200)}, кв. {i}",
+                "created_at": "2026-01-15T10:30:00Z",
+            }
+            for i in range(orders)
+        ]
+    }
+    return json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+
+def _consume_dicts(orders: List[Dict[str, Any]]) -> int:
+    """Тот же набор обращений, что делает show_my_orders."""
+    total = 0
+    for order in orders:
+        total += len(order.get("status", ""))
+        total += order.get("order_id", 0)
+        total += len(order.get("service_name") or "—")
+        total += len(_format_price(order.get("total_amount")))
+        total += len(order.get("address_text") or "—")
+    return total
+
+
+def _consume_typed(orders: list) -> int:
+    total = 0
+    for order in orders:
+        total += len(order.status)
+        total += order.order_id
+        total += len(order.service_name or "—")
+        total += len(_format_price(order.total_amount))
+        total += len(order.address_text or "—")
+    return total
+
+
+def _measure(fn: Callable[[], int], repeat: int) -> List[float]:
+    fn()  # прогрев
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    payload = make_payload(args.orders)
+    request = httpx.Request("GET", "http://nmservices.test/orders/active")
+
+    def current_path() -> int:
+        response = httpx.Response(200, content=payload, request=request)
+        return _consume_dicts(response.json().get("orders", []))
+
+    cases: Dict[str, Callable[[], int]] = {"response.json() + dict.get": current_path}
+    for name in CODEC_PREFERENCE:
+        if not codec_available(name):
+            continue
+        codec = select_codec(name)
+        cases[f"{name} dict"] = (
+            lambda codec=codec: _consume_dicts(codec.decode(payload).get("orders", []))
+        )
+        cases[f"{name} typed"] = (
+            lambda codec=codec: _consume_typed(codec.decode(payload, ActiveOrderList).orders)
+        )
+
+    print(f"/orders/active: {args.orders} orders, {len(payload) / 1024:.0f} KiB, repeat={args.repeat}")
+    print(f"{'path':<32}{'median ms':>12}{'p95 ms':>12}{'speedup':>10}")
+    baseline = None
+    for name, fn in cases.items():
+        samples = sorted(_measure(fn, args.repeat))
+        median = statistics.median(samples)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        baseline = baseline or median
+        print(f"{name:<32}{median * 1000:>12.2f}{p95 * 1000:>12.2f}{baseline / median:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Нагрузочный бенчмарк бота против локального stand-in'а NMservices.
+
+Виртуальные пользователи выполняют сценарий бота через OrderService и
+RemoteApiClient: загрузка профиля, каталог услуг, активные заказы,
+уведомления и (с вероятностью --order-ratio) создание заказа с платежом.
+Задержки и сбои stand-in'а задаются как у самого stand-in'а
+(--latency distribution:p50:p99, --error-rate, --rate-limit); seed фиксирован,
+поэтому прогоны воспроизводимы.
+
+Выводит пропускную способность сценариев, задержку сценария (p50/p95/p99)
+и метрики RemoteApiClient.stats().
+
+По умолчанию stand-in запускается в том же процессе и делит с ботом одно
+ядро CPU. Для замеров пропускной способности запустите его отдельно
+(python -m nomus.devtools.nmservices_standin ...) и передайте --base-url.
+
+Запуск:
+    python benchmarks/bench_standin_load.py --users 200 --duration 10 \\
+        --latency lognormal:0.02:0.2 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict
+
+from aiohttp.test_utils import TestServer
+
+from nomus.application.services.order_service import OrderService
+from nomus.devtools.fault_injection import FaultInjector, FaultProfile, LatencyProfile
+from nomus.devtools.nmservices_standin import StandInState, build_app
+from nomus.infrastructure.services.metrics import LatencyWindow
+from nomus.infrastructure.services.remote_api_client import RemoteApiClient, RemoteApiConfig
+
+
+async def _virtual_user(
+    telegram_id: int,
+    client: RemoteApiClient,
+    orders: OrderService,
+    order_ratio: float,
+    stop_at: float,
+    latency: LatencyWindow,
+    outcomes: Dict[str, int],
+    rnd: random.Random,
+) -> None:
+    while time.monotonic() < stop_at:
+        started = time.monotonic()
+        try:
+            user = await client.get(f"/users/by-telegram/{telegram_id}")
+            services = await orders.get_services()
+            await orders.get_active_orders(telegram_id)
+            await orders.get_pending_notifications(telegram_id)
+            if services and rnd.random() < order_ratio:
+                created = await orders.create_order(user["id"], services[0].id, "Ташкент")
+                if created is None:
+                    raise RuntimeError("order failed")
+                await orders.initiate_payment(created["order_id"])
+        except Exception as e:
+            outcomes[type(e).__name__] = outcomes.get(type(e).__name__, 0) + 1
+        else:
+            outcomes["ok"] = outcomes.get("ok", 0) + 1
+        latency.add(time.monotonic() - started)
+
+
+async def run(args: argparse.Namespace) -> None:
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        state = StandInState.seeded(users=args.users, seed=args.seed)
+        profile = FaultProfile(
+            latency=LatencyProfile.parse(args.latency) if args.latency else LatencyProfile(),
+            error_rate=args.error_rate,
+            rate_limit=args.rate_limit,
+        )
+        server = TestServer(
+            build_app(state, faults=FaultInjector([profile], seed=args.seed)), host="127.0.0.1"
+        )
+        await server.start_server()
+        base_url = str(server.make_url(""))
+    latency = LatencyWindow(size=1_000_000)
+    outcomes: Dict[str, int] = {}
+    try:
+        config = RemoteApiConfig(
+            base_url=base_url,
+            api_key="bench",
+            timeout=args.timeout,
+            retry_delay=0.05,
+        )
+        async with RemoteApiClient(config) as client:
+            orders = OrderService(None, None, api_client=client)
+            stop_at = time.monotonic() + args.duration
+            started = time.monotonic()
+            await asyncio.gather(
+                *(
+                    _virtual_user(
+                        telegram_id,
+                        client,
+                        orders,
+                        args.order_ratio,
+                        stop_at,
+                        latency,
+                        outcomes,
+                        random.Random(args.seed + telegram_id),
+                    )
+                    for telegram_id in range(1, args.users + 1)
+                )
+            )
+            elapsed = time.monotonic() - started
+            stats = client.stats()
+    finally:
+        if server is not None:
+            await server.close()
+
+    print(
+        f"{args.users} users, {elapsed:.1f}s, latency={args.latency or 'none'}, "
+        f"error_rate={args.error_rate}, rate_limit={args.rate_limit or 'none'}"
+    )
+    print(f"scenarios/s: {latency.count / elapsed:.1f}   outcomes: {outcomes}")
+    print(f"scenario latency: {latency.snapshot()}")
+    if args.verbose:
+        print(json.dumps(stats, indent=2, ensure_ascii=False, default=str))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default=None, help="внешний stand-in (--users ≤ его --users)")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--order-ratio", type=float, default=0.1)
+    parser.add_argument("--latency", default=None, help="distribution:p50[:p99], секунды")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="печатать RemoteApiClient.stats()")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
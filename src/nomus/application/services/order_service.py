@@ -1,37 +1,53 @@
 import logging
+from decimal import Decimal
 from typing import Any, Optional
 
+from nomus.common.deadline import current_deadline
+from nomus.common.idempotency import new_idempotency_key
+from nomus.domain.entities.order import (
+    ActiveOrder,
+    ActiveOrderList,
+    OrderNotification,
+    PendingNotifications,
+)
+from nomus.domain.entities.service import Service, ServiceCatalog
 from nomus.domain.interfaces.repo_interface import IOrderRepository, IUserRepository
 from nomus.domain.interfaces.payment_interface import IPaymentService
 
 log: logging.Logger = logging.getLogger(__name__)
 
+
+def _deadline_expired(operation: str) -> bool:
+    """Проверяет, исчерпан ли бюджет времени текущего update."""
+    deadline = current_deadline()
+    if deadline is not None and deadline.expired:
+        log.warning("Update deadline exceeded, skipping %s", operation)
+        return True
+    return False
+
 # Заглушка каталога услуг для локальной разработки (stub-режим без remote API)
-_STUB_SERVICES: list[dict[str, Any]] = [
-    {
-        "id": 1,
-        "name": "Классический массаж",
-        "description": "Общий классический массаж тела",
-        "base_price": "150000.00",
-        "duration_minutes": 60,
-        "is_active": True,
-    },
-    {
-        "id": 2,
-        "name": "Спортивный массаж",
-        "description": "Массаж для восстановления после нагрузок",
-        "base_price": "200000.00",
-        "duration_minutes": 90,
-        "is_active": True,
-    },
-    {
-        "id": 3,
-        "name": "Расслабляющий массаж",
-        "description": "Лёгкий расслабляющий массаж",
-        "base_price": "120000.00",
-        "duration_minutes": 45,
-        "is_active": True,
-    },
+_STUB_SERVICES: list[Service] = [
+    Service(
+        id=1,
+        name="Классический массаж",
+        description="Общий классический массаж тела",
+        base_price=Decimal("150000.00"),
+        duration_minutes=60,
+    ),
+    Service(
+        id=2,
+        name="Спортивный массаж",
+        description="Массаж для восстановления после нагрузок",
+        base_price=Decimal("200000.00"),
+        duration_minutes=90,
+    ),
+    Service(
+        id=3,
+        name="Расслабляющий массаж",
+        description="Лёгкий расслабляющий массаж",
+        base_price=Decimal("120000.00"),
+        duration_minutes=45,
+    ),
 ]
 
 
@@ -48,7 +64,7 @@ class OrderService:
         self.user_repo: Optional[IUserRepository] = user_repo
         self.api_client = api_client  # RemoteApiClient для прямых вызовов API
 
-    async def get_services(self) -> list[dict[str, Any]]:
+    async def get_services(self) -> list[Service]:
         """
         Получает список активных услуг.
 
@@ -56,10 +72,13 @@ class OrderService:
         В stub-режиме — возвращает захардкоженный каталог.
         """
         if self.api_client:
+            if _deadline_expired("get_services"):
+                return []
             try:
-                response = await self.api_client.get("/services")
-                services = response.get("services", [])
-                return [s for s in services if s.get("is_active", True)]
+                catalog = await self.api_client.get(
+                    "/services", response_type=ServiceCatalog
+                )
+                return [s for s in catalog.services if s.is_active]
             except Exception as e:
                 log.error("Failed to fetch services from API: %s", e)
                 return []
@@ -84,6 +103,7 @@ class OrderService:
         server_user_id: int,
         service_id: int,
         address_text: str,
+        idempotency_key: Optional[str] = None,
     ) -> Optional[dict[str, Any]]:
         """
         Создаёт заказ через API.
@@ -92,12 +112,16 @@ class OrderService:
             server_user_id: ID пользователя на сервере NMservices
             service_id: ID выбранной услуги
             address_text: Текстовый адрес
+            idempotency_key: Ключ операции; повторный вызов с тем же ключом
+                не создаёт второй заказ. По умолчанию генерируется новый.
 
         Returns:
             Ответ API {"status": "ok", "order_id": ..., "message": ...}
             или None при ошибке
         """
         if self.api_client:
+            if _deadline_expired("create_order"):
+                return None
             try:
                 response = await self.api_client.post(
                     "/orders",
@@ -106,6 +130,7 @@ class OrderService:
                         "service_id": service_id,
                         "address_text": address_text,
                     },
+                    idempotency_key=idempotency_key or new_idempotency_key(),
                 )
                 if response.get("status") == "ok":
                     log.info(
@@ -132,22 +157,28 @@ class OrderService:
 
     # ─── Payment ──────────────────────────────────────────────────────
 
-    async def initiate_payment(self, order_id: int) -> Optional[dict[str, Any]]:
+    async def initiate_payment(
+        self, order_id: int, idempotency_key: Optional[str] = None
+    ) -> Optional[dict[str, Any]]:
         """
         Инициирует платёж для заказа через API.
 
         Args:
             order_id: ID заказа на сервере NMservices
+            idempotency_key: Ключ операции; по умолчанию генерируется новый
 
         Returns:
             {"status": "ok", "payment_id": ..., "payment_url": ...}
             или None при ошибке
         """
         if self.api_client:
+            if _deadline_expired("initiate_payment"):
+                return None
             try:
                 response = await self.api_client.post(
                     "/payment/initiate",
                     {"order_id": order_id},
+                    idempotency_key=idempotency_key or new_idempotency_key(),
                 )
                 if response.get("status") == "ok":
                     log.info(
@@ -173,21 +204,22 @@ class OrderService:
 
     async def get_active_orders(
         self, telegram_id: int
-    ) -> list[dict[str, Any]]:
+    ) -> list[ActiveOrder]:
         """
         Получает список активных заказов пользователя (pending/confirmed/in_progress).
 
         Returns:
             Список данных заказов (может быть пустым)
         """
-        if not self.api_client:
+        if not self.api_client or _deadline_expired("get_active_orders"):
             return []
         try:
             response = await self.api_client.get(
                 "/orders/active",
                 params={"telegram_id": telegram_id},
+                response_type=ActiveOrderList,
             )
-            return response.get("orders", [])
+            return response.orders
         except Exception as e:
             log.error("Failed to fetch active orders: %s", e)
             return []
@@ -196,20 +228,21 @@ class OrderService:
 
     async def get_pending_notifications(
         self, telegram_id: int
-    ) -> list[dict[str, Any]]:
+    ) -> list[OrderNotification]:
         """
         Получает непрочитанные уведомления об изменении статуса заказов.
 
         Вызывается при каждом взаимодействии пользователя с ботом.
         """
-        if not self.api_client:
+        if not self.api_client or _deadline_expired("get_pending_notifications"):
             return []
         try:
             response = await self.api_client.get(
                 "/orders/pending-notifications",
                 params={"telegram_id": telegram_id},
+                response_type=PendingNotifications,
             )
-            return response.get("notifications", [])
+            return response.notifications
         except Exception as e:
             log.error("Failed to fetch pending notifications: %s", e)
             return []
@@ -222,6 +255,8 @@ class OrderService:
         """
         if not self.api_client or not order_ids:
             return
+        if _deadline_expired("ack_notifications"):
+            return
         try:
             await self.api_client.post(
                 "/orders/notifications/ack",
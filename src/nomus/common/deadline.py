@@ -0,0 +1,74 @@
+"""
+Бюджет времени (deadline) на обработку одного update.
+
+Deadline хранится в contextvar, поэтому доступен всем слоям, которые
+выполняются в контексте обработки update: OrderService, RemoteApiClient
+и т.д. Задачи, созданные через asyncio.create_task, наследуют его.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """Момент (по time.monotonic), к которому работа должна быть завершена."""
+
+    expires_at: float
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        """Deadline через `seconds` секунд от текущего момента."""
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        """Оставшееся время в секундах (не меньше нуля)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "nomus_deadline", default=None
+)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline текущего контекста или None, если бюджет не задан."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[Deadline]:
+    """
+    Задает deadline для кода внутри блока.
+
+    Вложенный scope не может продлить внешний бюджет — берется
+    более ранний из двух deadline.
+    """
+    deadline = Deadline.after(seconds)
+    outer = _current_deadline.get()
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def detached_context() -> contextvars.Context:
+    """
+    Копия текущего контекста без deadline.
+
+    Для фоновых задач, которые не должны ограничиваться бюджетом
+    запроса, запустившего их: loop.create_task(coro, context=detached_context()).
+    """
+    ctx = contextvars.copy_context()
+    ctx.run(_current_deadline.set, None)
+    return ctx
@@ -0,0 +1,8 @@
+"""Ключи идемпотентности логических операций (создание заказа, платёж)."""
+
+import uuid
+
+
+def new_idempotency_key() -> str:
+    """Новый ключ для логической операции."""
+    return uuid.uuid4().hex
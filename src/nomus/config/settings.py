@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Any, Dict, Type, Tuple, Literal, Optional, Final
+from typing import Any, Dict, List, Type, Tuple, Literal, Optional, Final
 import os
 import re
 import yaml
@@ -33,6 +33,132 @@ class ServiceConfig(BaseModel):
     test_mode: bool = True
 
 
+class RemoteApiPoolSettings(BaseModel):
+    """Пул HTTP-соединений к NMservices"""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0  # секунды простоя до закрытия keep-alive соединения
+    pool_timeout: float = 5.0  # ожидание свободного соединения в пуле
+    http2: bool = False  # требует пакет h2 (pip install "httpx[http2]")
+    warmup_connections: int = 0  # сколько соединений открыть при старте бота
+
+
+class RemoteApiCircuitBreakerSettings(BaseModel):
+    """Circuit breaker для эндпоинтов NMservices"""
+
+    enabled: bool = True
+    failure_threshold: int = 5  # подряд идущих сбоев до открытия
+    recovery_timeout: float = 30.0  # секунды в open до пробного запроса
+    half_open_max_calls: int = 1
+
+
+class RemoteApiCacheRuleSettings(BaseModel):
+    """Правило кеширования ответов GET"""
+
+    pattern: str  # шаблон пути (fnmatch), например "/users/by-telegram/*"
+    ttl: float  # секунды, пока ответ считается свежим
+    stale_while_revalidate: float = 0.0  # секунды отдачи устаревшего ответа с фоновым обновлением
+
+
+class RemoteApiCacheSettings(BaseModel):
+    """Кеш ответов GET-запросов к NMservices (opt-in)"""
+
+    enabled: bool = False
+    max_entries: int = 1000
+    rules: List[RemoteApiCacheRuleSettings] = []
+
+
+class RemoteApiBulkheadClassSettings(BaseModel):
+    """Класс запросов bulkhead'а"""
+
+    max_concurrent: int
+    priority: int = 1  # меньше — важнее при ожидании общего слота
+    max_queue: int = 0  # 0 — очередь не ограничена
+
+
+class RemoteApiBulkheadRouteSettings(BaseModel):
+    """Отнесение запросов к классу bulkhead'а"""
+
+    method: str = "*"
+    pattern: str  # шаблон пути (fnmatch)
+    bulkhead: str
+
+
+class RemoteApiBulkheadSettings(BaseModel):
+    """Bulkhead'ы и приоритеты запросов к NMservices"""
+
+    enabled: bool = True
+    max_concurrent: int = 0  # общий лимит; 0 — равен pool.max_connections
+    default_class: str = "interactive"
+    # Пустые значения — встроенные классы critical / interactive / background
+    classes: Dict[str, RemoteApiBulkheadClassSettings] = {}
+    routes: List[RemoteApiBulkheadRouteSettings] = []
+
+
+class RemoteApiBatchingSettings(BaseModel):
+    """Micro-batching одиночных GET по telegram_id в bulk-запросы"""
+
+    enabled: bool = False
+    window: float = 0.01  # окно сбора пачки, секунды
+    max_batch: int = 100  # пачка отправляется сразу при достижении размера
+    endpoints: List[str] = ["/orders/active", "/orders/pending-notifications"]
+
+
+class RemoteApiAdaptiveLimitSettings(BaseModel):
+    """Адаптивный (AIMD) лимит одновременных запросов и ограничение частоты"""
+
+    enabled: bool = False
+    initial_limit: int = 20
+    min_limit: int = 2
+    max_limit: int = 200
+    increase: float = 1.0  # прирост лимита за «окно» успешных ответов
+    backoff_ratio: float = 0.7  # множитель лимита при перегрузке
+    latency_threshold: float = 1.0  # секунды; медленнее — сигнал перегрузки (0 — только ошибки)
+    rate_limit: float = 0.0  # запросов в секунду; 0 — без ограничения
+    burst: int = 0  # допустимый всплеск; 0 — равен rate_limit
+
+
+class RemoteApiHedgingSettings(BaseModel):
+    """Hedged-запросы для идемпотентных GET"""
+
+    enabled: bool = False
+    percentile: float = 95.0  # hedge, если ответа нет дольше этого перцентиля задержек
+    min_delay: float = 0.02  # секунды
+    min_samples: int = 20
+    max_hedge_ratio: float = 0.1  # не больше 10% дополнительных запросов
+    max_budget: float = 10.0
+    endpoints: List[str] = ["/users/by-telegram/*", "/services", "/services/*"]
+
+
+class RemoteApiIdempotencySettings(BaseModel):
+    """Ключи идемпотентности для POST (создание заказа, платёж)"""
+
+    header: str = "Idempotency-Key"
+    cache_ttl: float = 600.0  # сколько помнить ответы завершенных операций, секунды
+    max_entries: int = 1000
+
+
+class RemoteApiThrottleSettings(BaseModel):
+    """Повторы после 429/503 с учетом Retry-After"""
+
+    enabled: bool = True
+    statuses: List[int] = [429, 503]
+    max_retry_after: float = 30.0  # секунды; более длинная пауза — сразу ошибка
+
+
+class RemoteApiCompressionSettings(BaseModel):
+    """Сжатие ответов и тел bulk-запросов"""
+
+    enabled: bool = True
+    # br и zstd используются, только если установлены brotli и zstandard (extra compression)
+    accept_encodings: List[str] = ["zstd", "br", "gzip"]
+    request_encoding: Optional[Literal["gzip", "br", "zstd"]] = None  # None — не сжимать запросы
+    request_level: int = 5
+    request_min_size: int = 4096  # байты
+    request_endpoints: List[str] = ["/users/bulk", "/orders/bulk"]
+
+
 class RemoteApiSettings(BaseModel):
     """Конфигурация удаленного API (NMservices)"""
 
@@ -41,7 +167,98 @@ class RemoteApiSettings(BaseModel):
     api_key: str = ""
     timeout: float = 30.0
     max_retries: int = 3
-    retry_delay: float = 1.0
+    retry_delay: float = 1.0  # база экспоненциальной задержки между retry
+    retry_max_delay: float = 10.0  # верхняя граница задержки между retry
+    pool: RemoteApiPoolSettings = RemoteApiPoolSettings()
+    single_flight: bool = True  # объединять одинаковые одновременные GET-запросы
+    circuit_breaker: RemoteApiCircuitBreakerSettings = RemoteApiCircuitBreakerSettings()
+    cache: RemoteApiCacheSettings = RemoteApiCacheSettings()
+    bulkheads: RemoteApiBulkheadSettings = RemoteApiBulkheadSettings()
+    # JSON-кодек: auto выбирает msgspec, затем orjson, затем stdlib
+    json_codec: Literal["auto", "msgspec", "orjson", "stdlib"] = "auto"
+    batching: RemoteApiBatchingSettings = RemoteApiBatchingSettings()
+    adaptive_limit: RemoteApiAdaptiveLimitSettings = RemoteApiAdaptiveLimitSettings()
+    hedging: RemoteApiHedgingSettings = RemoteApiHedgingSettings()
+    idempotency: RemoteApiIdempotencySettings = RemoteApiIdempotencySettings()
+    throttle: RemoteApiThrottleSettings = RemoteApiThrottleSettings()
+    compression: RemoteApiCompressionSettings = RemoteApiCompressionSettings()
+
+
+class RemoteStorageWriteBehindSettings(BaseModel):
+    """Фоновая синхронизация изменений RemoteStorage с NMservices"""
+
+    enabled: bool = True
+    interval: float = 5.0  # секунды между flush'ами
+    max_dirty: int = 100  # flush раньше интервала, если изменений больше
+    shutdown_timeout: float = 30.0  # сколько ждать финальный flush при остановке
+
+
+class RemoteStorageBulkSettings(BaseModel):
+    """Синхронизация пачками через /users/bulk и /orders/bulk"""
+
+    enabled: bool = True
+    max_records: int = 500  # записей в одной пачке
+    max_bytes: int = 524288  # размер JSON-тела пачки
+    capabilities_endpoint: str = "/capabilities"
+    capabilities_ttl: float = 300.0  # секунды; потом поддержка bulk проверяется заново
+
+
+class RemoteStorageJournalSettings(BaseModel):
+    """Журнал изменений RemoteStorage на диске (переживает перезапуск до flush)"""
+
+    enabled: bool = False
+    path: str = "data/remote_storage.wal"
+    fsync: bool = True  # False — быстрее, но не переживает сбой ОС
+    commit_delay: float = 0.0  # секунды; подождать попутные изменения перед fsync
+
+
+class RemoteStorageUserCacheSettings(BaseModel):
+    """Ограничение локального кеша пользователей (LRU + время простоя)"""
+
+    max_users: int = 10000  # 0 — без ограничения
+    idle_ttl: float = 3600.0  # секунды без обращений; 0 — без TTL
+    negative_ttl: float = 30.0  # сколько помнить 404 по telegram_id; 0 — не помнить
+    max_negative: int = 10000
+    max_versions: int = 100000  # сколько версий записей помнить для инвалидации
+
+
+class RemoteStorageWarmupSettings(BaseModel):
+    """Прогрев кеша активными пользователями при старте"""
+
+    enabled: bool = False
+    endpoint: str = "/users/active"
+    active_within: float = 604800.0  # секунды; кого считать активным
+    page_size: int = 500
+    max_users: int = 0  # 0 — сколько помещается в кеш (user_cache.max_users)
+    ready_percent: float = 0.0  # старт ждет этот процент прогрева; 0 — не ждать
+    ready_timeout: float = 30.0  # секунды
+    page_retries: int = 3
+    retry_delay: float = 1.0  # секунды между повторами страницы
+
+
+class RemoteStorageCoherenceSettings(BaseModel):
+    """Шина согласованности кешей между репликами бота"""
+
+    enabled: bool = False
+    backend: str = "memory"  # memory | redis
+    url: str = "redis://127.0.0.1:6379/0"  # для backend=redis
+    channel: str = "nomus:cache"
+    batch_interval: float = 0.05  # секунды; копить события перед публикацией
+    max_batch: int = 500  # событий в одном сообщении
+    reconnect_delay: float = 1.0  # секунды между попытками переподключения
+
+
+class RemoteStorageSettings(BaseModel):
+    """Конфигурация RemoteStorage (локальный кеш + синхронизация с NMservices)"""
+
+    write_behind: RemoteStorageWriteBehindSettings = RemoteStorageWriteBehindSettings()
+    # Сколько записей синхронизировать параллельно; 0 — по числу keep-alive соединений пула
+    flush_concurrency: int = 0
+    bulk: RemoteStorageBulkSettings = RemoteStorageBulkSettings()
+    journal: RemoteStorageJournalSettings = RemoteStorageJournalSettings()
+    user_cache: RemoteStorageUserCacheSettings = RemoteStorageUserCacheSettings()
+    warmup: RemoteStorageWarmupSettings = RemoteStorageWarmupSettings()
+    coherence: RemoteStorageCoherenceSettings = RemoteStorageCoherenceSettings()
 
 
 class LoggingConfig(BaseModel):
@@ -55,6 +272,7 @@ class BotConfig(BaseModel):
     """Конфигурация Telegram бота"""
 
     polling_timeout: int = 30
+    update_deadline: float = 10.0  # бюджет времени на обработку одного update (0 — без ограничения)
 
 
 class ApiConfig(BaseModel):
@@ -66,11 +284,23 @@ class ApiConfig(BaseModel):
     workers: int = 1
 
 
+class InvalidationConfig(BaseModel):
+    """HTTP-эндпоинт, через который NMservices сообщает об изменениях пользователей"""
+
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = 8081
+    path: str = "/invalidate"
+    token: str = ""  # X-Invalidation-Token; без него эндпоинт не запускается
+    refresh: bool = False  # по умолчанию сразу перезагружать пользователя, а не только вытеснять
+
+
 class MonitoringConfig(BaseModel):
     """Конфигурация мониторинга"""
 
     sentry_dsn: str = ""
     enable_metrics: bool = False
+    metrics_interval: float = 60.0  # период записи метрик в лог (секунды)
 
 
 class Messages(BaseModel):
@@ -277,8 +507,10 @@ class Settings(BaseSettings):
     logging: LoggingConfig = LoggingConfig()
     services: Dict[str, ServiceConfig] = {}
     remote_api: RemoteApiSettings = RemoteApiSettings()
+    remote_storage: RemoteStorageSettings = RemoteStorageSettings()
     bot: BotConfig = BotConfig()
     api: ApiConfig = ApiConfig()
+    invalidation: InvalidationConfig = InvalidationConfig()
     monitoring: MonitoringConfig = MonitoringConfig()
 
     # Localization
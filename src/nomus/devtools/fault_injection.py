@@ -0,0 +1,154 @@
+"""
+Внедрение задержек и сбоев в stand-in NMservices.
+
+Профиль (FaultProfile) задается для шаблона пути (fnmatch) и, при
+необходимости, метода; к запросу применяется первый подходящий профиль:
+- latency — распределение задержки ответа (fixed / uniform / exponential /
+  lognormal), задается медианой p50 и хвостом p99;
+- error_rate / error_status — доля ответов с ошибкой (по умолчанию 500);
+- disconnect_rate — доля запросов, на которых соединение обрывается без ответа;
+- rate_limit / retry_after — ограничение частоты (token bucket), сверх
+  него — 429 с Retry-After;
+- slow_body_bps — тело ответа отдается по частям с такой скоростью (байт/с).
+
+Случайные величины берутся из генератора с фиксированным seed, поэтому
+прогоны бенчмарков воспроизводимы.
+"""
+
+import fnmatch
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# z-оценка 99-го перцентиля стандартного нормального распределения
+_Z99 = 2.326
+
+
+@dataclass
+class LatencyProfile:
+    """Распределение задержки ответа, секунды."""
+
+    distribution: str = "fixed"  # fixed | uniform | exponential | lognormal
+    p50: float = 0.0
+    p99: float = 0.0  # для lognormal; 0 — без хвоста (равно p50)
+
+    @classmethod
+    def parse(cls, value: str) -> "LatencyProfile":
+        """'lognormal:0.02:0.2' → LatencyProfile(distribution, p50, p99)."""
+        distribution, _, rest = value.partition(":")
+        p50, _, p99 = rest.partition(":")
+        return cls(distribution, float(p50 or 0), float(p99 or 0))
+
+    def sample(self, rnd: random.Random) -> float:
+        if self.p50 <= 0:
+            return 0.0
+        if self.distribution == "fixed":
+            return self.p50
+        if self.distribution == "uniform":
+            return rnd.uniform(0, 2 * self.p50)
+        if self.distribution == "exponential":
+            # Медиана экспоненциального распределения — mean * ln 2
+            return rnd.expovariate(math.log(2) / self.p50)
+        if self.distribution == "lognormal":
+            sigma = math.log(self.p99 / self.p50) / _Z99 if self.p99 > self.p50 else 0.0
+            return rnd.lognormvariate(math.log(self.p50), sigma)
+        raise ValueError(f"Unknown latency distribution: {self.distribution}")
+
+
+@dataclass
+class FaultProfile:
+    """Задержки и сбои для запросов, подходящих под pattern (и method)."""
+
+    pattern: str = "*"
+    method: Optional[str] = None  # None — любой метод
+    latency: LatencyProfile = field(default_factory=LatencyProfile)
+    error_rate: float = 0.0
+    error_status: int = 500
+    disconnect_rate: float = 0.0
+    rate_limit: float = 0.0  # запросов в секунду; 0 — без ограничения
+    retry_after: Optional[float] = None  # None — время до следующего токена
+    slow_body_bps: int = 0  # 0 — тело отдается сразу
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.method is not None and self.method != method:
+            return False
+        return fnmatch.fnmatchcase(path, self.pattern)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FaultProfile":
+        data = dict(data)
+        latency = data.pop("latency", None) or {}
+        return cls(latency=LatencyProfile(**latency), **data)
+
+
+@dataclass
+class Fault:
+    """Решение для конкретного запроса."""
+
+    delay: float = 0.0
+    status: Optional[int] = None  # ответить ошибкой вместо обработчика
+    retry_after: Optional[float] = None
+    disconnect: bool = False
+    slow_body_bps: int = 0
+
+
+class _RateLimiter:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+
+    def take(self) -> float:
+        """0 — запрос разрешен, иначе сколько секунд до следующего токена."""
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class FaultInjector:
+    """Выбирает профиль для запроса и разыгрывает задержку и сбои."""
+
+    def __init__(self, profiles: Optional[List[FaultProfile]] = None, seed: int = 42):
+        self.profiles = list(profiles or [])
+        self._random = random.Random(seed)
+        self._limiters: Dict[int, _RateLimiter] = {}
+        self.injected: Dict[str, int] = {"errors": 0, "disconnects": 0, "throttled": 0}
+
+    def profile_for(self, method: str, path: str) -> Optional[FaultProfile]:
+        for profile in self.profiles:
+            if profile.matches(method, path):
+                return profile
+        return None
+
+    def decide(self, method: str, path: str) -> Fault:
+        profile = self.profile_for(method, path)
+        if profile is None:
+            return Fault()
+        fault = Fault(
+            delay=profile.latency.sample(self._random), slow_body_bps=profile.slow_body_bps
+        )
+        if profile.rate_limit > 0:
+            limiter = self._limiters.get(id(profile))
+            if limiter is None:
+                limiter = self._limiters[id(profile)] = _RateLimiter(profile.rate_limit)
+            wait = limiter.take()
+            if wait > 0:
+                self.injected["throttled"] += 1
+                fault.status = 429
+                fault.retry_after = profile.retry_after if profile.retry_after is not None else wait
+                return fault
+        roll = self._random.random()
+        if roll < profile.disconnect_rate:
+            self.injected["disconnects"] += 1
+            fault.disconnect = True
+        elif roll < profile.disconnect_rate + profile.error_rate:
+            self.injected["errors"] += 1
+            fault.status = profile.error_status
+            fault.retry_after = profile.retry_after
+        return fault
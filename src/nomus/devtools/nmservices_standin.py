@@ -0,0 +1,565 @@
+"""
+Локальный stand-in NMservices для тестов и нагрузочных бенчмарков.
+
+Хранит пользователей, услуги и заказы в памяти и отвечает в формате
+NMservices на все эндпоинты, которые вызывает RemoteApiClient:
+    GET   /capabilities
+    POST  /users/register
+    POST  /users/bulk
+    GET   /users/active
+    GET   /users/by-telegram/{telegram_id}
+    PATCH /users/{user_id}
+    PATCH /users/{user_id}/language
+    GET   /services
+    POST  /orders
+    POST  /orders/bulk
+    GET   /orders/active
+    GET   /orders/pending-notifications
+    POST  /orders/notifications/ack
+    POST  /payment/initiate
+
+Поддерживает bulk-форму GET-запросов по пользователям:
+    GET /orders/active?telegram_ids=1&telegram_ids=2
+    → {"by_telegram_id": {"1": {"orders": [...]}, "2": {"orders": [...]}}}
+
+Bulk upsert пользователей и заказов (объявляется в GET /capabilities,
+отключается через bulk=False / --no-bulk):
+    POST /users/bulk {"users": [...]} → {"results": [{"status": "ok", ...}, ...]}
+Результаты идут в порядке записей; ошибка записи —
+{"status": "error", "status_code": 422, "detail": ...}.
+
+GET /users/active отдает пользователей страницами в NDJSON (прогрев кеша):
+строка {"total": N}, по строке на пользователя, затем {"next_cursor": ...}.
+Активности stand-in не отслеживает — активными считаются все пользователи.
+
+POST с заголовком Idempotency-Key выполняется один раз: повтор с тем же
+ключом получает сохраненный ответ.
+
+Ответы от compress_min_size байт сжимаются по Accept-Encoding клиента
+(gzip/deflate, br — если установлен brotli); сжатые тела запросов
+(Content-Encoding) aiohttp распаковывает сам.
+
+Задержки, ошибки, 429 и медленная отдача тела настраиваются профилями
+FaultInjector (см. fault_injection). Счетчики запросов и внедренных сбоев:
+GET /_standin/stats.
+
+Запуск:
+    python -m nomus.devtools.nmservices_standin --port 9800 --users 1000 \
+        --latency lognormal:0.02:0.2 --error-rate 0.01 --rate-limit 500
+    python -m nomus.devtools.nmservices_standin --faults faults.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+from aiohttp import web
+
+from .fault_injection import FaultInjector, FaultProfile, LatencyProfile
+
+ACTIVE_STATUSES = ("pending", "confirmed", "in_progress")
+
+
+@dataclass
+class StandInOrder:
+    order_id: int
+    user_id: int
+    service_id: int
+    address_text: str
+    total_amount: Decimal
+    status: str = "pending"
+    notified_status: str = "pending"
+
+
+@dataclass
+class StandInState:
+    """Данные stand-in'а: пользователи, каталог услуг и заказы."""
+
+    users: Dict[int, Dict[str, Any]] = field(default_factory=dict)  # по telegram_id
+    services: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    orders: Dict[int, StandInOrder] = field(default_factory=dict)
+    requests: Counter = field(default_factory=Counter)  # (метод, путь) → число запросов
+    payments: Dict[int, Dict[str, Any]] = field(default_factory=dict)  # по order_id
+    idempotent_responses: Dict[str, Any] = field(default_factory=dict)  # ключ → (статус, тело)
+    _orders_by_user: Dict[int, List[StandInOrder]] = field(default_factory=dict)
+    _ids: Any = field(default_factory=lambda: itertools.count(1))
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add_user(self, telegram_id: int, phone_number: Optional[str] = None) -> Dict[str, Any]:
+        user = {
+            "id": self.next_id(),
+            "telegram_id": telegram_id,
+            "phone_number": phone_number or f"+99890{telegram_id % 10_000_000:07d}",
+            "language_code": "ru",
+        }
+        self.users[telegram_id] = user
+        return user
+
+    def add_service(self, name: str, base_price: str, duration_minutes: int) -> Dict[str, Any]:
+        service = {
+            "id": self.next_id(),
+            "name": name,
+            "description": name,
+            "base_price": base_price,
+            "duration_minutes": duration_minutes,
+            "is_active": True,
+        }
+        self.services[service["id"]] = service
+        return service
+
+    def add_order(self, user_id: int, service_id: int, address_text: str) -> StandInOrder:
+        service = self.services[service_id]
+        order = StandInOrder(
+            order_id=self.next_id(),
+            user_id=user_id,
+            service_id=service_id,
+            address_text=address_text,
+            total_amount=Decimal(service["base_price"]),
+        )
+        self.orders[order.order_id] = order
+        self._orders_by_user.setdefault(user_id, []).append(order)
+        return order
+
+    def user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        for user in self.users.values():
+            if user["id"] == user_id:
+                return user
+        return None
+
+    def register_user(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Создает пользователя или обновляет существующего (по telegram_id или телефону)."""
+        telegram_id = data.get("telegram_id")
+        user = self.users.get(telegram_id) if telegram_id is not None else None
+        if user is None:
+            user = next(
+                (u for u in self.users.values() if u["phone_number"] == data["phone_number"]),
+                None,
+            )
+        if user is None:
+            if telegram_id is None:
+                # Регистрация только по телефону (SmsServiceRemote) — отрицательный ключ
+                telegram_id = -(len(self.users) + 1)
+            user = self.add_user(telegram_id, data["phone_number"])
+        user["phone_number"] = data["phone_number"]
+        if data.get("language_code"):
+            user["language_code"] = data["language_code"]
+        return user
+
+    def initiate_payment(self, order: StandInOrder) -> Dict[str, Any]:
+        payment = self.payments.get(order.order_id)
+        if payment is None:
+            payment = self.payments[order.order_id] = {
+                "payment_id": self.next_id(),
+                "payment_url": f"https://pay.standin.local/{order.order_id}",
+            }
+        return payment
+
+    def ack_notifications(self, telegram_id: int, order_ids: List[int]) -> int:
+        wanted = set(order_ids)
+        acked = 0
+        for order in self.user_orders(telegram_id):
+            if order.order_id in wanted and order.notified_status != order.status:
+                order.notified_status = order.status
+                acked += 1
+        return acked
+
+    def user_orders(self, telegram_id: int) -> List[StandInOrder]:
+        user = self.users.get(telegram_id)
+        if user is None:
+            return []
+        return self._orders_by_user.get(user["id"], [])
+
+    def order_view(self, order: StandInOrder) -> Dict[str, Any]:
+        return {
+            "order_id": order.order_id,
+            "status": order.status,
+            "service_name": self.services[order.service_id]["name"],
+            "total_amount": str(order.total_amount),
+            "address_text": order.address_text,
+        }
+
+    def active_orders(self, telegram_id: int) -> Dict[str, Any]:
+        return {
+            "orders": [
+                self.order_view(o)
+                for o in self.user_orders(telegram_id)
+                if o.status in ACTIVE_STATUSES
+            ]
+        }
+
+    def pending_notifications(self, telegram_id: int) -> Dict[str, Any]:
+        return {
+            "notifications": [
+                {
+                    "order_id": o.order_id,
+                    "status": o.status,
+                    "service_name": self.services[o.service_id]["name"],
+                    "total_amount": str(o.total_amount),
+                }
+                for o in self.user_orders(telegram_id)
+                if o.status != o.notified_status
+            ]
+        }
+
+    @classmethod
+    def seeded(cls, users: int = 100, orders_per_user: int = 2, seed: int = 42) -> "StandInState":
+        """Состояние со сгенерированными пользователями и заказами."""
+        rnd = random.Random(seed)
+        state = cls()
+        services = [
+            state.add_service("Классический массаж", "150000.00", 60),
+            state.add_service("Спортивный массаж", "200000.00", 90),
+            state.add_service("Расслабляющий массаж", "120000.00", 45),
+        ]
+        for telegram_id in range(1, users + 1):
+            user = state.add_user(telegram_id)
+            for n in range(orders_per_user):
+                order = state.add_order(
+                    user["id"], rnd.choice(services)["id"], f"Ташкент, дом {telegram_id}, кв. {n}"
+                )
+                order.status = rnd.choice(ACTIVE_STATUSES)
+        return state
+
+
+def _per_user(
+    state: StandInState, view: Callable[[int], Dict[str, Any]]
+) -> Callable[[web.Request], Any]:
+    """Обработчик GET по пользователю: одиночная (telegram_id) и bulk-форма (telegram_ids)."""
+
+    async def handler(request: web.Request) -> web.Response:
+        bulk = request.query.getall("telegram_ids", [])
+        if bulk:
+            ids = [int(part) for value in bulk for part in value.split(",") if part]
+            return web.json_response(
+                {"by_telegram_id": {str(telegram_id): view(telegram_id) for telegram_id in ids}}
+            )
+        telegram_id = request.query.get("telegram_id")
+        if telegram_id is None:
+            return web.json_response({"detail": "telegram_id is required"}, status=422)
+        return web.json_response(view(int(telegram_id)))
+
+    return handler
+
+
+async def _json_body(request: web.Request) -> Dict[str, Any]:
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise web.HTTPUnprocessableEntity(
+            text=json.dumps({"detail": "Invalid JSON body"}), content_type="application/json"
+        )
+    if not isinstance(body, dict):
+        raise web.HTTPUnprocessableEntity(
+            text=json.dumps({"detail": "JSON object expected"}), content_type="application/json"
+        )
+    return body
+
+
+def _validation_error(detail: str) -> web.Response:
+    return web.json_response({"detail": detail}, status=422)
+
+
+async def _send_slowly(request: web.Request, response: web.Response, bps: int) -> web.StreamResponse:
+    """Отдает тело ответа частями со скоростью bps байт в секунду."""
+    body = response.body or b""
+    stream = web.StreamResponse(status=response.status, headers=response.headers)
+    stream.content_length = len(body)
+    await stream.prepare(request)
+    chunk = max(1, bps // 10)
+    for offset in range(0, len(body), chunk):
+        await stream.write(body[offset : offset + chunk])
+        await asyncio.sleep(chunk / bps)
+    await stream.write_eof()
+    return stream
+
+
+def build_app(
+    state: Optional[StandInState] = None,
+    api_key: Optional[str] = None,
+    compress_min_size: Optional[int] = None,
+    faults: Optional[FaultInjector] = None,
+    bulk: bool = True,
+) -> web.Application:
+    """
+    Создает aiohttp-приложение stand-in'а.
+
+    Args:
+        state: Данные; по умолчанию — StandInState.seeded()
+        api_key: Если задан, запросы без совпадающего X-API-Key получают 403
+        compress_min_size: Сжимать ответы от этого размера (байты); None — не сжимать
+        faults: Профили задержек и сбоев; None — отвечать сразу и без ошибок
+        bulk: Объявлять и обслуживать /users/bulk и /orders/bulk
+    """
+    state = state or StandInState.seeded()
+    faults = faults or FaultInjector()
+
+    @web.middleware
+    async def standin(request: web.Request, handler):
+        route = request.match_info.route.resource
+        path = route.canonical if route is not None else request.path
+        state.requests[(request.method, path)] += 1
+        if request.path.startswith("/_standin/"):
+            return await handler(request)
+        if api_key and request.path != "/" and request.headers.get("X-API-Key") != api_key:
+            return web.json_response({"detail": "Invalid API key"}, status=403)
+
+        fault = faults.decide(request.method, request.path)
+        if fault.delay > 0:
+            await asyncio.sleep(fault.delay)
+        if fault.disconnect:
+            # Соединение рвется без ответа — клиент видит сетевую ошибку
+            if request.transport is not None:
+                request.transport.close()
+            raise ConnectionResetError("Injected disconnect")
+        if fault.status is not None:
+            headers = {}
+            if fault.retry_after is not None:
+                headers["Retry-After"] = f"{fault.retry_after:.3f}"
+            return web.json_response(
+                {"detail": "Injected failure"}, status=fault.status, headers=headers
+            )
+
+        response = await handler(request)
+        if not isinstance(response, web.Response):
+            return response
+        if fault.slow_body_bps > 0:
+            return await _send_slowly(request, response, fault.slow_body_bps)
+        if (
+            compress_min_size is not None
+            and response.body is not None
+            and len(response.body) >= compress_min_size
+        ):
+            response.enable_compression()
+        return response
+
+    async def idempotent(
+        request: web.Request, operation: Callable[[Dict[str, Any]], Any]
+    ) -> web.Response:
+        """Выполняет POST один раз на Idempotency-Key; повтор получает тот же ответ."""
+        key = request.headers.get("Idempotency-Key")
+        if key is not None and key in state.idempotent_responses:
+            status, body = state.idempotent_responses[key]
+            return web.json_response(body, status=status)
+        response = operation(await _json_body(request))
+        if key is not None and response.status < 500:
+            state.idempotent_responses[key] = (response.status, json.loads(response.body))
+        return response
+
+    async def root(request: web.Request) -> web.Response:
+        return web.json_response({"message": "NoMus API is running"})
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "requests": {
+                    f"{method} {path}": count for (method, path), count in state.requests.items()
+                },
+                "faults": faults.injected,
+                "users": len(state.users),
+                "orders": len(state.orders),
+            }
+        )
+
+    async def services(request: web.Request) -> web.Response:
+        return web.json_response({"services": list(state.services.values())})
+
+    async def user_by_telegram(request: web.Request) -> web.Response:
+        user = state.users.get(int(request.match_info["telegram_id"]))
+        if user is None:
+            return web.json_response({"detail": "User not found"}, status=404)
+        return web.json_response(user)
+
+    async def active_users(request: web.Request) -> web.StreamResponse:
+        limit = int(request.query.get("limit", 500))
+        offset = int(request.query.get("cursor", 0))
+        users = list(state.users.values())
+        page = users[offset : offset + limit]
+        next_cursor = str(offset + limit) if offset + limit < len(users) else None
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        lines = [{"total": len(users)}, *page, {"next_cursor": next_cursor}]
+        for line in lines:
+            await response.write(json.dumps(line, ensure_ascii=False).encode("utf-8") + b"\n")
+        await response.write_eof()
+        return response
+
+    def register(data: Dict[str, Any]) -> web.Response:
+        if not data.get("phone_number"):
+            return _validation_error("phone_number is required")
+        user = state.register_user(data)
+        return web.json_response(
+            {"status": "ok", "user_id": user["id"], "message": "User registered"}
+        )
+
+    async def register_user(request: web.Request) -> web.Response:
+        return await idempotent(request, register)
+
+    async def update_language(request: web.Request) -> web.Response:
+        data = await _json_body(request)
+        user = state.user_by_id(int(request.match_info["user_id"]))
+        if user is None:
+            return web.json_response({"detail": "User not found"}, status=404)
+        if not data.get("language_code"):
+            return _validation_error("language_code is required")
+        user["language_code"] = data["language_code"]
+        return web.json_response({"status": "ok"})
+
+    async def update_user(request: web.Request) -> web.Response:
+        data = await _json_body(request)
+        user = state.user_by_id(int(request.match_info["user_id"]))
+        if user is None:
+            return web.json_response({"detail": "User not found"}, status=404)
+        if "phone_number" in data and not data["phone_number"]:
+            return _validation_error("phone_number must not be empty")
+        # Идентификаторы не меняются, остальные поля — как прислал клиент
+        user.update({k: v for k, v in data.items() if k not in ("id", "telegram_id")})
+        return web.json_response({"status": "ok", "user_id": user["id"]})
+
+    def create(data: Dict[str, Any]) -> web.Response:
+        user_id = data.get("user_id")
+        if user_id is None or state.user_by_id(user_id) is None:
+            return _validation_error("Unknown user_id")
+        service_id = data.get("service_id") or next(iter(state.services))
+        if service_id not in state.services:
+            return _validation_error("Unknown service_id")
+        order = state.add_order(user_id, service_id, data.get("address_text") or "")
+        return web.json_response(
+            {"status": "ok", "order_id": order.order_id, "message": "Order created"}
+        )
+
+    async def create_order(request: web.Request) -> web.Response:
+        return await idempotent(request, create)
+
+    def upsert_order(data: Dict[str, Any]) -> web.Response:
+        order = state.orders.get(data.get("order_id"))
+        if order is None:
+            return create(data)
+        if data.get("status"):
+            order.status = data["status"]
+        return web.json_response({"status": "ok", "order_id": order.order_id})
+
+    def bulk_upsert(field_name: str, operation: Callable[[Dict[str, Any]], web.Response]):
+        def run(data: Dict[str, Any]) -> web.Response:
+            records = data.get(field_name)
+            if not isinstance(records, list):
+                return _validation_error(f"{field_name} must be a list")
+            results = []
+            for record in records:
+                response = operation(record if isinstance(record, dict) else {})
+                body = json.loads(response.body)
+                if response.status >= 400:
+                    body = {"status": "error", "status_code": response.status, **body}
+                results.append(body)
+            return web.json_response({"results": results})
+
+        async def handler(request: web.Request) -> web.Response:
+            return await idempotent(request, run)
+
+        return handler
+
+    async def capabilities(request: web.Request) -> web.Response:
+        return web.json_response(
+            {"bulk_endpoints": ["/users/bulk", "/orders/bulk"] if bulk else []}
+        )
+
+    def payment(data: Dict[str, Any]) -> web.Response:
+        order = state.orders.get(data.get("order_id"))
+        if order is None:
+            return web.json_response({"detail": "Order not found"}, status=404)
+        return web.json_response({"status": "ok", **state.initiate_payment(order)})
+
+    async def initiate_payment(request: web.Request) -> web.Response:
+        return await idempotent(request, payment)
+
+    async def ack_notifications(request: web.Request) -> web.Response:
+        data = await _json_body(request)
+        if data.get("telegram_id") is None or not isinstance(data.get("order_ids"), list):
+            return _validation_error("telegram_id and order_ids are required")
+        acked = state.ack_notifications(data["telegram_id"], data["order_ids"])
+        return web.json_response({"status": "ok", "acked": acked})
+
+    app = web.Application(middlewares=[standin])
+    app.router.add_get("/", root)
+    app.router.add_get("/_standin/stats", stats)
+    app.router.add_get("/services", services)
+    app.router.add_get("/capabilities", capabilities)
+    app.router.add_post("/users/register", register_user)
+    app.router.add_get("/users/active", active_users)
+    app.router.add_get("/users/by-telegram/{telegram_id}", user_by_telegram)
+    app.router.add_patch("/users/{user_id}", update_user)
+    app.router.add_patch("/users/{user_id}/language", update_language)
+    app.router.add_post("/orders", create_order)
+    app.router.add_get("/orders/active", _per_user(state, state.active_orders))
+    app.router.add_get(
+        "/orders/pending-notifications", _per_user(state, state.pending_notifications)
+    )
+    app.router.add_post("/orders/notifications/ack", ack_notifications)
+    app.router.add_post("/payment/initiate", initiate_payment)
+    if bulk:
+        app.router.add_post("/users/bulk", bulk_upsert("users", register))
+        app.router.add_post("/orders/bulk", bulk_upsert("orders", upsert_order))
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local NMservices stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9800)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--orders-per-user", type=int, default=2)
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument(
+        "--compress-min-size", type=int, default=1024, help="-1 — не сжимать ответы"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-bulk", action="store_true", help="без /users/bulk и /orders/bulk")
+    parser.add_argument(
+        "--faults", default=None, help="JSON-файл со списком профилей FaultProfile"
+    )
+    # Профиль для всех эндпоинтов (применяется после профилей из --faults)
+    parser.add_argument("--latency", default=None, help="distribution:p50[:p99], секунды")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="запросов в секунду")
+    parser.add_argument("--slow-body-bps", type=int, default=0)
+    args = parser.parse_args()
+
+    profiles: List[FaultProfile] = []
+    if args.faults:
+        with open(args.faults, encoding="utf-8") as f:
+            profiles.extend(FaultProfile.from_dict(item) for item in json.load(f))
+    profiles.append(
+        FaultProfile(
+            latency=LatencyProfile.parse(args.latency) if args.latency else LatencyProfile(),
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            disconnect_rate=args.disconnect_rate,
+            rate_limit=args.rate_limit,
+            slow_body_bps=args.slow_body_bps,
+        )
+    )
+
+    state = StandInState.seeded(
+        users=args.users, orders_per_user=args.orders_per_user, seed=args.seed
+    )
+    app = build_app(
+        state,
+        api_key=args.api_key,
+        compress_min_size=args.compress_min_size if args.compress_min_size >= 0 else None,
+        faults=FaultInjector(profiles, seed=args.seed),
+        bulk=not args.no_bulk,
+    )
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
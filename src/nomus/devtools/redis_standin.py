@@ -0,0 +1,133 @@
+"""
+Локальный stand-in Redis pub/sub для тестов шины согласованности кешей.
+
+Понимает ровно то, что использует RedisTransport, по протоколу RESP:
+    PING, AUTH <password>, PUBLISH <channel> <message>, SUBSCRIBE <channel> ...
+Подписанное соединение получает ["message", channel, payload], как в Redis.
+
+Запуск:
+    python -m nomus.devtools.redis_standin --port 6390
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from nomus.infrastructure.database.coherence import encode_command
+
+
+def _reply(value) -> bytes:
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode("utf-8")
+    return encode_command(*value)
+
+
+class RedisStandIn:
+    """Pub/sub-сервер в памяти."""
+
+    def __init__(self, password: Optional[str] = None):
+        self.password = password
+        self.commands: Counter = Counter()  # имя команды → число вызовов
+        self._subscribers: Dict[bytes, Set[asyncio.StreamWriter]] = {}
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self._handlers: Set[asyncio.Task] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.port = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}127.0.0.1:{self.port}/0"
+
+    def disconnect_all(self) -> None:
+        """Рвет все соединения — клиенты должны переподключиться."""
+        for writer in list(self._connections):
+            writer.close()
+
+    async def close(self) -> None:
+        self.disconnect_all()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        header = await reader.readline()
+        if not header:
+            return None
+        if not header.startswith(b"*"):
+            raise ValueError("Only RESP arrays are supported")
+        args = []
+        for _ in range(int(header[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(writer)
+        self._handlers.add(asyncio.current_task())
+        authenticated = self.password is None
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                name = args[0].decode().upper()
+                self.commands[name] += 1
+                if name == "AUTH":
+                    authenticated = args[1].decode() == self.password
+                    writer.write(b"+OK\r\n" if authenticated else b"-WRONGPASS invalid password\r\n")
+                elif not authenticated:
+                    writer.write(b"-NOAUTH Authentication required.\r\n")
+                elif name == "PING":
+                    writer.write(_reply("PONG"))
+                elif name == "PUBLISH":
+                    writer.write(_reply(self._publish(args[1], args[2])))
+                elif name == "SUBSCRIBE":
+                    for number, channel in enumerate(args[1:], 1):
+                        self._subscribers.setdefault(channel, set()).add(writer)
+                        writer.write(_reply([b"subscribe", channel, number]))
+                else:
+                    writer.write(b"-ERR unknown command '%s'\r\n" % name.encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            for subscribers in self._subscribers.values():
+                subscribers.discard(writer)
+            writer.close()
+
+    def _publish(self, channel: bytes, payload: bytes) -> int:
+        subscribers = [w for w in self._subscribers.get(channel, ()) if not w.is_closing()]
+        for writer in subscribers:
+            writer.write(encode_command(b"message", channel, payload))
+        return len(subscribers)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Redis pub/sub stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    parser.add_argument("--password")
+    args = parser.parse_args()
+
+    async def serve() -> None:
+        server = RedisStandIn(password=args.password)
+        await server.start(args.host, args.port)
+        print(f"Redis stand-in listening on {args.host}:{server.port}")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
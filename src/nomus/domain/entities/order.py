@@ -1,5 +1,6 @@
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from decimal import Decimal
 
 @dataclass
 class Order:
@@ -8,4 +9,38 @@ class Order:
     amount: int
     created_at: datetime
     status: str  # e.g., "pending", "completed", "cancelled"
-    
+
+
+@dataclass(slots=True)
+class ActiveOrder:
+    """Активный заказ пользователя (GET /orders/active)."""
+
+    order_id: int
+    status: str | None = ""  # null допускается: иначе не разберется весь список
+    service_name: str | None = None
+    total_amount: Decimal | None = None
+    address_text: str | None = None
+
+
+@dataclass(slots=True)
+class ActiveOrderList:
+    """Ответ GET /orders/active: {"orders": [...]}"""
+
+    orders: list[ActiveOrder] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class OrderNotification:
+    """Непрочитанное уведомление о смене статуса (GET /orders/pending-notifications)."""
+
+    order_id: int
+    status: str | None = ""
+    service_name: str | None = None
+    total_amount: Decimal | None = None
+
+
+@dataclass(slots=True)
+class PendingNotifications:
+    """Ответ GET /orders/pending-notifications: {"notifications": [...]}"""
+
+    notifications: list[OrderNotification] = field(default_factory=list)
@@ -0,0 +1,26 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+
+@dataclass(slots=True)
+class Service:
+    """
+    Услуга из каталога NMservices (GET /services).
+
+    Необязательные поля допускают null: одна неполная услуга не должна
+    ломать разбор всего каталога.
+    """
+
+    id: int
+    name: str | None = "—"
+    description: str | None = None
+    base_price: Decimal | None = None
+    duration_minutes: int | float | None = None
+    is_active: bool = True
+
+
+@dataclass(slots=True)
+class ServiceCatalog:
+    """Ответ GET /services: {"services": [...]}"""
+
+    services: list[Service] = field(default_factory=list)
@@ -192,4 +192,29 @@ class IStorageRepository(IUserRepository, IOrderRepository, ABC):
         (e.g., after user registration, after order completion).
         """
         pass  # Default implementation does nothing
+
+    def request_flush(self) -> None:
+        """
+        Asks the storage to flush pending changes soon, without waiting for it.
+
+        Handlers use this instead of flush() so that they don't pay the sync latency.
+        For direct storage implementations, this is a no-op.
+        """
+        pass
+
+    async def start(self) -> None:
+        """
+        Starts background work (e.g. the write-behind flusher of RemoteStorage).
+
+        Called once on application startup. No-op by default.
+        """
+        pass
+
+    async def close(self) -> None:
+        """
+        Stops background work and flushes remaining changes.
+
+        Called once on application shutdown. No-op by default.
+        """
+        pass
     
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Bulk-синхронизация RemoteStorage с NMservices.
+
+Вместо запроса на каждую запись flush отправляет пачки:
+    POST /users/bulk   {"users": [...]}
+    POST /orders/bulk  {"orders": [...]}
+    → {"results": [{"status": "ok", ...}, {"status": "error", "status_code": 422, ...}]}
+Результаты идут в том же порядке, что и записи. Пачка ограничена и числом
+записей (max_records), и размером тела (max_bytes).
+
+Поддержку bulk сервер объявляет в GET /capabilities:
+    {"bulk_endpoints": ["/users/bulk", "/orders/bulk"]}
+Если эндпоинта нет или bulk-эндпоинт отвечает 404/405, записи
+отправляются по одной.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+from nomus.infrastructure.services.remote_api_client import (
+    RemoteApiClient,
+    RemoteApiConnectionError,
+    RemoteApiError,
+)
+
+log = logging.getLogger(__name__)
+
+# Ответы, по которым видно, что сервер не знает bulk-эндпоинт
+BULK_UNSUPPORTED_STATUSES = frozenset({404, 405})
+
+Record = Tuple[Hashable, Dict[str, Any]]
+
+
+@dataclass
+class BulkSyncConfig:
+    """Параметры bulk-синхронизации."""
+
+    enabled: bool = True
+    max_records: int = 500  # записей в одной пачке
+    max_bytes: int = 512 * 1024  # размер JSON-тела пачки (оценка)
+    capabilities_endpoint: str = "/capabilities"
+    capabilities_ttl: float = 300.0  # секунды; потом поддержка проверяется заново
+
+
+def _encoded_size(record: Dict[str, Any]) -> int:
+    return len(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")) + 1
+
+
+def chunk_records(records: List[Record], max_records: int, max_bytes: int) -> List[List[Record]]:
+    """
+    Делит записи на пачки не больше max_records записей и max_bytes байт.
+
+    Запись больше max_bytes попадает в пачку одна — отправить ее все равно нужно.
+    """
+    chunks: List[List[Record]] = []
+    chunk: List[Record] = []
+    size = 0
+    for record in records:
+        record_size = _encoded_size(record[1])
+        if chunk and (len(chunk) >= max_records or size + record_size > max_bytes):
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(record)
+        size += record_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+class BulkCapabilities:
+    """Какие bulk-эндпоинты объявил сервер (ответ кешируется на capabilities_ttl)."""
+
+    def __init__(self, config: BulkSyncConfig, api_client: RemoteApiClient):
+        self.config = config
+        self._api_client = api_client
+        self._endpoints: Optional[FrozenSet[str]] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self.probes = 0
+
+    async def supports(self, endpoint: str) -> bool:
+        if not self.config.enabled:
+            return False
+        return endpoint in await self._advertised()
+
+    def mark_unsupported(self, endpoint: str) -> None:
+        """Сервер отверг bulk-эндпоинт, хотя объявлял его (например, откат версии)."""
+        if self._endpoints is not None:
+            self._endpoints = self._endpoints - {endpoint}
+
+    async def _advertised(self) -> FrozenSet[str]:
+        if self._endpoints is not None and time.monotonic() < self._expires_at:
+            return self._endpoints
+        async with self._lock:
+            if self._endpoints is not None and time.monotonic() < self._expires_at:
+                return self._endpoints
+            self.probes += 1
+            try:
+                body = await self._api_client.get(self.config.capabilities_endpoint)
+            except RemoteApiConnectionError as e:
+                # Сервер недоступен — не запоминаем, проверим в следующий flush
+                log.warning("Could not fetch bulk capabilities: %s", e)
+                return self._endpoints or frozenset()
+            except RemoteApiError as e:
+                log.info("Bulk sync not advertised (HTTP %s), using per-record sync", e.status_code)
+                body = {}
+            endpoints = body.get("bulk_endpoints") if isinstance(body, dict) else None
+            self._endpoints = frozenset(endpoints or ())
+            self._expires_at = time.monotonic() + self.config.capabilities_ttl
+            return self._endpoints
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.config.enabled,
+            "advertised": sorted(self._endpoints) if self._endpoints is not None else None,
+            "probes": self.probes,
+        }
@@ -0,0 +1,209 @@
+"""
+Прогрев кеша RemoteStorage при старте.
+
+После деплоя кеш пуст, и первое обращение каждого активного пользователя
+ждет запрос к NMservices. Прогрев заранее загружает недавно активных
+пользователей постранично:
+    GET /users/active?limit=500&active_within=604800[&cursor=...]
+    Accept: application/x-ndjson
+    → {"total": 1234}                          (первая строка)
+      {"id": 1, "telegram_id": 777, ...}        (по строке на пользователя)
+      {"next_cursor": "..."}                   (последняя; null — страниц больше нет)
+Строки разбираются по мере получения и сразу кладутся в кеш, поэтому
+память не растет с размером страницы. Прерванная страница запрашивается
+заново с того же курсора. Некорректные строки пропускаются и считаются
+в skipped_lines.
+
+Старт бота может дождаться, пока прогрето ready_percent процентов
+(но не дольше ready_timeout), — остальное догружается в фоне.
+"""
+
+import asyncio
+import logging
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from nomus.common.deadline import detached_context
+from nomus.infrastructure.services.remote_api_client import RemoteApiClient, RemoteApiError
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmupConfig:
+    """Параметры прогрева кеша."""
+
+    enabled: bool = False
+    endpoint: str = "/users/active"
+    active_within: float = 7 * 24 * 3600.0  # секунды; кого считать активным
+    page_size: int = 500
+    max_users: int = 0  # 0 — сколько помещается в кеш (user_cache.max_users)
+    ready_percent: float = 0.0  # start() ждет этот процент; 0 — не ждать
+    ready_timeout: float = 30.0  # секунды
+    page_retries: int = 3
+    retry_delay: float = 1.0  # секунды между повторами страницы
+
+
+class CacheWarmup:
+    """Фоновая загрузка активных пользователей в кеш."""
+
+    def __init__(
+        self,
+        config: WarmupConfig,
+        api_client: RemoteApiClient,
+        insert: Callable[[Dict[str, Any]], Awaitable[None]],
+        limit: int = 0,
+    ):
+        """
+        Args:
+            insert: Кладет пользователя в кеш
+            limit: Не загружать больше этого числа пользователей; 0 — без ограничения
+        """
+        self.config = config
+        self._api_client = api_client
+        self._insert = insert
+        self._limit = limit
+        self._task: Optional[asyncio.Task] = None
+        self._progress = asyncio.Event()  # взводится на каждом шаге прогресса
+        self.loaded = 0
+        self.total: Optional[int] = None  # сколько активных пользователей объявил сервер
+        self.pages = 0
+        self.skipped_lines = 0
+        self.done = False
+        self.failed = False
+
+    @property
+    def percent(self) -> float:
+        if self.done:
+            return 100.0
+        if not self.total:
+            return 0.0
+        return min(100.0, self.loaded * 100.0 / self.total)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(
+                self._run(), context=detached_context()
+            )
+
+    async def wait_ready(self) -> bool:
+        """
+        Ждет, пока прогрето ready_percent процентов, но не дольше ready_timeout.
+
+        Returns:
+            True — порог достигнут
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.ready_timeout
+        while self.percent < self.config.ready_percent:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            self._progress.clear()
+            try:
+                await asyncio.wait_for(self._progress.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        cursor: Optional[str] = None
+        try:
+            while True:
+                cursor = await self._load_page(cursor)
+                self.pages += 1
+                if cursor is None or self._limit_reached():
+                    break
+            log.info(
+                "Cache warm-up finished: %d users in %d pages, %d malformed lines skipped",
+                self.loaded,
+                self.pages,
+                self.skipped_lines,
+            )
+        except RemoteApiError as e:
+            self.failed = True
+            if e.status_code == 404:
+                log.info("Cache warm-up skipped: %s is not available", self.config.endpoint)
+            else:
+                log.warning("Cache warm-up stopped after %d users: %s", self.loaded, e)
+        except Exception:
+            # Иначе задача молча завершится, а wait_ready прождет весь ready_timeout
+            self.failed = True
+            log.exception("Cache warm-up failed after %d users", self.loaded)
+        finally:
+            self.done = True
+            self._progress.set()
+
+    def _limit_reached(self) -> bool:
+        return self._limit > 0 and self.loaded >= self._limit
+
+    def _skip_line(self, line: Any, error: Exception) -> None:
+        self.skipped_lines += 1
+        log.debug("Cache warm-up: skipping malformed line %.200r: %s", line, error)
+
+    async def _load_page(self, cursor: Optional[str]) -> Optional[str]:
+        """Загружает страницу и возвращает курсор следующей (None — последняя)."""
+        params: Dict[str, Any] = {
+            "limit": self.config.page_size,
+            "active_within": int(self.config.active_within),
+        }
+        if cursor is not None:
+            params["cursor"] = cursor
+        for attempt in range(self.config.page_retries):
+            next_cursor: Optional[str] = None
+            page_loaded = 0
+            lines = self._api_client.stream_lines(
+                self.config.endpoint, params, on_malformed=self._skip_line
+            )
+            try:
+                async with aclosing(lines):
+                    async for item in lines:
+                        try:
+                            if not isinstance(item, dict):
+                                raise TypeError(f"expected object, got {type(item).__name__}")
+                            if "telegram_id" in item:
+                                await self._insert(item)
+                                page_loaded += 1
+                                self.loaded += 1
+                                self._progress.set()
+                                if self._limit_reached():
+                                    return None
+                            elif "total" in item:
+                                total = item["total"]
+                                if isinstance(total, bool) or not isinstance(total, int):
+                                    raise TypeError(f"total must be an integer, got {total!r}")
+                                self.total = min(total, self._limit) if self._limit else total
+                            elif "next_cursor" in item:
+                                next_cursor = item["next_cursor"]
+                        except (ValueError, TypeError) as e:
+                            # Одна испорченная строка не должна останавливать прогрев
+                            self._skip_line(item, e)
+                return next_cursor
+            except RemoteApiError as e:
+                if e.status_code is not None or attempt == self.config.page_retries - 1:
+                    raise
+                # Страница загружается заново с того же курсора. Пользователей,
+                # уже попавших в кеш, insert пропускает, но в loaded они
+                # засчитываются снова — вычитаем их
+                self.loaded -= page_loaded
+                log.warning("Cache warm-up page failed, retrying: %s", e)
+                await asyncio.sleep(self.config.retry_delay)
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.config.enabled,
+            "loaded": self.loaded,
+            "total": self.total,
+            "percent": round(self.percent, 1),
+            "pages": self.pages,
+            "skipped_lines": self.skipped_lines,
+            "done": self.done,
+            "failed": self.failed,
+        }
@@ -0,0 +1,362 @@
+"""
+Шина согласованности кешей RemoteStorage между репликами бота.
+
+Каждый процесс бота держит свой кеш пользователей. Когда реплика меняет
+пользователя (язык, телефон, регистрация) или получает инвалидацию от
+NMservices, она публикует событие, и остальные реплики обновляют свои
+копии без запроса к NMservices:
+    {"origin": "<id реплики>", "events": [
+        {"telegram_id": 777, "fields": {"language_code": "uz"}},
+        {"telegram_id": 778, "fields": null, "version": 12}
+    ]}
+fields — новые значения полей; null — запись устарела, ее нужно вытеснить.
+version — версия записи на сервере (если известна).
+
+События копятся batch_interval секунд и уходят одним сообщением;
+несколько изменений одного пользователя за это время сливаются в одно.
+
+Транспорты (coherence.backend):
+- memory: реплики в одном процессе (тесты, локальный запуск);
+- redis: Redis pub/sub (PUBLISH/SUBSCRIBE по протоколу RESP), без
+  дополнительных зависимостей.
+Доставка — best effort: сообщения, отправленные, пока подписка
+переподключается, теряются; устаревание копий ограничено user_cache.idle_ttl.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, ClassVar, Dict, List, Optional, Set, Type
+from urllib.parse import unquote, urlsplit
+
+from nomus.common.deadline import detached_context
+
+log = logging.getLogger(__name__)
+
+Deliver = Callable[[bytes], Awaitable[None]]
+
+
+@dataclass
+class CoherenceConfig:
+    """Параметры шины согласованности кешей."""
+
+    enabled: bool = False
+    backend: str = "memory"  # memory | redis
+    url: str = "redis://127.0.0.1:6379/0"  # для backend=redis
+    channel: str = "nomus:cache"
+    batch_interval: float = 0.05  # секунды; копить события перед публикацией
+    max_batch: int = 500  # событий в одном сообщении
+    reconnect_delay: float = 1.0  # секунды между попытками переподключения
+
+
+# ─── Транспорты ──────────────────────────────────────────────────────
+
+
+class InProcessTransport:
+    """Доставка подписчикам того же канала внутри процесса."""
+
+    name = "memory"
+    _channels: ClassVar[Dict[str, Set[Deliver]]] = {}
+
+    def __init__(self, config: CoherenceConfig):
+        self.config = config
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        self._channels.setdefault(self.config.channel, set()).add(deliver)
+
+    async def publish(self, payload: bytes) -> None:
+        for deliver in list(self._channels.get(self.config.channel, ())):
+            await deliver(payload)
+
+    async def close(self) -> None:
+        subscribers = self._channels.get(self.config.channel)
+        if subscribers is not None and self._deliver is not None:
+            subscribers.discard(self._deliver)
+            if not subscribers:
+                del self._channels[self.config.channel]
+
+
+class RedisProtocolError(ConnectionError):
+    """Сервер ответил ошибкой или нарушил протокол RESP."""
+
+
+def encode_command(*args: Any) -> bytes:
+    """Команда Redis в формате RESP."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionResetError("Connection closed by Redis")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode("utf-8")
+    if kind == b"-":
+        raise RedisProtocolError(rest.decode("utf-8"))
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise RedisProtocolError(f"Unexpected reply: {line!r}")
+
+
+class RedisTransport:
+    """
+    Redis pub/sub по протоколу RESP.
+
+    Два соединения: одно для PUBLISH, второе подписано на канал.
+    Подписка переподключается сама; PUBLISH переподключается при следующей
+    публикации.
+    """
+
+    name = "redis"
+
+    def __init__(self, config: CoherenceConfig):
+        self.config = config
+        url = urlsplit(config.url)
+        if url.scheme != "redis":
+            raise ValueError(f"Unsupported coherence bus URL: {config.url}")
+        self._host = url.hostname or "127.0.0.1"
+        self._port = url.port or 6379
+        self._password = unquote(url.password) if url.password else None
+        self._publisher: Optional[asyncio.StreamWriter] = None
+        self._publisher_reader: Optional[asyncio.StreamReader] = None
+        self._publish_lock = asyncio.Lock()
+        self._subscriber: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+        self.reconnects = 0
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection(self._host, self._port)
+        if self._password:
+            writer.write(encode_command("AUTH", self._password))
+            await _read_reply(reader)
+        return reader, writer
+
+    async def start(self, deliver: Deliver) -> None:
+        self._subscriber = asyncio.get_running_loop().create_task(
+            self._subscribe_loop(deliver), context=detached_context()
+        )
+        # Ждем первой подписки, чтобы не пропустить события сразу после старта
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), timeout=self.config.reconnect_delay * 5)
+        except asyncio.TimeoutError:
+            log.warning("Coherence bus: Redis at %s:%d is not reachable yet", self._host, self._port)
+
+    async def _subscribe_loop(self, deliver: Deliver) -> None:
+        while True:
+            writer = None
+            try:
+                reader, writer = await self._connect()
+                writer.write(encode_command("SUBSCRIBE", self.config.channel))
+                await _read_reply(reader)  # ["subscribe", channel, 1]
+                if self._subscribed.is_set():
+                    self.reconnects += 1
+                    log.info("Coherence bus: resubscribed to %s", self.config.channel)
+                self._subscribed.set()
+                while True:
+                    reply = await _read_reply(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                        await deliver(reply[2])
+            except (OSError, asyncio.IncompleteReadError) as e:
+                log.warning("Coherence bus subscription lost: %s", e)
+            finally:
+                if writer is not None:
+                    writer.close()
+            await asyncio.sleep(self.config.reconnect_delay)
+
+    async def publish(self, payload: bytes) -> None:
+        async with self._publish_lock:
+            if self._publisher is None or self._publisher.is_closing():
+                self._publisher_reader, self._publisher = await self._connect()
+            try:
+                self._publisher.write(encode_command("PUBLISH", self.config.channel, payload))
+                await _read_reply(self._publisher_reader)
+            except (OSError, asyncio.IncompleteReadError) as e:
+                self._publisher.close()
+                self._publisher = None
+                raise ConnectionResetError(f"Redis publish failed: {e}") from e
+
+    async def close(self) -> None:
+        if self._subscriber is not None:
+            self._subscriber.cancel()
+            await asyncio.gather(self._subscriber, return_exceptions=True)
+        if self._publisher is not None:
+            self._publisher.close()
+            self._publisher = None
+
+
+_BACKENDS: Dict[str, Type[Any]] = {
+    "memory": InProcessTransport,
+    "redis": RedisTransport,
+}
+
+
+def create_transport(config: CoherenceConfig):
+    """Создает транспорт по config.backend."""
+    if config.backend not in _BACKENDS:
+        raise ValueError(f"Unknown coherence bus backend: {config.backend}")
+    return _BACKENDS[config.backend](config)
+
+
+# ─── Шина ────────────────────────────────────────────────────────────
+
+
+class CoherenceBus:
+    """Публикация изменений пользователей и применение изменений других реплик."""
+
+    def __init__(
+        self, config: CoherenceConfig, apply: Callable[[List[Dict[str, Any]]], Awaitable[None]]
+    ):
+        """
+        Args:
+            apply: Применяет события другой реплики к локальному кешу
+        """
+        self.config = config
+        self.origin = uuid.uuid4().hex
+        self._apply = apply
+        self._transport = None
+        self._pending: Dict[int, Dict[str, Any]] = {}  # telegram_id → событие
+        self._sender: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()  # набрался max_batch — отправить, не дожидаясь интервала
+        self.published = 0
+        self.coalesced = 0  # события, слитые с уже ожидающим событием того же пользователя
+        self.messages_sent = 0
+        self.received = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._transport is not None
+
+    async def start(self) -> None:
+        if self._transport is not None:
+            return
+        transport = create_transport(self.config)
+        await transport.start(self._receive)
+        self._transport = transport
+        log.info("Coherence bus started: backend=%s, channel=%s", transport.name, self.config.channel)
+
+    async def close(self) -> None:
+        """Отправляет накопленные события и отключается."""
+        if self._transport is None:
+            return
+        self._ready.set()
+        while self._sender is not None and not self._sender.done():
+            await asyncio.wait([self._sender])
+        await self._transport.close()
+        self._transport = None
+
+    # ------------------------------------------
+    # Публикация
+    # ------------------------------------------
+
+    def publish(
+        self,
+        telegram_id: int,
+        fields: Optional[Dict[str, Any]],
+        version: Optional[int] = None,
+    ) -> None:
+        """
+        Ставит изменение пользователя в очередь на публикацию.
+
+        Args:
+            fields: Новые значения полей; None — запись нужно вытеснить
+            version: Версия записи на сервере, если известна
+        """
+        if self._transport is None:
+            return
+        self.published += 1
+        pending = self._pending.get(telegram_id)
+        if pending is not None:
+            self.coalesced += 1
+            if pending["fields"] is None:
+                # Получатели вытеснят запись — обновления после этого им не нужны
+                fields = None
+            elif fields is not None:
+                fields = {**pending["fields"], **fields}
+            if version is None:
+                version = pending.get("version")
+        event: Dict[str, Any] = {"telegram_id": telegram_id, "fields": fields}
+        if version is not None:
+            event["version"] = version
+        self._pending[telegram_id] = event
+        if len(self._pending) >= self.config.max_batch:
+            self._ready.set()
+        if self._sender is None or self._sender.done():
+            self._sender = asyncio.get_running_loop().create_task(
+                self._send_loop(), context=detached_context()
+            )
+
+    async def _send_loop(self) -> None:
+        while self._pending:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=self.config.batch_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._ready.clear()
+            events = list(self._pending.values())
+            self._pending = {}
+            for start in range(0, len(events), self.config.max_batch):
+                await self._send(events[start : start + self.config.max_batch])
+
+    async def _send(self, events: List[Dict[str, Any]]) -> None:
+        payload = json.dumps(
+            {"origin": self.origin, "events": events}, ensure_ascii=False, default=str
+        ).encode("utf-8")
+        try:
+            await self._transport.publish(payload)
+            self.messages_sent += 1
+        except OSError as e:
+            # Согласованность — best effort: копии других реплик устареют до idle_ttl
+            self.errors += 1
+            log.warning("Coherence bus: dropped %d events: %s", len(events), e)
+
+    # ------------------------------------------
+    # Получение
+    # ------------------------------------------
+
+    async def _receive(self, payload: bytes) -> None:
+        try:
+            message = json.loads(payload)
+            origin, events = message["origin"], message["events"]
+        except (ValueError, KeyError, TypeError):
+            self.errors += 1
+            log.warning("Coherence bus: skipping malformed message")
+            return
+        if origin == self.origin:
+            return
+        self.received += len(events)
+        try:
+            await self._apply(events)
+        except Exception:
+            self.errors += 1
+            log.exception("Coherence bus: failed to apply %d events", len(events))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self._transport is not None,
+            "published": self.published,
+            "coalesced": self.coalesced,
+            "messages_sent": self.messages_sent,
+            "received": self.received,
+            "errors": self.errors,
+        }
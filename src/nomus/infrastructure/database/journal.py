@@ -0,0 +1,225 @@
+"""
+Журнал (write-ahead log) изменений RemoteStorage.
+
+Каждое изменение пользователя или заказа дописывается в файл строкой JSON
+с полным состоянием записи, до того как обработчик продолжит работу.
+Записи, пришедшие за время одного fsync, сбрасываются на диск вместе
+(group commit) — один fsync на пачку, а не на каждое изменение.
+
+Перед flush активный файл «запечатывается» (rotate) — переименовывается в
+<path>.<номер>, новые изменения пишутся в свежий файл. Если flush отправил
+все записи, запечатанные сегменты удаляются; если нет — остаются до
+следующего успешного flush. При старте все сегменты и активный файл
+воспроизводятся по порядку (replay), последняя версия записи побеждает.
+
+Формат строки:
+    {"kind": "user" | "order", "id": <telegram_id | order_id>, "data": {...} | null}
+data = null — запись удалена.
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from nomus.common.deadline import detached_context
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class JournalConfig:
+    """Параметры журнала изменений."""
+
+    enabled: bool = False
+    path: str = "data/remote_storage.wal"
+    fsync: bool = True  # False — только write(), быстрее, но не переживает сбой ОС
+    commit_delay: float = 0.0  # секунды; подождать попутные изменения перед fsync
+
+
+@dataclass
+class JournalEntry:
+    kind: str  # user | order
+    id: Any
+    data: Optional[Dict[str, Any]]  # None — запись удалена
+
+
+class Journal:
+    """Append-only журнал с group commit и запечатываемыми сегментами."""
+
+    def __init__(self, config: JournalConfig):
+        self.config = config
+        self._file: Optional[IO[bytes]] = None
+        self._buffer: List[Tuple[bytes, asyncio.Future]] = []
+        self._writer: Optional[asyncio.Task] = None
+        self._io_lock = asyncio.Lock()
+        self._next_segment = 1
+        self.appends = 0
+        self.commits = 0  # fsync'и; appends / commits — средний размер группы
+        self.errors = 0
+        self.truncations = 0
+
+    # ------------------------------------------
+    # Файлы
+    # ------------------------------------------
+
+    def _segments(self) -> List[str]:
+        """Запечатанные сегменты в порядке записи."""
+        segments = []
+        for name in glob.glob(glob.escape(self.config.path) + ".*"):
+            suffix = name.rsplit(".", 1)[1]
+            if suffix.isdigit():
+                segments.append((int(suffix), name))
+        return [name for _, name in sorted(segments)]
+
+    def open(self) -> List[JournalEntry]:
+        """
+        Открывает журнал и возвращает записи, оставшиеся с прошлого запуска.
+
+        Недописанная последняя строка (сбой посреди записи) пропускается.
+        """
+        directory = os.path.dirname(self.config.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        segments = self._segments()
+        if segments:
+            self._next_segment = int(segments[-1].rsplit(".", 1)[1]) + 1
+        entries = []
+        for name in segments + [self.config.path]:
+            entries.extend(self._read(name))
+        self._file = open(self.config.path, "ab")
+        if entries:
+            log.info(
+                "Journal %s: replaying %d changes from %d files",
+                self.config.path,
+                len(entries),
+                len(segments) + 1,
+            )
+        return entries
+
+    @staticmethod
+    def _read(name: str) -> Iterator[JournalEntry]:
+        try:
+            with open(name, "rb") as f:
+                for number, line in enumerate(f, 1):
+                    try:
+                        item = json.loads(line)
+                        yield JournalEntry(item["kind"], item["id"], item["data"])
+                    except (ValueError, KeyError, TypeError):
+                        log.warning("Journal %s: skipping corrupted line %d", name, number)
+        except FileNotFoundError:
+            return
+
+    async def close(self) -> None:
+        """Дожидается записи буфера и закрывает файл."""
+        while self._writer is not None and not self._writer.done():
+            await asyncio.wait([self._writer])
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # ------------------------------------------
+    # Запись
+    # ------------------------------------------
+
+    async def append(self, kind: str, record_id: Any, data: Optional[Dict[str, Any]]) -> None:
+        """Дописывает изменение и ждет, пока оно попадет на диск."""
+        if self._file is None:
+            return
+        line = json.dumps(
+            {"kind": kind, "id": record_id, "data": data}, ensure_ascii=False, default=str
+        ).encode("utf-8")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._buffer.append((line + b"\n", future))
+        self.appends += 1
+        if self._writer is None or self._writer.done():
+            self._writer = loop.create_task(self._commit_loop(), context=detached_context())
+        try:
+            # shield: отмена обработчика не должна оборвать общий fsync группы
+            await asyncio.shield(future)
+        except OSError as e:
+            # Изменение остается в памяти и уйдет в remote API при flush,
+            # но сбой процесса до flush его потеряет
+            log.error("Journal write failed, change is kept in memory only: %s", e)
+
+    async def _commit_loop(self) -> None:
+        while self._buffer:
+            if self.config.commit_delay > 0:
+                await asyncio.sleep(self.config.commit_delay)
+            async with self._io_lock:
+                batch, self._buffer = self._buffer, []
+                try:
+                    await asyncio.to_thread(self._write, b"".join(line for line, _ in batch))
+                except OSError as e:
+                    self.errors += 1
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                self.commits += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    def _write(self, data: bytes) -> None:
+        assert self._file is not None
+        self._file.write(data)
+        self._file.flush()
+        if self.config.fsync:
+            os.fsync(self._file.fileno())
+
+    # ------------------------------------------
+    # Сегменты и flush
+    # ------------------------------------------
+
+    async def rotate(self) -> None:
+        """
+        Запечатывает активный файл; следующие изменения пишутся в новый.
+
+        Вызывается перед тем, как flush забирает dirty-записи: все, что
+        попало в запечатанные сегменты, к этому моменту уже помечено dirty
+        и будет отправлено этим flush.
+        """
+        if self._file is None:
+            return
+        async with self._io_lock:
+            await asyncio.to_thread(self._rotate)
+
+    def _rotate(self) -> None:
+        assert self._file is not None
+        if self._file.tell() == 0:
+            return
+        self._file.close()
+        os.replace(self.config.path, f"{self.config.path}.{self._next_segment:06d}")
+        self._next_segment += 1
+        self._file = open(self.config.path, "ab")
+
+    async def truncate_sealed(self) -> None:
+        """Удаляет запечатанные сегменты — их изменения доставлены."""
+        if self._file is None:
+            return
+        async with self._io_lock:
+            segments = await asyncio.to_thread(self._remove_segments)
+        if segments:
+            self.truncations += 1
+            log.debug("Journal: removed %d sealed segments", segments)
+
+    def _remove_segments(self) -> int:
+        segments = self._segments()
+        for name in segments:
+            os.remove(name)
+        return len(segments)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self._file is not None,
+            "appends": self.appends,
+            "commits": self.commits,
+            "errors": self.errors,
+            "truncations": self.truncations,
+            "sealed_segments": len(self._segments()) if self._file is not None else 0,
+        }
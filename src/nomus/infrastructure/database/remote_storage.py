@@ -1,12 +1,73 @@
+import asyncio
 import logging
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List, Set
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+from nomus.common.deadline import detached_context
+from nomus.common.idempotency import new_idempotency_key
 from nomus.domain.interfaces.repo_interface import IStorageRepository
+from nomus.infrastructure.database.bulk_sync import (
+    BULK_UNSUPPORTED_STATUSES,
+    BulkCapabilities,
+    BulkSyncConfig,
+    Record,
+    chunk_records,
+)
+from nomus.infrastructure.database.cache_warmup import CacheWarmup, WarmupConfig
+from nomus.infrastructure.database.coherence import CoherenceBus, CoherenceConfig
+from nomus.infrastructure.database.journal import Journal, JournalConfig, JournalEntry
 from nomus.infrastructure.database.memory_storage import MemoryStorage
-from nomus.infrastructure.services.remote_api_client import RemoteApiClient, RemoteApiError
+from nomus.infrastructure.database.user_cache import (
+    NegativeCache,
+    UserCacheConfig,
+    UserCacheIndex,
+    VersionStamps,
+)
+from nomus.infrastructure.database.write_behind import WriteBehindConfig, WriteBehindFlusher
+from nomus.infrastructure.services.remote_api_client import (
+    RemoteApiAuthError,
+    RemoteApiClient,
+    RemoteApiError,
+    RemoteApiValidationError,
+)
+from nomus.infrastructure.services.single_flight import SingleFlight
 
 log: logging.Logger = logging.getLogger(__name__)
 
+# PATCH /users/{id} недоступен или пользователя нет на сервере — регистрируем целиком
+_DELTA_FALLBACK_STATUSES = frozenset({404, 405})
+
+# Bulk-запрос не принят целиком — отправляем записи пачки по одной
+_BULK_FALLBACK_STATUSES = frozenset({400, 422}) | BULK_UNSUPPORTED_STATUSES
+
+
+def _server_user_id(user: Dict[str, Any]) -> Optional[int]:
+    """
+    ID пользователя на сервере NMservices.
+
+    Записи, созданные регистрацией в боте, хранят его в server_user_id, а их
+    id — это telegram_id; загруженные с сервера — в id. Если server_user_id
+    есть, но пуст (регистрация на сервере не прошла), id сервера неизвестен.
+    """
+    if "server_user_id" in user:
+        return user["server_user_id"]
+    return user.get("id")
+
+
+@dataclass
+class RemoteStorageConfig:
+    """Параметры RemoteStorage."""
+
+    write_behind: WriteBehindConfig = field(default_factory=WriteBehindConfig)
+    # Сколько записей синхронизировать параллельно; 0 — по числу keep-alive соединений пула
+    flush_concurrency: int = 0
+    bulk: BulkSyncConfig = field(default_factory=BulkSyncConfig)
+    journal: JournalConfig = field(default_factory=JournalConfig)
+    user_cache: UserCacheConfig = field(default_factory=UserCacheConfig)
+    warmup: WarmupConfig = field(default_factory=WarmupConfig)
+    coherence: CoherenceConfig = field(default_factory=CoherenceConfig)
+
 
 class RemoteStorage(IStorageRepository):
     """
@@ -16,46 +77,340 @@ class RemoteStorage(IStorageRepository):
     Применяет Write-Behind Cache Pattern:
     - Все операции сначала выполняются в локальном кеше (быстро)
     - Изменения помечаются как "dirty"
+    - Фоновая задача (start()) вызывает flush() по интервалу или порогу
+      числа изменений; flush() можно вызвать и явно
     - При вызове flush() все изменения отправляются в remote API
+    - Кеш пользователей ограничен по размеру и времени простоя (LRU,
+      config.user_cache); пользователи с несохраненными изменениями не
+      вытесняются
+    - С журналом (config.journal) изменения сначала пишутся на диск и
+      переживают перезапуск: start() воспроизводит их, успешный flush
+      удаляет отправленную часть журнала
+    - С прогревом (config.warmup) start() заранее загружает в кеш недавно
+      активных пользователей
+    - invalidate_user() применяет события об изменениях на сервере: запись
+      вытесняется (или перезагружается), события старее примененной версии
+      игнорируются
+    - С шиной согласованности (config.coherence) изменения пользователей
+      рассылаются другим репликам бота, и их кеши обновляются без запросов
+      к NMservices
     """
 
-    def __init__(self, api_client: RemoteApiClient):
+    def __init__(self, api_client: RemoteApiClient, config: Optional[RemoteStorageConfig] = None):
+        self.config = config or RemoteStorageConfig()
         self._cache = MemoryStorage()  # Композиция, не наследование!
         self._api_client = api_client
         self._dirty_users: Set[int] = set()  # Пользователи, требующие синхронизации
+        # Измененные поля dirty-пользователей; None — нужна полная регистрация
+        self._changed_fields: Dict[int, Optional[Set[str]]] = {}
+        self._flushing_users: Set[int] = set()  # отправляются идущим flush
+        self._user_index = UserCacheIndex(self.config.user_cache)
+        self._not_found = NegativeCache(self.config.user_cache)  # 404 по telegram_id
+        self._loads = SingleFlight()  # загрузки пользователей из remote API
+        # Метка каждой идущей загрузки; инвалидация снимает метку, и устаревший ответ не кешируется
+        self._load_tokens: Dict[int, object] = {}
+        self._versions = VersionStamps(self.config.user_cache)
+        # Изменены на сервере, но вытеснить нельзя (есть неотправленные изменения) — после flush
+        self._stale_users: Set[int] = set()
         self._dirty_orders: Set[str] = set()  # Заказы, требующие синхронизации
+        self._flush_lock = asyncio.Lock()
+        self._flusher = WriteBehindFlusher(
+            self.config.write_behind, self.flush, self.dirty_count
+        )
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._bulk = BulkCapabilities(self.config.bulk, api_client)
+        self._journal = Journal(self.config.journal)
+        self._warmup = CacheWarmup(
+            self.config.warmup,
+            api_client,
+            self._warm_user,
+            limit=self.config.warmup.max_users or self.config.user_cache.max_users,
+        )
+        self._coherence = CoherenceBus(self.config.coherence, self._apply_replica_events)
+        self._flush_stats: Dict[str, float] = {
+            "synced": 0,
+            "failed": 0,  # временные ошибки — запись снова dirty
+            "dropped": 0,  # сервер отверг данные (4xx) — повтор не поможет
+            "deltas": 0,  # пользователи, синхронизированные PATCH'ем измененных полей
+            "bulk_requests": 0,
+            "bulk_fallbacks": 0,  # пачки, отправленные по одной записи
+            "last_records": 0,
+            "last_duration_ms": 0.0,
+        }
+        self._invalidation_stats: Dict[str, int] = {
+            "evicted": 0,
+            "refreshed": 0,
+            "deferred": 0,
+            "stale": 0,
+            "not_cached": 0,
+        }
+        self._replica_stats: Dict[str, int] = {"applied": 0, "evicted": 0, "skipped": 0}
+
+    # ==========================================
+    # Lifecycle
+    # ==========================================
+
+    async def start(self) -> None:
+        """
+        Воспроизводит журнал (если включен) и запускает фоновую синхронизацию.
+
+        Изменения из журнала снова помечаются dirty и отправляются первым flush.
+        """
+        if self.config.journal.enabled:
+            entries = await asyncio.to_thread(self._journal.open)
+            await self._replay(entries)
+        if self.config.write_behind.enabled:
+            self._flusher.start()
+            log.info(
+                "RemoteStorage write-behind started: interval=%.1fs, max_dirty=%d",
+                self.config.write_behind.interval,
+                self.config.write_behind.max_dirty,
+            )
+            if self.dirty_count():
+                self._flusher.trigger()
+        if self.config.coherence.enabled:
+            await self._coherence.start()
+        if self.config.warmup.enabled:
+            self._warmup.start()
+            if self.config.warmup.ready_percent > 0:
+                ready = await self._warmup.wait_ready()
+                log.info(
+                    "RemoteStorage cache warm-up: %.1f%% of active users loaded%s",
+                    self._warmup.percent,
+                    "" if ready else " (timed out, continuing in background)",
+                )
+
+    async def close(self) -> None:
+        """Останавливает фоновую синхронизацию и отправляет оставшиеся изменения."""
+        await self._warmup.stop()
+        await self._coherence.close()
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        await self._flusher.stop()
+        await self._journal.close()
+
+    def request_flush(self) -> None:
+        """
+        Просит синхронизировать изменения в фоне, не задерживая обработчик.
+
+        Если фоновая задача не запущена, flush() выполняется отдельной задачей.
+        """
+        if self._flusher.running:
+            self._flusher.trigger()
+            return
+        task = asyncio.get_running_loop().create_task(self.flush(), context=detached_context())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def dirty_count(self) -> int:
+        """Число записей, ожидающих синхронизации."""
+        return len(self._dirty_users) + len(self._dirty_orders)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики фоновой синхронизации."""
+        return {
+            "write_behind": self._flusher.snapshot(),
+            "flush": dict(self._flush_stats),
+            "bulk": self._bulk.snapshot(),
+            "journal": self._journal.snapshot(),
+            "user_cache": self._user_index.snapshot(),
+            "not_found_cache": self._not_found.snapshot(),
+            "user_loads": self._loads.snapshot(),
+            "warmup": self._warmup.snapshot(),
+            "invalidation": {**self._invalidation_stats, "versions": self._versions.snapshot()},
+            "coherence": {**self._coherence.snapshot(), **self._replica_stats},
+        }
+
+    def _mark_user_dirty(self, telegram_id: int, fields: Optional[Set[str]] = None) -> None:
+        """
+        Помечает пользователя dirty.
+
+        Args:
+            fields: Измененные поля; None — отправить пользователя целиком
+        """
+        self._merge_changed_fields(telegram_id, fields)
+        self._dirty_users.add(telegram_id)
+        self._flusher.notify()
+
+    def _merge_changed_fields(self, telegram_id: int, fields: Optional[Set[str]]) -> None:
+        if telegram_id in self._dirty_users:
+            current = self._changed_fields.get(telegram_id)
+            fields = None if current is None or fields is None else current | fields
+        self._changed_fields[telegram_id] = fields
+
+    def _forget_fields(self, telegram_id: int, fields: Set[str]) -> None:
+        """Снимает поля с синхронизации — они уже отправлены на сервер."""
+        current = self._changed_fields.get(telegram_id)
+        if telegram_id not in self._dirty_users or current is None:
+            return
+        current -= fields
+        if not current:
+            self._dirty_users.discard(telegram_id)
+            del self._changed_fields[telegram_id]
+
+    def _mark_order_dirty(self, order_id: str) -> None:
+        self._dirty_orders.add(order_id)
+        self._flusher.notify()
+
+    def _is_user_pinned(self, telegram_id: int) -> bool:
+        return telegram_id in self._dirty_users or telegram_id in self._flushing_users
+
+    async def _touch_user(self, telegram_id: int) -> None:
+        """Отмечает обращение к пользователю и вытесняет лишних из кеша."""
+        self._user_index.touch(telegram_id)
+        await self._evict_users()
+
+    async def _evict_users(self) -> None:
+        for telegram_id in self._user_index.pop_evictable(self._is_user_pinned):
+            await self._cache.delete_user(telegram_id)
+        for telegram_id in [t for t in self._stale_users if not self._is_user_pinned(t)]:
+            # Изменения отправлены — теперь серверную версию можно загрузить заново
+            self._stale_users.discard(telegram_id)
+            await self._drop_user(telegram_id)
+
+    async def _drop_user(self, telegram_id: int) -> None:
+        """Убирает пользователя из кеша без синхронизации с сервером."""
+        await self._cache.delete_user(telegram_id)
+        self._user_index.discard(telegram_id)
+
+    async def _warm_user(self, user: Dict[str, Any]) -> None:
+        """Кладет в кеш пользователя, загруженного прогревом."""
+        telegram_id = user["telegram_id"]
+        # Уже в кеше — локальная версия не старее (и может быть не отправлена)
+        if await self._cache.get_user_by_telegram_id(telegram_id) is not None:
+            return
+        await self._cache.save_or_update_user(telegram_id, dict(user))
+        self._not_found.discard(telegram_id)
+        await self._touch_user(telegram_id)
+
+    async def _user_changed(self, telegram_id: int, fields: Optional[Set[str]]) -> None:
+        """
+        Помечает пользователя dirty, рассылает изменение другим репликам и
+        пишет текущее состояние пользователя в журнал.
+        """
+        self._mark_user_dirty(telegram_id, fields)
+        self._not_found.discard(telegram_id)
+        await self._touch_user(telegram_id)
+        user = await self._cache.get_user_by_telegram_id(telegram_id)
+        if user and self._coherence.running:
+            changed = user if fields is None else {k: user[k] for k in fields if k in user}
+            self._coherence.publish(telegram_id, self._serialize_for_json(changed))
+        if self.config.journal.enabled:
+            await self._journal.append(
+                "user", telegram_id, self._serialize_for_json(user) if user else None
+            )
+
+    async def _order_changed(self, order_id: str) -> None:
+        """Помечает заказ dirty и пишет его текущее состояние в журнал."""
+        self._mark_order_dirty(order_id)
+        if self.config.journal.enabled:
+            order = await self._cache.get_order_by_id(order_id)
+            await self._journal.append(
+                "order", order_id, self._serialize_for_json(order) if order else None
+            )
+
+    async def _replay(self, entries: List[JournalEntry]) -> None:
+        """Восстанавливает кеш и dirty-записи из журнала."""
+        for entry in entries:
+            if entry.kind == "user":
+                if entry.data is None:
+                    await self._cache.delete_user(entry.id)
+                    self._dirty_users.discard(entry.id)
+                    self._changed_fields.pop(entry.id, None)
+                    self._user_index.discard(entry.id)
+                else:
+                    await self._cache.save_or_update_user(entry.id, entry.data)
+                    # Какие поля менялись, журнал не хранит — отправляем целиком
+                    self._mark_user_dirty(entry.id)
+                    self._user_index.touch(entry.id)
+            elif entry.kind == "order" and entry.data is not None:
+                await self._cache.save_or_update_order(entry.id, entry.data)
+                self._dirty_orders.add(entry.id)
+        if entries:
+            log.info(
+                "Restored %d users and %d orders from journal",
+                len(self._dirty_users),
+                len(self._dirty_orders),
+            )
 
     # ==========================================
     # IUserRepository implementation
     # ==========================================
 
+    async def _changed_user_fields(
+        self, telegram_id: int, data: Dict[str, Any]
+    ) -> Optional[Set[str]]:
+        """Поля data, отличающиеся от кеша; None — пользователя в кеше нет."""
+        current = await self._cache.get_user_by_telegram_id(telegram_id)
+        if current is None:
+            return None
+        return {key for key, value in data.items() if key not in current or current[key] != value}
+
     async def save_or_update_user(self, telegram_id: int, data: Dict[str, Any]) -> None:
-        """Сохраняет пользователя в кеш и помечает для синхронизации"""
+        """Сохраняет пользователя в кеш и помечает измененные поля для синхронизации"""
+        fields = await self._changed_user_fields(telegram_id, data)
         await self._cache.save_or_update_user(telegram_id, data)
-        self._dirty_users.add(telegram_id)
-        log.debug("User %s saved to cache and marked dirty", telegram_id)
+        if fields is not None and not fields:
+            await self._touch_user(telegram_id)
+            log.debug("User %s saved to cache, nothing changed", telegram_id)
+            return
+        await self._user_changed(telegram_id, fields)
+        log.debug("User %s saved to cache and marked dirty: %s", telegram_id, fields or "all fields")
 
     async def get_user_by_phone(self, phone: str) -> Dict[str, Any] | None:
         """Получает пользователя из кеша по телефону"""
-        return await self._cache.get_user_by_phone(phone)
+        user = await self._cache.get_user_by_phone(phone)
+        if user and user.get("telegram_id") is not None:
+            await self._touch_user(user["telegram_id"])
+        return user
 
     async def get_user_by_telegram_id(self, telegram_id: int) -> Dict[str, Any] | None:
         """Получает пользователя из кеша или remote API (Read-Through)"""
         # 1. Проверяем кеш
         user = await self._cache.get_user_by_telegram_id(telegram_id)
         if user:
+            self._user_index.hits += 1
+            await self._touch_user(telegram_id)
             return user
+        self._user_index.misses += 1
+
+        # 2. Недавно сервер ответил, что такого пользователя нет
+        if telegram_id in self._not_found:
+            return None
 
-        # 2. Если нет в кеше, пробуем загрузить с сервера
+        # 3. Если нет в кеше, загружаем с сервера — одна загрузка на telegram_id,
+        # одновременные вызовы ждут ее результат
+        return await self._loads.do(("user", telegram_id), lambda: self._load_user(telegram_id))
+
+    async def _load_user(self, telegram_id: int) -> Dict[str, Any] | None:
+        """Загружает пользователя из remote API в кеш."""
+        token = self._load_tokens[telegram_id] = object()
         try:
             user = await self._api_client.get(f"/users/by-telegram/{telegram_id}")
+            cached = await self._cache.get_user_by_telegram_id(telegram_id)
+            if cached:
+                # Пока шел запрос, пользователя сохранили локально — его данные новее
+                return cached
+            if user and self._load_tokens.get(telegram_id) is not token:
+                # Пока шел запрос, пришла инвалидация — ответ мог устареть, не кешируем
+                return dict(user)
             if user:
-                # Сохраняем в кеш, но не помечаем как dirty (данные свежие)
-                await self._cache.save_or_update_user(telegram_id, user)
+                # Сохраняем в кеш, но не помечаем как dirty (данные свежие).
+                # Копия: ответ API может быть общим для нескольких вызывающих (single-flight)
+                await self._cache.save_or_update_user(telegram_id, dict(user))
+                await self._touch_user(telegram_id)
                 log.debug("User %s loaded from remote API", telegram_id)
-                return user
+                return await self._cache.get_user_by_telegram_id(telegram_id)
         except RemoteApiError as e:
-            log.warning("Failed to load user %s from remote: %s", telegram_id, e)
+            if e.status_code == 404:
+                # Незарегистрированный пользователь — не спрашиваем сервер до negative_ttl
+                self._not_found.add(telegram_id)
+                log.debug("User %s not found on remote", telegram_id)
+            else:
+                log.warning("Failed to load user %s from remote: %s", telegram_id, e)
+        finally:
+            if self._load_tokens.get(telegram_id) is token:
+                del self._load_tokens[telegram_id]
 
         return None
 
@@ -68,6 +423,8 @@ class RemoteStorage(IStorageRepository):
         # 1. Проверяем кеш
         lang = await self._cache.get_user_language(telegram_id)
         if lang:
+            self._user_index.hits += 1
+            await self._touch_user(telegram_id)
             return lang
 
         # 2. Если нет в кеше — загружаем пользователя с сервера
@@ -105,17 +462,21 @@ class RemoteStorage(IStorageRepository):
 
         При смене языка:
         1. Обновляет язык в локальном кеше
-        2. Если у пользователя есть server_user_id, сразу синхронизирует с сервером
+        2. Если известен id пользователя на сервере, сразу синхронизирует с сервером
         """
+        fields = await self._changed_user_fields(telegram_id, {"language_code": language_code})
         result = await self._cache.update_user_language(telegram_id, language_code)
-        if result:
-            self._dirty_users.add(telegram_id)
+        if result and fields != set():
+            await self._user_changed(telegram_id, fields)
             log.debug("User %s language updated in cache and marked dirty", telegram_id)
 
-            # Синхронизируем с сервером сразу, если есть server_user_id
+            # Синхронизируем с сервером сразу, если известен id на сервере
             user = await self._cache.get_user_by_telegram_id(telegram_id)
-            if user and user.get("server_user_id"):
-                await self.update_language_on_server(user["server_user_id"], language_code)
+            server_user_id = _server_user_id(user) if user else None
+            if server_user_id:
+                if await self.update_language_on_server(server_user_id, language_code):
+                    # Язык уже на сервере — flush'у его отправлять не нужно
+                    self._forget_fields(telegram_id, {"language_code"})
 
         return result
 
@@ -125,10 +486,141 @@ class RemoteStorage(IStorageRepository):
         if result:
             # Удаляем из dirty set, если был там
             self._dirty_users.discard(telegram_id)
+            self._changed_fields.pop(telegram_id, None)
+            self._user_index.discard(telegram_id)
+            self._stale_users.discard(telegram_id)
+            self._coherence.publish(telegram_id, None)
+            if self.config.journal.enabled:
+                await self._journal.append("user", telegram_id, None)
             # TODO: добавить синхронизацию удаления с remote API
             log.warning("User %s deleted from cache, but remote deletion not implemented", telegram_id)
         return result
 
+    # ==========================================
+    # Invalidation
+    # ==========================================
+
+    async def invalidate_user(
+        self,
+        telegram_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        version: Optional[int] = None,
+        refresh: bool = False,
+    ) -> str:
+        """
+        Применяет событие NMservices «пользователь изменен на сервере».
+
+        Args:
+            telegram_id: Пользователь по telegram_id
+            user_id: Пользователь по id на сервере (если telegram_id не указан)
+            version: Версия записи на сервере; событие не новее уже
+                примененной версии (или версии в кеше) игнорируется
+            refresh: Сразу загрузить свежую версию, а не при следующем обращении
+
+        Returns:
+            evicted | refreshed | deferred (вытеснится после flush) | stale | not_cached
+        """
+        if telegram_id is None:
+            telegram_id = self._telegram_id_by_user_id(user_id)
+            if telegram_id is None:
+                return self._invalidation_outcome("not_cached")
+        cached = await self._cache.get_user_by_telegram_id(telegram_id)
+        if version is not None:
+            cached_version = cached.get("version") if cached else None
+            if isinstance(cached_version, int) and version <= cached_version:
+                return self._invalidation_outcome("stale")
+            if not self._versions.advance(telegram_id, version):
+                return self._invalidation_outcome("stale")
+
+        outcome = await self._invalidate_cached_user(telegram_id, cached is not None, refresh)
+        # Другие реплики получают свежие данные, а если их нет — вытесняют свою копию
+        fresh = None
+        if outcome == "refreshed":
+            fresh = await self._cache.get_user_by_telegram_id(telegram_id)
+        self._coherence.publish(
+            telegram_id, self._serialize_for_json(fresh) if fresh else None, version
+        )
+        return self._invalidation_outcome(outcome)
+
+    async def _invalidate_cached_user(self, telegram_id: int, cached: bool, refresh: bool) -> str:
+        # Пользователь мог появиться на сервере
+        self._not_found.discard(telegram_id)
+        self._forget_remote_copies(telegram_id)
+        if not cached:
+            return "not_cached"
+        if self._is_user_pinned(telegram_id):
+            self._stale_users.add(telegram_id)
+            return "deferred"
+        await self._drop_user(telegram_id)
+        if refresh:
+            user = await self._loads.do(("user", telegram_id), lambda: self._load_user(telegram_id))
+            if user is not None:
+                return "refreshed"
+        return "evicted"
+
+    def _forget_remote_copies(self, telegram_id: int) -> None:
+        """
+        Забывает полученные с сервера копии пользователя вне кеша: идущую
+        загрузку и ответ в HTTP-кеше клиента — иначе следующая загрузка
+        вернет старые данные.
+        """
+        if self._load_tokens.pop(telegram_id, None) is not None:
+            self._loads.forget(("user", telegram_id))
+        self._api_client.invalidate_cached(f"/users/by-telegram/{telegram_id}")
+
+    def _invalidation_outcome(self, outcome: str) -> str:
+        self._invalidation_stats[outcome] += 1
+        return outcome
+
+    async def _apply_replica_events(self, events: List[Dict[str, Any]]) -> None:
+        """
+        Применяет изменения пользователей, сделанные другой репликой.
+
+        Обновляются только пользователи, которые уже есть в кеше; они не
+        помечаются dirty — на сервер их отправляет реплика-источник. Поля
+        с неотправленными локальными изменениями не перезаписываются.
+        """
+        for event in events:
+            telegram_id = event["telegram_id"]
+            version = event.get("version")
+            if version is not None and not self._versions.advance(telegram_id, version):
+                self._replica_stats["skipped"] += 1
+                continue
+            self._not_found.discard(telegram_id)
+            # Серверная копия изменилась — загрузка не должна вернуть старый ответ
+            self._forget_remote_copies(telegram_id)
+            cached = await self._cache.get_user_by_telegram_id(telegram_id)
+            if cached is None:
+                continue
+            fields = event.get("fields")
+            if fields is None:
+                if self._is_user_pinned(telegram_id):
+                    self._stale_users.add(telegram_id)
+                else:
+                    await self._drop_user(telegram_id)
+                self._replica_stats["evicted"] += 1
+                continue
+            local: Optional[Set[str]] = set()
+            if telegram_id in self._dirty_users:
+                local = self._changed_fields.get(telegram_id)
+            if local is None:
+                # Локально ждет полная регистрация — ее данные перезапишут сервер
+                self._replica_stats["skipped"] += 1
+                continue
+            changes = {k: v for k, v in fields.items() if k not in local}
+            if not changes:
+                self._replica_stats["skipped"] += 1
+                continue
+            await self._cache.save_or_update_user(telegram_id, changes)
+            self._replica_stats["applied"] += 1
+
+    def _telegram_id_by_user_id(self, user_id: Optional[int]) -> Optional[int]:
+        # Линейный поиск: события инвалидации редки по сравнению с чтениями
+        for telegram_id, user in self._cache.users.items():
+            if _server_user_id(user) == user_id:
+                return telegram_id
+        return None
+
     # ==========================================
     # IOrderRepository implementation
     # ==========================================
@@ -136,7 +628,7 @@ class RemoteStorage(IStorageRepository):
     async def save_or_update_order(self, order_id: str, data: Dict[str, Any]) -> None:
         """Сохраняет заказ в кеш и помечает для синхронизации"""
         await self._cache.save_or_update_order(order_id, data)
-        self._dirty_orders.add(order_id)
+        await self._order_changed(order_id)
         log.debug("Order %s saved to cache and marked dirty", order_id)
 
     async def get_order_by_id(self, order_id: str) -> Dict[str, Any] | None:
@@ -154,7 +646,7 @@ class RemoteStorage(IStorageRepository):
     async def update_order_status(self, order_id: str, status: str) -> None:
         """Обновляет статус заказа в кеше и помечает для синхронизации"""
         await self._cache.update_order_status(order_id, status)
-        self._dirty_orders.add(order_id)
+        await self._order_changed(order_id)
         log.debug("Order %s status updated in cache and marked dirty", order_id)
 
     # ==========================================
@@ -173,44 +665,305 @@ class RemoteStorage(IStorageRepository):
                 result[key] = value
         return result
 
+    def _flush_concurrency(self) -> int:
+        if self.config.flush_concurrency > 0:
+            return self.config.flush_concurrency
+        return max(1, self._api_client.config.pool.max_keepalive_connections)
+
+    async def _sync_record(
+        self,
+        semaphore: asyncio.Semaphore,
+        kind: str,
+        record_id: Hashable,
+        data: Dict[str, Any],
+        endpoint: str,
+        pending: Set[Any],
+    ) -> None:
+        """Отправляет одну запись; при успехе (или отказе сервера) снимает ее с pending."""
+        async with semaphore:
+            try:
+                await self._api_client.post(endpoint, data)
+            except (RemoteApiAuthError, RemoteApiValidationError) as e:
+                self._flush_stats["dropped"] += 1
+                pending.discard(record_id)
+                log.error("Remote API rejected %s %s, not retrying: %s", kind, record_id, e)
+                return
+            except RemoteApiError as e:
+                self._flush_stats["failed"] += 1
+                log.warning("Failed to sync %s %s, will retry: %s", kind, record_id, e)
+                return
+        self._flush_stats["synced"] += 1
+        pending.discard(record_id)
+        log.debug("%s %s synced to remote API", kind.capitalize(), record_id)
+
+    async def _sync_chunk(
+        self,
+        semaphore: asyncio.Semaphore,
+        kind: str,
+        chunk: List[Record],
+        endpoint: str,
+        bulk_endpoint: str,
+        pending: Set[Any],
+    ) -> None:
+        """
+        Отправляет пачку записей одним bulk-запросом.
+
+        Если сервер не принял пачку целиком (400/422 — например, из-за одной
+        записи; 404/405 — bulk-эндпоинта нет), записи пачки отправляются по одной.
+        """
+        body: Optional[Dict[str, Any]] = None
+        async with semaphore:
+            self._flush_stats["bulk_requests"] += 1
+            try:
+                # Ключ идемпотентности делает безопасными повторы при таймаутах.
+                # Он одноразовый — ответ (большой) не запоминаем в кеше клиента
+                body = await self._api_client.post(
+                    bulk_endpoint,
+                    {f"{kind}s": [data for _, data in chunk]},
+                    idempotency_key=new_idempotency_key(),
+                    remember=False,
+                )
+            except RemoteApiAuthError as e:
+                self._flush_stats["dropped"] += len(chunk)
+                pending.difference_update(record_id for record_id, _ in chunk)
+                log.error("Remote API rejected %d %ss, not retrying: %s", len(chunk), kind, e)
+                return
+            except RemoteApiError as e:
+                if e.status_code not in _BULK_FALLBACK_STATUSES:
+                    self._flush_stats["failed"] += len(chunk)
+                    log.warning("Failed to sync %d %ss, will retry: %s", len(chunk), kind, e)
+                    return
+                if e.status_code in BULK_UNSUPPORTED_STATUSES:
+                    self._bulk.mark_unsupported(bulk_endpoint)
+                log.warning(
+                    "%s rejected the batch (HTTP %s), falling back to per-record sync",
+                    bulk_endpoint,
+                    e.status_code,
+                )
+
+        if body is None:
+            self._flush_stats["bulk_fallbacks"] += 1
+            await asyncio.gather(
+                *(
+                    self._sync_record(semaphore, kind, record_id, data, endpoint, pending)
+                    for record_id, data in chunk
+                )
+            )
+            return
+
+        results = body.get("results") if isinstance(body, dict) else None
+        if not isinstance(results, list) or len(results) != len(chunk):
+            self._flush_stats["failed"] += len(chunk)
+            log.error("Unexpected %s response, %d %ss will be retried", bulk_endpoint, len(chunk), kind)
+            return
+        for (record_id, _), result in zip(chunk, results):
+            result = result if isinstance(result, dict) else {}
+            if result.get("status") == "ok":
+                self._flush_stats["synced"] += 1
+                pending.discard(record_id)
+                continue
+            status_code = result.get("status_code")
+            if status_code is None or status_code >= 500 or status_code == 429:
+                self._flush_stats["failed"] += 1
+                log.warning("Failed to sync %s %s, will retry: %s", kind, record_id, result)
+            else:
+                self._flush_stats["dropped"] += 1
+                pending.discard(record_id)
+                log.error("Remote API rejected %s %s, not retrying: %s", kind, record_id, result)
+
+    async def _sync_user_delta(
+        self,
+        semaphore: asyncio.Semaphore,
+        telegram_id: int,
+        server_user_id: int,
+        delta: Dict[str, Any],
+        user: Dict[str, Any],
+        pending: Set[int],
+    ) -> None:
+        """Отправляет только измененные поля пользователя PATCH-запросом."""
+        async with semaphore:
+            try:
+                await self._api_client.patch(f"/users/{server_user_id}", delta)
+            except (RemoteApiAuthError, RemoteApiValidationError) as e:
+                self._flush_stats["dropped"] += 1
+                pending.discard(telegram_id)
+                log.error("Remote API rejected user %s delta, not retrying: %s", telegram_id, e)
+                return
+            except RemoteApiError as e:
+                if e.status_code not in _DELTA_FALLBACK_STATUSES:
+                    self._flush_stats["failed"] += 1
+                    log.warning("Failed to sync user %s delta, will retry: %s", telegram_id, e)
+                    return
+                log.info(
+                    "PATCH /users/%s returned HTTP %s, registering user %s in full",
+                    server_user_id,
+                    e.status_code,
+                    telegram_id,
+                )
+            else:
+                self._flush_stats["synced"] += 1
+                self._flush_stats["deltas"] += 1
+                pending.discard(telegram_id)
+                log.debug("User %s delta synced: %s", telegram_id, sorted(delta))
+                return
+        await self._sync_record(semaphore, "user", telegram_id, user, "/users/register", pending)
+
+    async def _user_delta_jobs(
+        self,
+        semaphore: asyncio.Semaphore,
+        pending: Set[int],
+        changed_fields: Dict[int, Optional[Set[str]]],
+    ) -> Tuple[List[Awaitable[None]], Set[int]]:
+        """
+        Готовит delta-PATCH для пользователей, известных серверу (server_user_id или id).
+
+        Returns:
+            (задачи, telegram_id пользователей, которых они покрывают)
+        """
+        jobs: List[Awaitable[None]] = []
+        covered: Set[int] = set()
+        for telegram_id in list(pending):
+            fields = changed_fields.get(telegram_id)
+            if not fields:
+                continue
+            user = await self._cache.get_user_by_telegram_id(telegram_id)
+            server_user_id = _server_user_id(user) if user else None
+            if not server_user_id:
+                continue
+            data = self._serialize_for_json(user)
+            delta = {name: data[name] for name in fields if name in data}
+            covered.add(telegram_id)
+            if not delta:
+                pending.discard(telegram_id)
+                continue
+            jobs.append(
+                self._sync_user_delta(semaphore, telegram_id, server_user_id, delta, data, pending)
+            )
+        return jobs, covered
+
+    async def _sync_records(
+        self,
+        semaphore: asyncio.Semaphore,
+        kind: str,
+        pending: Set[Any],
+        load: Callable[[Any], Awaitable[Optional[Dict[str, Any]]]],
+        endpoint: str,
+        bulk_endpoint: str,
+        ids: Optional[Set[Any]] = None,
+    ) -> List[Awaitable[None]]:
+        """
+        Готовит задачи отправки записей целиком: пачками, если сервер
+        поддерживает bulk.
+
+        Args:
+            ids: Какие записи из pending отправлять; None — все
+        """
+        records: List[Record] = []
+        for record_id in list(pending if ids is None else ids):
+            data = await load(record_id)
+            if not data:
+                # Запись удалена из кеша — отправлять нечего
+                pending.discard(record_id)
+                continue
+            records.append((record_id, self._serialize_for_json(data)))
+        if not records:
+            return []
+        if await self._bulk.supports(bulk_endpoint):
+            bulk = self.config.bulk
+            return [
+                self._sync_chunk(semaphore, kind, chunk, endpoint, bulk_endpoint, pending)
+                for chunk in chunk_records(records, bulk.max_records, bulk.max_bytes)
+            ]
+        return [
+            self._sync_record(semaphore, kind, record_id, data, endpoint, pending)
+            for record_id, data in records
+        ]
+
     async def flush(self) -> None:
         """
         Синхронизирует все изменения с remote API.
         Отправляет данные о всех "dirty" пользователях и заказах.
+
+        Пользователи, известные серверу (server_user_id), у которых
+        изменились отдельные поля, отправляются PATCH /users/{id} только с
+        этими полями. Остальные записи отправляются целиком.
+
+        Если сервер объявляет bulk-эндпоинты, записи отправляются пачками
+        (см. bulk_sync), иначе по одной. Запросы идут параллельно, не больше
+        flush_concurrency одновременно. Записи с временной ошибкой (сеть,
+        5xx, 429) снова помечаются dirty и попадут в следующий flush;
+        отвергнутые сервером (403/422) — нет.
+
+        Одновременно выполняется только один flush. Записи, измененные во
+        время flush, остаются dirty и попадут в следующий.
         """
-        if not self._dirty_users and not self._dirty_orders:
-            log.debug("No dirty data to flush")
-            return
+        async with self._flush_lock:
+            if not self._dirty_users and not self._dirty_orders:
+                log.debug("No dirty data to flush")
+                return
+
+            # Сначала запечатываем журнал: все, что в нем есть, уже dirty и
+            # попадет в этот flush. Между rotate и заменой sets нет await.
+            await self._journal.rotate()
+
+            # Забираем текущий набор; новые изменения копятся в свежих sets.
+            # Из pending записи удаляются по мере отправки, остаток снова dirty.
+            pending_users, self._dirty_users = self._dirty_users, set()
+            pending_orders, self._dirty_orders = self._dirty_orders, set()
+            changed_fields, self._changed_fields = self._changed_fields, {}
+            # Пока запись не отправлена, ее нельзя вытеснить из кеша
+            self._flushing_users = pending_users
+            records = len(pending_users) + len(pending_orders)
+            log.info(
+                "Flushing %d users and %d orders to remote API",
+                len(pending_users),
+                len(pending_orders),
+            )
 
-        log.info("Flushing %d users and %d orders to remote API",
-                len(self._dirty_users), len(self._dirty_orders))
-
-        # Синхронизация пользователей
-        for telegram_id in self._dirty_users:
-            user_data = await self._cache.get_user_by_telegram_id(telegram_id)
-            if user_data:
-                try:
-                    serialized_data = self._serialize_for_json(user_data)
-                    # DEBUG: Логируем данные, отправляемые на сервер
-                    log.info("Sending user data to remote API: %s", serialized_data)
-                    await self._api_client.post("/users/register", serialized_data)
-                    log.debug("User %s synced to remote API", telegram_id)
-                except RemoteApiError as e:
-                    log.error("Failed to sync user %s: %s", telegram_id, e)
-                    # TODO: решить, что делать с ошибками (retry, rollback, etc.)
-
-        # Синхронизация заказов
-        for order_id in self._dirty_orders:
-            order_data = await self._cache.get_order_by_id(order_id)
-            if order_data:
-                try:
-                    serialized_data = self._serialize_for_json(order_data)
-                    await self._api_client.post("/orders", serialized_data)
-                    log.debug("Order %s synced to remote API", order_id)
-                except RemoteApiError as e:
-                    log.error("Failed to sync order %s: %s", order_id, e)
-
-        # Очищаем dirty sets
-        self._dirty_users.clear()
-        self._dirty_orders.clear()
-        log.info("Flush completed")
+            started = time.perf_counter()
+            semaphore = asyncio.Semaphore(self._flush_concurrency())
+            try:
+                jobs, deltas = await self._user_delta_jobs(semaphore, pending_users, changed_fields)
+                jobs += await self._sync_records(
+                    semaphore,
+                    "user",
+                    pending_users,
+                    self._cache.get_user_by_telegram_id,
+                    "/users/register",
+                    "/users/bulk",
+                    ids=pending_users - deltas,
+                )
+                jobs += await self._sync_records(
+                    semaphore,
+                    "order",
+                    pending_orders,
+                    self._cache.get_order_by_id,
+                    "/orders",
+                    "/orders/bulk",
+                )
+                for result in await asyncio.gather(*jobs, return_exceptions=True):
+                    if isinstance(result, BaseException):
+                        log.error("Unexpected error during flush: %r", result)
+            finally:
+                # Неудачные и неотправленные (flush отменен) записи снова dirty
+                for telegram_id in pending_users:
+                    self._merge_changed_fields(telegram_id, changed_fields.get(telegram_id))
+                self._dirty_users |= pending_users
+                self._dirty_orders |= pending_orders
+                self._flushing_users = set()
+
+            if not pending_users and not pending_orders:
+                # Все запечатанное доставлено (или отвергнуто сервером)
+                await self._journal.truncate_sealed()
+            # Отправленных пользователей теперь можно вытеснять (в т.ч. по idle_ttl)
+            await self._evict_users()
+
+            self._flush_stats["last_records"] = records
+            self._flush_stats["last_duration_ms"] = round(
+                (time.perf_counter() - started) * 1000, 3
+            )
+            log.info(
+                "Flush completed in %.0f ms, %d records left dirty",
+                self._flush_stats["last_duration_ms"],
+                self.dirty_count(),
+            )
@@ -0,0 +1,167 @@
+"""
+Ограничение локального кеша пользователей RemoteStorage.
+
+Кеш хранит только рабочий набор: не больше max_users пользователей, и
+пользователь, к которому не обращались idle_ttl секунд, вытесняется.
+Вытесняются самые давно использованные (LRU). Пользователи с
+несинхронизированными изменениями (dirty или в идущем flush) не
+вытесняются — иначе изменения потерялись бы; они переносятся в конец
+очереди и будут вытеснены после flush.
+
+Негативный кеш помнит telegram_id, которых нет на сервере (404), в течение
+negative_ttl: незарегистрированный пользователь, присылающий update за
+update'ом, не вызывает запрос к NMservices на каждый из них. Запись
+сбрасывается, как только пользователь сохраняется локально.
+
+Версии записей (VersionStamps) защищают от событий инвалидации, пришедших
+не по порядку: событие с версией не новее уже примененной игнорируется.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class UserCacheConfig:
+    """Параметры кеша пользователей."""
+
+    max_users: int = 10_000  # 0 — без ограничения
+    idle_ttl: float = 3600.0  # секунды без обращений; 0 — без TTL
+    negative_ttl: float = 30.0  # сколько помнить 404 по telegram_id; 0 — не помнить
+    max_negative: int = 10_000
+    max_versions: int = 100_000  # сколько версий записей помнить для инвалидации
+
+
+class UserCacheIndex:
+    """Порядок LRU и время последнего обращения к пользователям кеша."""
+
+    def __init__(self, config: UserCacheConfig, clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self._clock = clock
+        self._last_access: "OrderedDict[int, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # сверх max_users
+        self.expirations = 0  # по idle_ttl
+
+    def touch(self, telegram_id: int) -> None:
+        self._last_access[telegram_id] = self._clock()
+        self._last_access.move_to_end(telegram_id)
+
+    def discard(self, telegram_id: int) -> None:
+        self._last_access.pop(telegram_id, None)
+
+    def pop_evictable(self, pinned: Callable[[int], bool]) -> List[int]:
+        """
+        Снимает с учета и возвращает пользователей, которых нужно вытеснить.
+
+        Args:
+            pinned: Пользователь не может быть вытеснен (есть несохраненные изменения)
+        """
+        max_users = self.config.max_users
+        idle_ttl = self.config.idle_ttl
+        now = self._clock()
+        evicted: List[int] = []
+        skipped = 0
+        while skipped < len(self._last_access):
+            telegram_id, last_access = next(iter(self._last_access.items()))
+            excess = max_users > 0 and len(self._last_access) > max_users
+            idle = idle_ttl > 0 and now - last_access >= idle_ttl
+            if not excess and not idle:
+                break
+            if pinned(telegram_id):
+                self._last_access.move_to_end(telegram_id)
+                skipped += 1
+                continue
+            del self._last_access[telegram_id]
+            evicted.append(telegram_id)
+            if excess:
+                self.evictions += 1
+            else:
+                self.expirations += 1
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._last_access)
+
+    def snapshot(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._last_access),
+            "max_users": self.config.max_users,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class NegativeCache:
+    """telegram_id, которых нет на сервере, с ограниченным временем жизни."""
+
+    def __init__(self, config: UserCacheConfig, clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self._clock = clock
+        self._expires_at: "OrderedDict[int, float]" = OrderedDict()
+        self.hits = 0
+        self.stored = 0
+
+    def __contains__(self, telegram_id: int) -> bool:
+        expires_at = self._expires_at.get(telegram_id)
+        if expires_at is None:
+            return False
+        if self._clock() >= expires_at:
+            del self._expires_at[telegram_id]
+            return False
+        self.hits += 1
+        return True
+
+    def add(self, telegram_id: int) -> None:
+        if self.config.negative_ttl <= 0:
+            return
+        self._expires_at[telegram_id] = self._clock() + self.config.negative_ttl
+        self._expires_at.move_to_end(telegram_id)
+        self.stored += 1
+        while len(self._expires_at) > self.config.max_negative:
+            self._expires_at.popitem(last=False)
+
+    def discard(self, telegram_id: int) -> None:
+        self._expires_at.pop(telegram_id, None)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"entries": len(self._expires_at), "hits": self.hits, "stored": self.stored}
+
+
+class VersionStamps:
+    """Последняя примененная версия каждого пользователя (по telegram_id)."""
+
+    def __init__(self, config: UserCacheConfig):
+        self.config = config
+        self._versions: "OrderedDict[int, int]" = OrderedDict()
+        self.stale = 0  # события, пришедшие после более новых
+
+    def get(self, telegram_id: int) -> Optional[int]:
+        return self._versions.get(telegram_id)
+
+    def advance(self, telegram_id: int, version: int) -> bool:
+        """
+        Запоминает версию, если она новее известной.
+
+        Returns:
+            False — версия не новее уже примененной, событие нужно пропустить
+        """
+        current = self._versions.get(telegram_id)
+        if current is not None and version <= current:
+            self.stale += 1
+            return False
+        self._versions[telegram_id] = version
+        self._versions.move_to_end(telegram_id)
+        while len(self._versions) > self.config.max_versions:
+            self._versions.popitem(last=False)
+        return True
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"entries": len(self._versions), "stale": self.stale}
@@ -0,0 +1,123 @@
+"""
+Фоновая синхронизация (write-behind) для RemoteStorage.
+
+Обработчики только помечают записи как dirty; фоновая задача вызывает
+flush() по таймеру (interval) или раньше, как только накопилось max_dirty
+изменений — что наступит первым. При остановке бота выполняется
+финальный flush, чтобы изменения не потерялись.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Union
+
+from nomus.common.deadline import detached_context
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class WriteBehindConfig:
+    """Параметры фоновой синхронизации."""
+
+    enabled: bool = True
+    interval: float = 5.0  # секунды между flush'ами
+    max_dirty: int = 100  # flush раньше интервала, если изменений больше
+    shutdown_timeout: float = 30.0  # сколько ждать финальный flush при остановке
+
+
+class WriteBehindFlusher:
+    """Фоновая задача, вызывающая flush() по интервалу или порогу изменений."""
+
+    def __init__(
+        self,
+        config: WriteBehindConfig,
+        flush: Callable[[], Awaitable[None]],
+        dirty_count: Callable[[], int],
+    ):
+        self.config = config
+        self._flush = flush
+        self._dirty_count = dirty_count
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushes = 0
+        self.early_flushes = 0  # запущены раньше интервала (порог max_dirty или trigger())
+        self.failures = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Запускает фоновую задачу (повторный вызов ничего не делает)."""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        # Задача живет дольше любого update — deadline обработчика ей не нужен
+        self._task = asyncio.get_running_loop().create_task(
+            self._run(), context=detached_context()
+        )
+
+    def notify(self) -> None:
+        """Сообщает о новом изменении; при достижении порога будит задачу."""
+        if self.running and self._dirty_count() >= self.config.max_dirty:
+            self._wakeup.set()
+
+    def trigger(self) -> None:
+        """Просит выполнить flush как можно скорее."""
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.config.interval)
+                if not self._stopping:
+                    self.early_flushes += 1
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping or not self._dirty_count():
+                continue
+            await self._flush_once()
+
+    async def _flush_once(self) -> None:
+        try:
+            await self._flush()
+            self.flushes += 1
+        except Exception:
+            self.failures += 1
+            log.exception("Background flush failed")
+
+    async def stop(self) -> None:
+        """
+        Останавливает задачу и выполняет финальный flush.
+
+        Идущий flush не отменяется, а дожидается: прерванная синхронизация
+        могла бы потерять уже снятые с учета изменения.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self._dirty_count():
+            try:
+                await asyncio.wait_for(self._flush_once(), timeout=self.config.shutdown_timeout)
+            except asyncio.TimeoutError:
+                log.error(
+                    "Final flush did not finish in %.0fs, %d changes not synced",
+                    self.config.shutdown_timeout,
+                    self._dirty_count(),
+                )
+
+    def snapshot(self) -> Dict[str, Union[int, bool]]:
+        return {
+            "running": self.running,
+            "dirty": self._dirty_count(),
+            "flushes": self.flushes,
+            "early_flushes": self.early_flushes,
+            "failures": self.failures,
+        }
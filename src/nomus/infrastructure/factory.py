@@ -7,13 +7,33 @@ from typing import Any, Optional
 from nomus.config.settings import StorageConstants, Settings
 from nomus.domain.interfaces.repo_interface import IStorageRepository
 from nomus.infrastructure.database.memory_storage import MemoryStorage
-from nomus.infrastructure.database.remote_storage import RemoteStorage
+from nomus.infrastructure.database.bulk_sync import BulkSyncConfig
+from nomus.infrastructure.database.cache_warmup import WarmupConfig
+from nomus.infrastructure.database.coherence import CoherenceConfig
+from nomus.infrastructure.database.journal import JournalConfig
+from nomus.infrastructure.database.remote_storage import RemoteStorage, RemoteStorageConfig
+from nomus.infrastructure.database.user_cache import UserCacheConfig
+from nomus.infrastructure.database.write_behind import WriteBehindConfig
 from nomus.infrastructure.services.sms_stub import SmsServiceStub
 from nomus.infrastructure.services.payment_stub import PaymentServiceStub
 from nomus.infrastructure.services.remote_api_client import (
     RemoteApiClient,
     RemoteApiConfig,
 )
+from nomus.infrastructure.services.connection_pool import PoolConfig
+from nomus.infrastructure.services.circuit_breaker import CircuitBreakerConfig
+from nomus.infrastructure.services.response_cache import CacheRule, ResponseCacheConfig
+from nomus.infrastructure.services.micro_batcher import BatchingConfig
+from nomus.infrastructure.services.adaptive_limit import AdaptiveLimitConfig
+from nomus.infrastructure.services.hedging import HedgingConfig
+from nomus.infrastructure.services.idempotency import IdempotencyConfig
+from nomus.infrastructure.services.retry_policy import ThrottleConfig
+from nomus.infrastructure.services.compression import CompressionConfig
+from nomus.infrastructure.services.bulkhead import (
+    BulkheadClass,
+    BulkheadConfig,
+    BulkheadRoute,
+)
 from nomus.infrastructure.services.sms_remote import SmsServiceRemote
 from nomus.infrastructure.services.payment_remote import PaymentServiceRemote
 from nomus.infrastructure.database.remote_storage import RemoteStorage
@@ -61,14 +81,19 @@ class ServiceFactory:
             if uses_remote_services and settings.remote_api.enabled:
                 # Используем RemoteStorage с локальным кешем
                 api_client = cls._get_api_client(settings)
-                return RemoteStorage(api_client=api_client)
+                return RemoteStorage(
+                    api_client=api_client, config=cls._build_remote_storage_config(settings)
+                )
             else:
                 # Обычный MemoryStorage для полностью локальной разработки
                 return MemoryStorage()
 
         elif settings.database.type == StorageConstants.DB_POSTGRES_TYPE:
             #TODO: Реализовать PostgresStorage
-            return RemoteStorage(api_client=cls._get_api_client(settings))
+            return RemoteStorage(
+                api_client=cls._get_api_client(settings),
+                config=cls._build_remote_storage_config(settings),
+            )
 
             # raise NotImplementedError(
             #     "PostgreSQL storage not implemented yet. "
@@ -77,6 +102,21 @@ class ServiceFactory:
         else:
             raise ValueError(f"Unknown database type: {settings.database.type}")
 
+    @staticmethod
+    def _build_remote_storage_config(settings: Settings) -> RemoteStorageConfig:
+        """Собирает конфигурацию RemoteStorage из настроек."""
+        return RemoteStorageConfig(
+            write_behind=WriteBehindConfig(
+                **settings.remote_storage.write_behind.model_dump()
+            ),
+            flush_concurrency=settings.remote_storage.flush_concurrency,
+            bulk=BulkSyncConfig(**settings.remote_storage.bulk.model_dump()),
+            journal=JournalConfig(**settings.remote_storage.journal.model_dump()),
+            user_cache=UserCacheConfig(**settings.remote_storage.user_cache.model_dump()),
+            warmup=WarmupConfig(**settings.remote_storage.warmup.model_dump()),
+            coherence=CoherenceConfig(**settings.remote_storage.coherence.model_dump()),
+        )
+
     @classmethod
     def _get_api_client(cls, settings: Settings) -> RemoteApiClient:
         """
@@ -95,10 +135,60 @@ class ServiceFactory:
                 timeout=settings.remote_api.timeout,
                 max_retries=settings.remote_api.max_retries,
                 retry_delay=settings.remote_api.retry_delay,
+                retry_max_delay=settings.remote_api.retry_max_delay,
+                pool=PoolConfig(**settings.remote_api.pool.model_dump()),
+                single_flight=settings.remote_api.single_flight,
+                circuit_breaker=CircuitBreakerConfig(
+                    **settings.remote_api.circuit_breaker.model_dump()
+                ),
+                cache=ResponseCacheConfig(
+                    enabled=settings.remote_api.cache.enabled,
+                    max_entries=settings.remote_api.cache.max_entries,
+                    rules=[
+                        CacheRule(**rule.model_dump())
+                        for rule in settings.remote_api.cache.rules
+                    ],
+                ),
+                bulkheads=cls._build_bulkhead_config(settings),
+                json_codec=settings.remote_api.json_codec,
+                batching=BatchingConfig(**settings.remote_api.batching.model_dump()),
+                adaptive_limit=AdaptiveLimitConfig(
+                    **settings.remote_api.adaptive_limit.model_dump()
+                ),
+                hedging=HedgingConfig(**settings.remote_api.hedging.model_dump()),
+                idempotency=IdempotencyConfig(
+                    **settings.remote_api.idempotency.model_dump()
+                ),
+                throttle=ThrottleConfig(
+                    enabled=settings.remote_api.throttle.enabled,
+                    statuses=frozenset(settings.remote_api.throttle.statuses),
+                    max_retry_after=settings.remote_api.throttle.max_retry_after,
+                ),
+                compression=CompressionConfig(
+                    **settings.remote_api.compression.model_dump()
+                ),
             )
             cls._api_client = RemoteApiClient(config)
         return cls._api_client
 
+    @staticmethod
+    def _build_bulkhead_config(settings: Settings) -> BulkheadConfig:
+        """Собирает BulkheadConfig; пустые classes/routes — встроенные значения."""
+        bulkheads = settings.remote_api.bulkheads
+        config = BulkheadConfig(
+            enabled=bulkheads.enabled,
+            max_concurrent=bulkheads.max_concurrent,
+            default_class=bulkheads.default_class,
+        )
+        if bulkheads.classes:
+            config.classes = {
+                name: BulkheadClass(**spec.model_dump())
+                for name, spec in bulkheads.classes.items()
+            }
+        if bulkheads.routes:
+            config.routes = [BulkheadRoute(**route.model_dump()) for route in bulkheads.routes]
+        return config
+
     @classmethod
     def create_sms_service(cls, settings: Settings) -> Any:
         """
@@ -16,7 +16,15 @@ from .remote_api_client import (
     RemoteApiAuthError,
     RemoteApiValidationError,
     RemoteApiConnectionError,
+    CircuitOpenError,
+    DeadlineExceededError,
+    RemoteApiOverloadedError,
+    RemoteApiThrottledError,
 )
+from .connection_pool import PoolConfig
+from .circuit_breaker import CircuitBreakerConfig, CircuitState
+from .response_cache import CacheRule, ResponseCacheConfig
+from .bulkhead import BulkheadClass, BulkheadConfig, BulkheadRoute
 from .sms_remote import SmsServiceRemote
 from .payment_remote import PaymentServiceRemote
 
@@ -31,6 +39,18 @@ __all__ = [
     "RemoteApiAuthError",
     "RemoteApiValidationError",
     "RemoteApiConnectionError",
+    "CircuitOpenError",
+    "DeadlineExceededError",
+    "RemoteApiOverloadedError",
+    "RemoteApiThrottledError",
+    "PoolConfig",
+    "CircuitBreakerConfig",
+    "CircuitState",
+    "CacheRule",
+    "ResponseCacheConfig",
+    "BulkheadClass",
+    "BulkheadConfig",
+    "BulkheadRoute",
     # Remote A5@28AK
     "SmsServiceRemote",
     "PaymentServiceRemote",
@@ -0,0 +1,254 @@
+"""
+Адаптивный лимит одновременных запросов (AIMD) и ограничение частоты.
+
+Лимит работает как окно перегрузки TCP:
+- успешный быстрый ответ при почти заполненном лимите — аддитивное
+  увеличение (+increase за каждые `limit` таких ответов);
+- ошибка, таймаут, 5xx/429 или ответ медленнее latency_threshold —
+  мультипликативное уменьшение (limit * backoff_ratio).
+
+Уменьшение выполняется не чаще одного раза на «окно»: сигналы от запросов,
+начатых до последнего уменьшения, не уменьшают лимит повторно.
+
+Поверх лимита стоит token bucket: не больше rate_limit запросов в секунду
+с допустимым всплеском burst.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict
+
+from .metrics import LatencyWindow
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class AdaptiveLimitConfig:
+    """Параметры адаптивного лимита и token bucket."""
+
+    enabled: bool = False
+    initial_limit: int = 20
+    min_limit: int = 2
+    max_limit: int = 200
+    increase: float = 1.0  # прирост лимита за «окно» успешных ответов
+    backoff_ratio: float = 0.7  # множитель при перегрузке
+    latency_threshold: float = 1.0  # секунды; медленнее — сигнал перегрузки (0 — только ошибки)
+    rate_limit: float = 0.0  # запросов в секунду; 0 — без ограничения
+    burst: int = 0  # допустимый всплеск; 0 — равен rate_limit
+
+
+class TokenBucket:
+    """
+    Token bucket с резервированием: вызывающий забирает токен сразу
+    (баланс может уйти в минус) и ждет, пока он «накопится».
+    Поэтому ожидающие обслуживаются в порядке прихода.
+    """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = burst
+        self._clock = clock
+        self._tokens = burst
+        self._updated = clock()
+        self.throttled = 0
+        self.throttle_time = 0.0
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Забирает токен; возвращает, сколько секунд нужно подождать."""
+        self._refill()
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            self.throttled += 1
+            self.throttle_time += delay
+            await asyncio.sleep(delay)
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+class Permit:
+    """Разрешение на один запрос; клиент отмечает в нем сигнал перегрузки."""
+
+    __slots__ = ("started", "overloaded")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.overloaded = False
+
+    def mark_overloaded(self) -> None:
+        self.overloaded = True
+
+
+class AdaptiveLimiter:
+    """AIMD-лимит одновременных запросов."""
+
+    def __init__(self, config: AdaptiveLimitConfig, clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self._clock = clock
+        self._limit = float(min(max(config.initial_limit, config.min_limit), config.max_limit))
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease_at = float("-inf")
+        self.increases = 0
+        self.decreases = 0
+        self.wait = LatencyWindow()
+        self.latency = LatencyWindow()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    async def acquire(self) -> Permit:
+        """Ждет свободного места в пределах текущего лимита."""
+        started = self._clock()
+        if self.in_flight >= self.limit or self._waiters:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Место уже выдано, но ожидающий отменен — передаем дальше
+                    self.in_flight -= 1
+                    self._wake()
+                else:
+                    self._waiters.remove(future)
+                raise
+        else:
+            self.in_flight += 1
+        self.wait.add(self._clock() - started)
+        return Permit(self._clock())
+
+    def release(self, permit: Permit, sample: bool = True) -> None:
+        """
+        Возвращает место и учитывает результат запроса.
+
+        Args:
+            permit: Разрешение из acquire()
+            sample: False — запрос прерван (отмена), результат не учитывается
+        """
+        self.in_flight -= 1
+        if sample:
+            elapsed = self._clock() - permit.started
+            self.latency.add(elapsed)
+            threshold = self.config.latency_threshold
+            if permit.overloaded or (threshold and elapsed > threshold):
+                self._on_overload(permit)
+            else:
+                self._on_success()
+        self._wake()
+
+    def _on_success(self) -> None:
+        # Увеличиваем только когда лимит действительно упирается в нагрузку
+        if self.in_flight + 1 < self._limit / 2 or self._limit >= self.config.max_limit:
+            return
+        previous = self.limit
+        self._limit = min(self.config.max_limit, self._limit + self.config.increase / self._limit)
+        if self.limit > previous:
+            self.increases += 1
+
+    def _on_overload(self, permit: Permit) -> None:
+        if permit.started <= self._last_decrease_at:
+            return
+        previous = self.limit
+        self._limit = max(self.config.min_limit, self._limit * self.config.backoff_ratio)
+        self._last_decrease_at = self._clock()
+        if self.limit < previous:
+            self.decreases += 1
+            log.info("Remote API concurrency limit decreased: %s -> %s", previous, self.limit)
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "wait": self.wait.snapshot(),
+            "latency": self.latency.snapshot(),
+        }
+
+
+class ConcurrencyController:
+    """Token bucket + адаптивный лимит для RemoteApiClient."""
+
+    def __init__(self, config: AdaptiveLimitConfig, clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self.limiter = AdaptiveLimiter(config, clock)
+        self.bucket = (
+            TokenBucket(config.rate_limit, config.burst or config.rate_limit, clock)
+            if config.rate_limit > 0
+            else None
+        )
+
+    @property
+    def limit(self) -> int:
+        """Текущий лимит одновременных запросов."""
+        return self.limiter.limit
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[Permit]:
+        """
+        Разрешение на запрос. Исключение внутри блока (кроме отмены)
+        считается сигналом перегрузки; ответ с перегрузкой клиент отмечает
+        через permit.mark_overloaded().
+        """
+        if not self.config.enabled:
+            yield Permit(0.0)
+            return
+        if self.bucket is not None:
+            await self.bucket.acquire()
+        permit = await self.limiter.acquire()
+        try:
+            yield permit
+        except asyncio.CancelledError:
+            self.limiter.release(permit, sample=False)
+            raise
+        except Exception:
+            permit.mark_overloaded()
+            self.limiter.release(permit)
+            raise
+        except BaseException:
+            self.limiter.release(permit, sample=False)
+            raise
+        else:
+            self.limiter.release(permit)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Текущий лимит и счетчики для мониторинга."""
+        if not self.config.enabled:
+            return {"enabled": False}
+        snapshot: Dict[str, Any] = {"enabled": True, **self.limiter.snapshot()}
+        if self.bucket is not None:
+            snapshot["rate_limit"] = {
+                "rate": self.bucket.rate,
+                "tokens": round(self.bucket.tokens, 2),
+                "throttled": self.bucket.throttled,
+                "throttle_time_s": round(self.bucket.throttle_time, 3),
+            }
+        return snapshot
@@ -0,0 +1,195 @@
+"""
+Bulkhead'ы и приоритетная очередь перед общим HTTP-клиентом.
+
+Каждый запрос относится к классу (critical / interactive / background)
+по методу и шаблону пути. У класса свой лимит одновременных запросов,
+поэтому шторм фоновых запросов не занимает слоты денежных операций.
+Поверх классов стоит общий лимит, который пропускает ожидающих в порядке
+приоритета класса, а не в порядке прихода.
+"""
+
+import asyncio
+import fnmatch
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .metrics import LatencyWindow
+
+
+@dataclass
+class BulkheadClass:
+    """Класс запросов: лимит одновременных запросов и приоритет (меньше — важнее)."""
+
+    max_concurrent: int
+    priority: int = 1
+    max_queue: int = 0  # 0 — очередь не ограничена
+
+
+@dataclass
+class BulkheadRoute:
+    """Отнесение запросов к классу по методу и шаблону пути (fnmatch)."""
+
+    pattern: str
+    bulkhead: str
+    method: str = "*"
+
+
+DEFAULT_BULKHEAD_CLASSES: Dict[str, BulkheadClass] = {
+    "critical": BulkheadClass(max_concurrent=50, priority=0),
+    "interactive": BulkheadClass(max_concurrent=50, priority=1),
+    "background": BulkheadClass(max_concurrent=10, priority=2, max_queue=200),
+}
+
+DEFAULT_BULKHEAD_ROUTES: List[BulkheadRoute] = [
+    BulkheadRoute(pattern="/orders/pending-notifications", bulkhead="background"),
+    BulkheadRoute(pattern="/orders/notifications/ack", bulkhead="background"),
+    BulkheadRoute(method="POST", pattern="/orders", bulkhead="critical"),
+    BulkheadRoute(method="POST", pattern="/payment/*", bulkhead="critical"),
+    BulkheadRoute(method="POST", pattern="/users/register", bulkhead="critical"),
+]
+
+
+@dataclass
+class BulkheadConfig:
+    """Параметры bulkhead'ов."""
+
+    enabled: bool = True
+    max_concurrent: int = 0  # общий лимит; 0 — равен pool.max_connections
+    default_class: str = "interactive"
+    classes: Dict[str, BulkheadClass] = field(
+        default_factory=lambda: dict(DEFAULT_BULKHEAD_CLASSES)
+    )
+    routes: List[BulkheadRoute] = field(
+        default_factory=lambda: list(DEFAULT_BULKHEAD_ROUTES)
+    )
+
+
+class BulkheadRejectedError(Exception):
+    """Очередь класса переполнена — запрос отклонен без ожидания."""
+
+
+class PriorityLimiter:
+    """
+    Семафор, пропускающий ожидающих по приоритету (при равенстве — FIFO).
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    async def acquire(self, priority: int = 0) -> None:
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            return
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Слот уже выдан, но ожидающий отменен — возвращаем слот
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.active -= 1
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                self.active += 1
+                fut.set_result(None)
+                return
+
+
+class _ClassState:
+    """Лимитер и статистика одного класса."""
+
+    def __init__(self, name: str, spec: BulkheadClass):
+        self.name = name
+        self.spec = spec
+        self.limiter = PriorityLimiter(spec.max_concurrent)
+        self.wait = LatencyWindow()
+        self.max_queue_depth = 0
+        self.rejected = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.limiter.active,
+            "queued": self.limiter.queued,
+            "max_queue_depth": self.max_queue_depth,
+            "rejected": self.rejected,
+            "wait": self.wait.snapshot(),
+        }
+
+
+class Bulkheads:
+    """Набор bulkhead'ов и общий приоритетный лимит."""
+
+    def __init__(self, config: BulkheadConfig, total_limit: int):
+        self.config = config
+        self._classes = {
+            name: _ClassState(name, spec) for name, spec in config.classes.items()
+        }
+        if config.default_class not in self._classes:
+            raise ValueError(f"Unknown default bulkhead class: {config.default_class}")
+        self._gate = PriorityLimiter(config.max_concurrent or total_limit)
+
+    def classify(self, method: str, endpoint: str) -> str:
+        """Класс запроса по первому подходящему маршруту."""
+        path = endpoint.split("?", 1)[0]
+        for route in self.config.routes:
+            if route.method not in ("*", method.upper()):
+                continue
+            if fnmatch.fnmatchcase(path, route.pattern) and route.bulkhead in self._classes:
+                return route.bulkhead
+        return self.config.default_class
+
+    @asynccontextmanager
+    async def slot(self, method: str, endpoint: str) -> AsyncIterator[Optional[str]]:
+        """Занимает слот класса и общий слот на время запроса."""
+        if not self.config.enabled:
+            yield None
+            return
+
+        state = self._classes[self.classify(method, endpoint)]
+        queued = state.limiter.queued
+        if state.spec.max_queue and queued >= state.spec.max_queue:
+            state.rejected += 1
+            raise BulkheadRejectedError(
+                f"Bulkhead '{state.name}' queue is full ({queued} waiting)"
+            )
+
+        if queued or state.limiter.active >= state.limiter.limit:
+            state.max_queue_depth = max(state.max_queue_depth, queued + 1)
+
+        started = time.perf_counter()
+        await state.limiter.acquire()
+        try:
+            await self._gate.acquire(state.spec.priority)
+        except BaseException:
+            state.limiter.release()
+            raise
+        state.wait.add(time.perf_counter() - started)
+        try:
+            yield state.name
+        finally:
+            self._gate.release()
+            state.limiter.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Глубина очередей и время ожидания по классам."""
+        return {
+            "gate": {"in_flight": self._gate.active, "queued": self._gate.queued},
+            "classes": {name: state.snapshot() for name, state in self._classes.items()},
+        }
@@ -0,0 +1,180 @@
+"""
+Circuit breaker для эндпоинтов NMservices.
+
+Состояния:
+- closed: запросы проходят, считаются подряд идущие сбои
+- open: запросы сразу отклоняются, пока не пройдет recovery_timeout
+- half_open: пропускается ограниченное число пробных запросов;
+  успех закрывает breaker, сбой снова открывает
+"""
+
+import logging
+import re
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, Dict, List
+
+log: logging.Logger = logging.getLogger(__name__)
+
+_NUMERIC_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+class CircuitState(str, Enum):
+    """Состояние circuit breaker"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass
+class CircuitBreakerConfig:
+    """Параметры circuit breaker."""
+
+    enabled: bool = True
+    failure_threshold: int = 5
+    recovery_timeout: float = 30.0
+    half_open_max_calls: int = 1
+
+
+StateListener = Callable[[str, CircuitState, CircuitState], None]
+
+
+def normalize_endpoint(endpoint: str) -> str:
+    """'/users/by-telegram/123' -> '/users/by-telegram/{id}'"""
+    path = endpoint.split("?", 1)[0]
+    return _NUMERIC_SEGMENT.sub("/{id}", path) or "/"
+
+
+class CircuitBreaker:
+    """Circuit breaker одного эндпоинта."""
+
+    def __init__(
+        self,
+        name: str,
+        config: CircuitBreakerConfig,
+        on_state_change: StateListener,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.config = config
+        self._on_state_change = on_state_change
+        self._clock = clock
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_count = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+    def allow_request(self) -> bool:
+        """Можно ли отправить запрос сейчас."""
+        if not self.config.enabled or self.state is CircuitState.CLOSED:
+            return True
+
+        if self.state is CircuitState.OPEN:
+            if self._clock() - self._opened_at < self.config.recovery_timeout:
+                self.rejected += 1
+                return False
+            self._transition(CircuitState.HALF_OPEN)
+
+        # HALF_OPEN: пропускаем только ограниченное число пробных запросов
+        if self._half_open_calls >= self.config.half_open_max_calls:
+            self.rejected += 1
+            return False
+        self._half_open_calls += 1
+        return True
+
+    def record_success(self) -> None:
+        """Запрос завершился ответом сервера (не 5xx)."""
+        self.consecutive_failures = 0
+        if self.state is CircuitState.HALF_OPEN:
+            self._transition(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        """Сетевой сбой, таймаут или 5xx."""
+        self.consecutive_failures += 1
+        if self.state is CircuitState.HALF_OPEN:
+            self._open()
+        elif (
+            self.state is CircuitState.CLOSED
+            and self.consecutive_failures >= self.config.failure_threshold
+        ):
+            self._open()
+
+    def record_ignored(self) -> None:
+        """Запрос прерван без результата (например, отменен) — освобождает пробный слот."""
+        if self.state is CircuitState.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def _open(self) -> None:
+        self._opened_at = self._clock()
+        self.opened_count += 1
+        self._transition(CircuitState.OPEN)
+
+    def _transition(self, new_state: CircuitState) -> None:
+        old_state = self.state
+        self.state = new_state
+        self._half_open_calls = 0
+        if old_state is not new_state:
+            self._on_state_change(self.name, old_state, new_state)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Состояние для мониторинга."""
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_count": self.opened_count,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreakerRegistry:
+    """
+    Набор circuit breaker'ов по нормализованному эндпоинту.
+
+    Слушатели, добавленные через add_listener(), получают каждую смену
+    состояния: (эндпоинт, старое состояние, новое состояние).
+    """
+
+    def __init__(
+        self,
+        config: CircuitBreakerConfig,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.config = config
+        self._clock = clock
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._listeners: List[StateListener] = []
+        self.transitions = 0
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        """Возвращает breaker для эндпоинта, создавая его при необходимости."""
+        name = normalize_endpoint(endpoint)
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, self.config, self._notify, self._clock)
+            self._breakers[name] = breaker
+        return breaker
+
+    def add_listener(self, listener: StateListener) -> None:
+        """Подписывает на смену состояний."""
+        self._listeners.append(listener)
+
+    def _notify(self, name: str, old: CircuitState, new: CircuitState) -> None:
+        self.transitions += 1
+        level = logging.INFO if new is CircuitState.CLOSED else logging.WARNING
+        log.log(level, "Circuit breaker %s: %s -> %s", name, old.value, new.value)
+        for listener in self._listeners:
+            try:
+                listener(name, old, new)
+            except Exception as e:
+                log.error("Circuit breaker listener failed: %s", e)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Состояния всех breaker'ов."""
+        return {
+            "transitions": self.transitions,
+            "endpoints": {name: b.snapshot() for name, b in self._breakers.items()},
+        }
@@ -0,0 +1,172 @@
+"""
+Сжатие трафика RemoteApiClient.
+
+Ответы: клиент объявляет в Accept-Encoding поддерживаемые кодировки
+(zstd, br, gzip — в порядке предпочтения), httpx распаковывает ответ сам.
+br и zstd доступны, только если установлены пакеты brotli (или brotlicffi)
+и zstandard — те же, что использует httpx. zstd httpx распаковывает
+начиная с версии 0.27.1; на более старой он не объявляется.
+
+Запросы: тела POST/PUT/PATCH на эндпоинты из request_endpoints (bulk-запросы)
+сжимаются, если они не меньше request_min_size байт. Сервер должен принимать
+Content-Encoding в запросах, поэтому по умолчанию это выключено.
+"""
+
+import fnmatch
+import gzip
+import importlib
+import importlib.util
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+_BODY_METHODS = frozenset({"POST", "PUT", "PATCH"})
+
+# Первая версия httpx, которая распаковывает ответы с Content-Encoding: zstd
+_HTTPX_ZSTD_VERSION = (0, 27, 1)
+
+
+def _module_available(*names: str) -> Optional[str]:
+    for name in names:
+        if importlib.util.find_spec(name) is not None:
+            return name
+    return None
+
+
+def _httpx_version() -> Tuple[int, ...]:
+    parts = []
+    for part in httpx.__version__.split(".")[:3]:
+        digits = "".join(ch for ch in part if ch.isdigit())
+        parts.append(int(digits or 0))
+    return tuple(parts)
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    # mtime=0 — одинаковое тело дает одинаковые байты (удобно для повторов и кешей)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _brotli(data: bytes, level: int) -> bytes:
+    module = importlib.import_module(_module_available("brotli", "brotlicffi") or "brotli")
+    return module.compress(data, quality=min(level, 11))
+
+
+def _zstd(data: bytes, level: int) -> bytes:
+    import zstandard
+
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+_ENCODINGS: Dict[str, Callable[[bytes, int], bytes]] = {
+    "gzip": _gzip,
+    "br": _brotli,
+    "zstd": _zstd,
+}
+
+
+def encoding_available(encoding: str) -> bool:
+    """Есть ли все нужное, чтобы сжимать и распаковывать эту кодировку."""
+    if encoding == "gzip":
+        return True
+    if encoding == "br":
+        return _module_available("brotli", "brotlicffi") is not None
+    if encoding == "zstd":
+        return (
+            _module_available("zstandard") is not None
+            and _httpx_version() >= _HTTPX_ZSTD_VERSION
+        )
+    return False
+
+
+def compress(data: bytes, encoding: str, level: int = 5) -> bytes:
+    """Сжимает data в заданной кодировке."""
+    try:
+        return _ENCODINGS[encoding](data, level)
+    except KeyError:
+        raise ValueError(f"Unsupported content encoding: {encoding}") from None
+
+
+@dataclass
+class CompressionConfig:
+    """Параметры сжатия ответов и тел запросов."""
+
+    enabled: bool = True
+    accept_encodings: List[str] = field(default_factory=lambda: ["zstd", "br", "gzip"])
+    request_encoding: Optional[str] = None  # gzip | br | zstd; None — не сжимать запросы
+    request_level: int = 5
+    request_min_size: int = 4096  # байты; меньшие тела отправляются как есть
+    request_endpoints: List[str] = field(default_factory=lambda: ["/users/bulk", "/orders/bulk"])
+
+
+class Compression:
+    """Согласование кодировок, сжатие тел запросов и счетчики трафика."""
+
+    def __init__(self, config: CompressionConfig):
+        self.config = config
+        self.accept_encoding = ", ".join(
+            encoding for encoding in config.accept_encodings if encoding_available(encoding)
+        ) or "identity"
+        self.request_encoding = config.request_encoding
+        if self.request_encoding and not encoding_available(self.request_encoding):
+            # Настройка есть, пакета нет — отправляем gzip, он доступен всегда
+            self.request_encoding = "gzip"
+        self.responses = 0
+        self.compressed_responses = 0
+        self.wire_bytes = 0  # получено по сети
+        self.decoded_bytes = 0  # после распаковки
+        self.compressed_requests = 0
+        self.request_bytes = 0  # тела до сжатия
+        self.request_wire_bytes = 0  # тела после сжатия
+
+    def encode_request(
+        self, method: str, endpoint: str, content: Optional[bytes]
+    ) -> Tuple[Optional[bytes], Optional[Dict[str, str]]]:
+        """
+        Сжимает тело запроса, если оно подходит под правила.
+
+        Returns:
+            (тело для отправки, дополнительные заголовки или None)
+        """
+        if (
+            not self.config.enabled
+            or content is None
+            or not self.request_encoding
+            or method not in _BODY_METHODS
+            or len(content) < self.config.request_min_size
+        ):
+            return content, None
+        path = endpoint.split("?", 1)[0]
+        if not any(fnmatch.fnmatchcase(path, p) for p in self.config.request_endpoints):
+            return content, None
+        compressed = compress(content, self.request_encoding, self.config.request_level)
+        if len(compressed) >= len(content):
+            return content, None
+        self.compressed_requests += 1
+        self.request_bytes += len(content)
+        self.request_wire_bytes += len(compressed)
+        return compressed, {"Content-Encoding": self.request_encoding}
+
+    def record_response(self, response: httpx.Response) -> None:
+        self.responses += 1
+        decoded = len(response.content)
+        wire = response.num_bytes_downloaded or decoded
+        if response.headers.get("Content-Encoding", "identity") != "identity":
+            self.compressed_responses += 1
+        self.wire_bytes += wire
+        self.decoded_bytes += decoded
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "accept_encoding": self.accept_encoding,
+            "request_encoding": self.request_encoding,
+            "responses": self.responses,
+            "compressed_responses": self.compressed_responses,
+            "wire_bytes": self.wire_bytes,
+            "decoded_bytes": self.decoded_bytes,
+            "response_ratio": (
+                round(self.wire_bytes / self.decoded_bytes, 3) if self.decoded_bytes else 1.0
+            ),
+            "compressed_requests": self.compressed_requests,
+            "request_bytes_saved": self.request_bytes - self.request_wire_bytes,
+        }
@@ -0,0 +1,89 @@
+"""
+Пул HTTP-соединений RemoteApiClient: параметры httpx.Limits, HTTP/2
+и статистика времени ожидания свободного соединения.
+"""
+
+import importlib.util
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict
+
+import httpx
+
+from .metrics import LatencyWindow
+
+TraceCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class PoolConfig:
+    """Параметры пула соединений к NMservices."""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    pool_timeout: float = 5.0
+    http2: bool = False
+    warmup_connections: int = 0
+
+    def build_limits(self) -> httpx.Limits:
+        """Создает httpx.Limits из настроек."""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+def http2_available() -> bool:
+    """Проверяет, установлен ли пакет h2 (нужен httpx для HTTP/2)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class PoolStats:
+    """
+    Статистика использования пула.
+
+    Время ожидания соединения измеряется через trace-расширение httpcore:
+    от начала запроса до первого события на соединении (TCP connect
+    для нового соединения или отправка заголовков для переиспользованного).
+    """
+
+    def __init__(self):
+        self.wait = LatencyWindow()
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.pool_timeouts = 0
+
+    def start_request(self) -> TraceCallback:
+        """Возвращает trace-callback для одного запроса."""
+        started = time.perf_counter()
+        acquired = False
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            nonlocal acquired
+            if acquired:
+                return
+            if event_name == "connection.connect_tcp.started":
+                self.new_connections += 1
+            elif event_name.endswith(".send_request_headers.started"):
+                self.reused_connections += 1
+            else:
+                return
+            acquired = True
+            self.wait.add(time.perf_counter() - started)
+
+        return trace
+
+    def record_pool_timeout(self) -> None:
+        """Учитывает запрос, не дождавшийся свободного соединения."""
+        self.pool_timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Текущие значения статистики."""
+        return {
+            "wait": self.wait.snapshot(),
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "pool_timeouts": self.pool_timeouts,
+        }
@@ -0,0 +1,149 @@
+"""
+Hedged-запросы для идемпотентных GET.
+
+Если ответ на GET не пришел за время, равное заданному перцентилю недавних
+задержек этого эндпоинта, отправляется второй такой же запрос; используется
+тот ответ, который придет первым, второй запрос отменяется.
+
+Доля hedge-запросов ограничена бюджетом: каждый подходящий запрос добавляет
+max_hedge_ratio токена, каждый hedge тратит один. Так дополнительная нагрузка
+на NMservices не превышает max_hedge_ratio от числа запросов.
+"""
+
+import asyncio
+import fnmatch
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from .circuit_breaker import normalize_endpoint
+from .metrics import LatencyWindow
+
+T = TypeVar("T")
+
+
+def _consume_exception(task: asyncio.Future) -> None:
+    # Проигравший запрос отменяется; его ошибка никому не нужна
+    if not task.cancelled():
+        task.exception()
+
+
+@dataclass
+class HedgingConfig:
+    """Параметры hedged-запросов."""
+
+    enabled: bool = False
+    percentile: float = 95.0  # hedge, если ответа нет дольше этого перцентиля
+    min_delay: float = 0.02  # секунды; не hedge'ить раньше
+    min_samples: int = 20  # пока замеров меньше — hedge не используется
+    max_hedge_ratio: float = 0.1  # не больше 10% дополнительных запросов
+    max_budget: float = 10.0  # сколько hedge'ей можно накопить в запас
+    endpoints: List[str] = field(
+        default_factory=lambda: ["/users/by-telegram/*", "/services", "/services/*"]
+    )
+
+
+class HedgePolicy:
+    """Задержка hedge'а по эндпоинту, бюджет и счетчики."""
+
+    def __init__(self, config: HedgingConfig):
+        self.config = config
+        self._latency: Dict[str, LatencyWindow] = {}
+        self._budget = 0.0
+        self.fired = 0  # отправлено hedge-запросов
+        self.won = 0  # hedge ответил раньше основного запроса
+        self.skipped_budget = 0  # hedge был нужен, но бюджет исчерпан
+
+    def applies(self, endpoint: str) -> bool:
+        if not self.config.enabled:
+            return False
+        path = endpoint.split("?", 1)[0]
+        return any(fnmatch.fnmatchcase(path, pattern) for pattern in self.config.endpoints)
+
+    def _window(self, endpoint: str) -> LatencyWindow:
+        name = normalize_endpoint(endpoint)
+        window = self._latency.get(name)
+        if window is None:
+            window = self._latency[name] = LatencyWindow(size=512)
+        return window
+
+    def delay_for(self, endpoint: str) -> Optional[float]:
+        """Через сколько секунд отправлять hedge или None, если данных мало."""
+        window = self._window(endpoint)
+        if len(window) < self.config.min_samples:
+            return None
+        return max(self.config.min_delay, window.percentile(self.config.percentile))
+
+    def record(self, endpoint: str, elapsed: float) -> None:
+        self._window(endpoint).add(elapsed)
+
+    def on_request(self) -> None:
+        self._budget = min(self.config.max_budget, self._budget + self.config.max_hedge_ratio)
+
+    def try_acquire(self) -> bool:
+        if self._budget < 1.0:
+            self.skipped_budget += 1
+            return False
+        self._budget -= 1.0
+        self.fired += 1
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "fired": self.fired,
+            "won": self.won,
+            "skipped_budget": self.skipped_budget,
+            "budget": round(self._budget, 2),
+            "delay_ms": {
+                name: round(
+                    max(self.config.min_delay, window.percentile(self.config.percentile)) * 1000,
+                    3,
+                )
+                for name, window in self._latency.items()
+                if len(window) >= self.config.min_samples
+            },
+        }
+
+    async def run(self, endpoint: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет fn(), при задержке — параллельно второй fn().
+
+        Возвращает первый успешный результат; исключение — только если
+        оба запроса завершились ошибкой (ошибку первого из них).
+        """
+        self.on_request()
+        delay = self.delay_for(endpoint)
+        started = time.perf_counter()
+        if delay is None:
+            result = await fn()
+            self.record(endpoint, time.perf_counter() - started)
+            return result
+
+        primary = asyncio.ensure_future(fn())
+        primary.add_done_callback(_consume_exception)
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self.try_acquire():
+                hedge = asyncio.ensure_future(fn())
+                hedge.add_done_callback(_consume_exception)
+                tasks.add(hedge)
+
+            first_error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.won += 1
+                        self.record(endpoint, time.perf_counter() - started)
+                        return task.result()
+                    first_error = first_error or task.exception()
+            if first_error is None:
+                raise asyncio.CancelledError()
+            raise first_error
+        finally:
+            for task in tasks:
+                task.cancel()
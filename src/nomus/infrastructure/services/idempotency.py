@@ -0,0 +1,55 @@
+"""
+Ключи идемпотентности для неидемпотентных запросов (POST /orders, /payment/initiate).
+
+Ключ генерируется на логическую операцию (nomus.common.idempotency) и
+передается в заголовке Idempotency-Key во всех повторах, поэтому
+NMservices может распознать повтор запроса, который уже выполнил.
+
+Локальный кеш хранит ответы уже завершенных операций: повтор с тем же
+ключом (например, повторное нажатие «Подтвердить») не идет в сеть.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+@dataclass
+class IdempotencyConfig:
+    """Параметры ключей идемпотентности."""
+
+    header: str = "Idempotency-Key"
+    cache_ttl: float = 600.0  # сколько помнить завершенные операции, секунды
+    max_entries: int = 1000
+
+
+class IdempotencyCache:
+    """Ответы завершенных операций по ключу идемпотентности (TTL + LRU)."""
+
+    def __init__(self, config: IdempotencyConfig, clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Ответ для ключа или None, если операция не завершалась (или забыта)."""
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, body = item
+        if self._clock() >= expires_at:
+            del self._entries[key]
+            return None
+        self.hits += 1
+        return body
+
+    def put(self, key: str, body: Any) -> None:
+        self._entries[key] = (self._clock() + self.config.cache_ttl, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits}
@@ -0,0 +1,326 @@
+"""
+JSON-кодек RemoteApiClient.
+
+Бэкенды (выбираются через remote_api.json_codec):
+- msgspec: разбор сразу в типизированные dataclass'ы, без промежуточных dict
+- orjson: быстрый разбор в dict и сериализация в bytes
+- stdlib: json из стандартной библиотеки, доступен всегда
+
+"auto" выбирает первый установленный бэкенд в этом порядке.
+Типизированный разбор (decode(data, SomeDataclass)) поддерживают все
+бэкенды: orjson и stdlib разбирают в dict и конвертируют через convert().
+"""
+
+import dataclasses
+import functools
+import json
+import logging
+import types
+import typing
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from importlib.util import find_spec
+from typing import Any, Callable, Dict, Optional, Tuple, Type, TypeVar, Union
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_NONE_TYPE = type(None)
+
+CODEC_PREFERENCE: Tuple[str, ...] = ("msgspec", "orjson", "stdlib")
+
+
+class JsonDecodeError(ValueError):
+    """Тело ответа не является JSON или не соответствует ожидаемой структуре."""
+
+
+def _default(obj: Any) -> Any:
+    """Сериализация типов, которые не поддерживает json напрямую."""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# ─── Конвертация dict → dataclass ────────────────────────────────────
+#
+# Для каждого типа один раз строится функция-конвертер (замыкание), чтобы
+# при разборе не разбирать аннотации заново для каждого значения.
+
+Converter = Callable[[Any], Any]
+
+
+def _type_name(value: Any) -> str:
+    return type(value).__name__
+
+
+def _scalar_converter(tp: type) -> Converter:
+    def convert_scalar(value: Any) -> Any:
+        if type(value) is tp:
+            return value
+        if tp is float and type(value) is int:
+            return float(value)
+        raise JsonDecodeError(f"Expected {tp.__name__}, got {_type_name(value)}")
+
+    return convert_scalar
+
+
+def _convert_decimal(value: Any) -> Decimal:
+    if type(value) not in (str, int, float):
+        raise JsonDecodeError(f"Expected decimal, got {_type_name(value)}")
+    try:
+        return Decimal(value if type(value) is not float else str(value))
+    except InvalidOperation as e:
+        raise JsonDecodeError(f"Invalid decimal: {value!r}") from e
+
+
+def _passthrough_types(tp: Any) -> Optional[frozenset]:
+    """JSON-типы, которые для поля типа tp подходят без преобразования."""
+    if tp in (int, str, bool, float):
+        return frozenset({tp})
+    origin = typing.get_origin(tp)
+    if origin is Union or origin is types.UnionType:
+        passthrough: set = set()
+        for arg in typing.get_args(tp):
+            if arg is _NONE_TYPE:
+                passthrough.add(_NONE_TYPE)
+            elif arg in (int, str, bool, float):
+                passthrough.add(arg)
+        return frozenset(passthrough)
+    return None
+
+
+def _dataclass_converter(tp: type) -> Converter:
+    hints = typing.get_type_hints(tp)
+    fields = [
+        (
+            f.name,
+            _passthrough_types(hints[f.name]) or frozenset(),
+            _converter(hints[f.name]),
+            f.default is dataclasses.MISSING and f.default_factory is dataclasses.MISSING,
+        )
+        for f in dataclasses.fields(tp)
+        if f.init
+    ]
+
+    def convert_dataclass(value: Any) -> Any:
+        if type(value) is not dict:
+            raise JsonDecodeError(f"Expected object for {tp.__name__}, got {_type_name(value)}")
+        kwargs = {}
+        for name, passthrough, convert_field, required in fields:
+            if name in value:
+                field_value = value[name]
+                # Большинство полей уже имеют нужный тип — без вызова конвертера
+                kwargs[name] = (
+                    field_value
+                    if type(field_value) in passthrough
+                    else convert_field(field_value)
+                )
+            elif required:
+                raise JsonDecodeError(f"{tp.__name__}: missing required field '{name}'")
+        return tp(**kwargs)
+
+    return convert_dataclass
+
+
+def _union_converter(tp: Any) -> Converter:
+    args = typing.get_args(tp)
+    nullable = _NONE_TYPE in args
+    options = [_converter(arg) for arg in args if arg is not _NONE_TYPE]
+
+    def convert_union(value: Any) -> Any:
+        if value is None:
+            if nullable:
+                return None
+            raise JsonDecodeError(f"Unexpected null for {tp}")
+        for convert_option in options:
+            try:
+                return convert_option(value)
+            except JsonDecodeError:
+                continue
+        raise JsonDecodeError(f"Value {value!r} does not match {tp}")
+
+    return convert_union
+
+
+@functools.lru_cache(maxsize=None)
+def _converter(tp: Any) -> Converter:
+    """Конвертер для типа tp; строится один раз на тип."""
+    if tp is Any:
+        return lambda value: value
+    if dataclasses.is_dataclass(tp):
+        return _dataclass_converter(tp)
+
+    origin = typing.get_origin(tp)
+    if origin is list:
+        (item_type,) = typing.get_args(tp) or (Any,)
+        convert_item = _converter(item_type)
+
+        def convert_list(value: Any) -> list:
+            if type(value) is not list:
+                raise JsonDecodeError(f"Expected array, got {_type_name(value)}")
+            return [convert_item(item) for item in value]
+
+        return convert_list
+
+    if origin is dict:
+        _, value_type = typing.get_args(tp) or (str, Any)
+        convert_value = None if value_type is Any else _converter(value_type)
+
+        def convert_dict(value: Any) -> dict:
+            if type(value) is not dict:
+                raise JsonDecodeError(f"Expected object, got {_type_name(value)}")
+            if convert_value is None:
+                return value
+            return {key: convert_value(item) for key, item in value.items()}
+
+        return convert_dict
+
+    if origin is Union or origin is types.UnionType:
+        return _union_converter(tp)
+    if tp is Decimal:
+        return _convert_decimal
+    if tp in (int, float, str, bool):
+        return _scalar_converter(tp)
+    return lambda value: value
+
+
+def convert(value: Any, tp: Any) -> Any:
+    """
+    Преобразует результат json.loads в значение типа tp.
+
+    Поддерживаются dataclass'ы, list[...], dict[...], Optional/Union,
+    Decimal и скалярные типы. Лишние ключи объекта игнорируются.
+
+    Raises:
+        JsonDecodeError: Если значение не соответствует типу
+    """
+    return _converter(tp)(value)
+
+
+# ─── Бэкенды ─────────────────────────────────────────────────────────
+
+
+class JsonCodec:
+    """Кодек на стандартном json."""
+
+    name = "stdlib"
+
+    def encode(self, obj: Any) -> bytes:
+        return json.dumps(
+            obj, separators=(",", ":"), ensure_ascii=False, default=_default
+        ).encode("utf-8")
+
+    def decode(self, data: bytes, tp: Optional[Type[T]] = None) -> Any:
+        """
+        Разбирает JSON; если задан tp — сразу в значение этого типа.
+
+        Raises:
+            JsonDecodeError: Некорректный JSON или несоответствие типу
+        """
+        try:
+            value = self._loads(data)
+        except ValueError as e:
+            raise JsonDecodeError(str(e)) from e
+        return value if tp is None else convert(value, tp)
+
+    def convert(self, value: Any, tp: Type[T]) -> T:
+        """Преобразует уже разобранное значение (dict, list, ...) в тип tp."""
+        return convert(value, tp)
+
+    def _loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """Кодек на orjson: разбор в dict и конвертация в типы через convert()."""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def encode(self, obj: Any) -> bytes:
+        return self._orjson.dumps(obj, default=_default)
+
+    def _loads(self, data: bytes) -> Any:
+        return self._orjson.loads(data)
+
+
+class MsgspecCodec(JsonCodec):
+    """Кодек на msgspec: типизированный разбор без промежуточных dict."""
+
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self._msgspec = msgspec
+        self._encoder = msgspec.json.Encoder(enc_hook=_default)
+        self._untyped = msgspec.json.Decoder()
+        self._decoders: Dict[Any, Any] = {}
+
+    def encode(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+    def decode(self, data: bytes, tp: Optional[Type[T]] = None) -> Any:
+        if tp is None:
+            decoder = self._untyped
+        else:
+            decoder = self._decoders.get(tp)
+            if decoder is None:
+                decoder = self._decoders[tp] = self._msgspec.json.Decoder(tp)
+        try:
+            return decoder.decode(data)
+        except self._msgspec.MsgspecError as e:
+            raise JsonDecodeError(str(e)) from e
+
+    def convert(self, value: Any, tp: Type[T]) -> T:
+        try:
+            return self._msgspec.convert(value, tp)
+        except self._msgspec.MsgspecError as e:
+            raise JsonDecodeError(str(e)) from e
+
+
+_BACKENDS: Dict[str, Type[JsonCodec]] = {
+    "stdlib": JsonCodec,
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+}
+
+
+def codec_available(name: str) -> bool:
+    """Установлен ли пакет бэкенда."""
+    return name == "stdlib" or find_spec(name) is not None
+
+
+def select_codec(preferred: str = "auto") -> JsonCodec:
+    """
+    Создает кодек по имени.
+
+    Args:
+        preferred: "auto" | "msgspec" | "orjson" | "stdlib"
+
+    Если запрошенный бэкенд не установлен, используется stdlib с предупреждением.
+    """
+    if preferred == "auto":
+        name = next(n for n in CODEC_PREFERENCE if codec_available(n))
+    elif preferred not in _BACKENDS:
+        raise ValueError(f"Unknown JSON codec: {preferred}")
+    elif not codec_available(preferred):
+        log.warning(
+            "JSON codec '%s' requested but the package is not installed "
+            "(pip install nomus[%s]); falling back to stdlib json",
+            preferred,
+            preferred,
+        )
+        name = "stdlib"
+    else:
+        name = preferred
+    return _BACKENDS[name]()
@@ -0,0 +1,54 @@
+"""
+Простые метрики для клиента удаленного API.
+
+Не зависит от внешних библиотек мониторинга: значения собираются в памяти
+и отдаются словарем через RemoteApiClient.stats().
+"""
+
+from collections import deque
+from typing import Deque, Dict
+
+
+class LatencyWindow:
+    """
+    Скользящее окно последних измерений (в секундах).
+
+    Хранит не более `size` значений и считает по ним перцентили.
+    """
+
+    def __init__(self, size: int = 1024):
+        self._values: Deque[float] = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        """Добавляет измерение."""
+        self._values.append(value)
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """Возвращает q-перцентиль (0 < q <= 100) по окну или 0.0, если данных нет."""
+        if not self._values:
+            return 0.0
+        ordered = sorted(self._values)
+        index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Сводка в миллисекундах: среднее, p50, p95, p99, максимум."""
+        avg = self.total / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "avg_ms": round(avg * 1000, 3),
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
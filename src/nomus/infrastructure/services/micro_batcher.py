@@ -0,0 +1,161 @@
+"""
+Micro-batching GET-запросов по пользователям.
+
+Одиночные запросы вида GET /orders/active?telegram_id=X, пришедшие за
+короткое окно (window), собираются в один запрос
+GET /orders/active?telegram_ids=X&telegram_ids=Y&..., а результаты
+раздаются ожидающим корутинам.
+
+Формат bulk-ответа NMservices:
+    {"by_telegram_id": {"X": <ответ как на одиночный запрос>, ...}}
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple, Type
+
+from nomus.common.deadline import detached_context
+
+log = logging.getLogger(__name__)
+
+BULK_RESPONSE_FIELD = "by_telegram_id"
+
+_MISSING = object()
+
+
+@dataclass
+class BatchingConfig:
+    """Параметры micro-batching."""
+
+    enabled: bool = False
+    window: float = 0.01  # сколько ждать попутные запросы, секунды
+    max_batch: int = 100  # при достижении размера пачка отправляется сразу
+    key_param: str = "telegram_id"
+    bulk_param: str = "telegram_ids"
+    endpoints: List[str] = field(
+        default_factory=lambda: ["/orders/active", "/orders/pending-notifications"]
+    )
+
+
+# execute(endpoint, keys, response_type) -> {str(key): результат или исключение}
+BulkExecutor = Callable[[str, List[Any], Optional[Type]], Awaitable[Dict[str, Any]]]
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        future.exception()
+
+
+class _Batch:
+    def __init__(self):
+        self.futures: Dict[Any, asyncio.Future] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """Собирает одиночные запросы в пачки по (endpoint, response_type)."""
+
+    def __init__(self, config: BatchingConfig, execute: BulkExecutor):
+        self.config = config
+        self._execute = execute
+        self._pending: Dict[Tuple[str, Optional[Type]], _Batch] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.batched_requests = 0
+        self.max_batch_size = 0
+
+    def batch_key(self, endpoint: str, params: Optional[Dict[str, Any]]) -> Optional[Hashable]:
+        """Значение ключевого параметра, если запрос можно объединять, иначе None."""
+        if not self.config.enabled or endpoint not in self.config.endpoints:
+            return None
+        if not params or len(params) != 1:
+            return None
+        value = params.get(self.config.key_param)
+        if value is None or isinstance(value, (list, tuple)):
+            return None
+        return value
+
+    async def load(self, endpoint: str, key: Any, response_type: Optional[Type] = None) -> Any:
+        """Ставит запрос в текущую пачку и ждет свой результат."""
+        group = (endpoint, response_type)
+        batch = self._pending.get(group)
+        if batch is None:
+            batch = self._pending[group] = _Batch()
+            batch.timer = asyncio.get_running_loop().call_later(
+                self.config.window, self._dispatch, group
+            )
+
+        future = batch.futures.get(key)
+        if future is None:
+            future = batch.futures[key] = asyncio.get_running_loop().create_future()
+            # Ожидающий мог быть отменен — исключение пачки не должно остаться «never retrieved»
+            future.add_done_callback(_consume_exception)
+            if len(batch.futures) >= self.config.max_batch:
+                self._dispatch(group)
+        return await asyncio.shield(future)
+
+    def _dispatch(self, group: Tuple[str, Optional[Type]]) -> None:
+        batch = self._pending.pop(group, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        # Пачка общая: ее запрос не ограничен deadline'ом первого вызывающего
+        task = asyncio.get_running_loop().create_task(
+            self._run(group, batch), context=detached_context()
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, group: Tuple[str, Optional[Type]], batch: _Batch) -> None:
+        endpoint, response_type = group
+        keys = list(batch.futures)
+        self.batches += 1
+        self.batched_requests += len(keys)
+        self.max_batch_size = max(self.max_batch_size, len(keys))
+
+        try:
+            results = await self._execute(endpoint, keys, response_type)
+        except asyncio.CancelledError:
+            for future in batch.futures.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in batch.futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, future in batch.futures.items():
+            if future.done():
+                continue
+            result = results.get(str(key), _MISSING)
+            if result is _MISSING:
+                future.set_exception(
+                    LookupError(f"{endpoint}: no result for {self.config.key_param}={key}")
+                )
+            elif isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """Отправляет накопленные пачки и ждет их завершения."""
+        for group in list(self._pending):
+            self._dispatch(group)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Счетчики для мониторинга."""
+        return {
+            "batches": self.batches,
+            "batched_requests": self.batched_requests,
+            "avg_batch_size": (
+                round(self.batched_requests / self.batches, 2) if self.batches else 0.0
+            ),
+            "max_batch_size": self.max_batch_size,
+            "pending": sum(len(batch.futures) for batch in self._pending.values()),
+        }
+
@@ -4,10 +4,42 @@ HTTP-клиент для взаимодействия с удаленными м
 """
 
 import asyncio
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Type
 import httpx
 
+from nomus.common.deadline import current_deadline, detached_context
+
+from .connection_pool import PoolConfig, PoolStats, http2_available
+from .single_flight import SingleFlight, make_request_key
+from .circuit_breaker import CircuitBreakerConfig, CircuitBreakerRegistry, CircuitState
+from .retry_policy import (
+    EndpointCooldowns,
+    ThrottleConfig,
+    full_jitter_delay,
+    parse_retry_after,
+)
+from .response_cache import CacheRule, ResponseCache, ResponseCacheConfig, in_resource, resource_of
+from .bulkhead import BulkheadConfig, BulkheadRejectedError, Bulkheads
+from .json_codec import JsonDecodeError, select_codec
+from .micro_batcher import BULK_RESPONSE_FIELD, BatchingConfig, MicroBatcher
+from .adaptive_limit import AdaptiveLimitConfig, ConcurrencyController
+from .hedging import HedgePolicy, HedgingConfig
+from .idempotency import IdempotencyCache, IdempotencyConfig
+from .compression import Compression, CompressionConfig
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# Ответы, по которым видно, что эндпоинт не принимает bulk-форму (telegram_ids=[...])
+_BULK_UNSUPPORTED_STATUSES = frozenset({400, 404, 405, 422})
+
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Ошибки, при которых запрос гарантированно не дошел до сервера
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
 
 @dataclass
 class RemoteApiConfig:
@@ -18,6 +50,19 @@ class RemoteApiConfig:
     timeout: float = 30.0
     max_retries: int = 3
     retry_delay: float = 1.0
+    retry_max_delay: float = 10.0
+    pool: PoolConfig = field(default_factory=PoolConfig)
+    single_flight: bool = True
+    circuit_breaker: CircuitBreakerConfig = field(default_factory=CircuitBreakerConfig)
+    cache: ResponseCacheConfig = field(default_factory=ResponseCacheConfig)
+    bulkheads: BulkheadConfig = field(default_factory=BulkheadConfig)
+    json_codec: str = "auto"  # auto | msgspec | orjson | stdlib
+    batching: BatchingConfig = field(default_factory=BatchingConfig)
+    adaptive_limit: AdaptiveLimitConfig = field(default_factory=AdaptiveLimitConfig)
+    hedging: HedgingConfig = field(default_factory=HedgingConfig)
+    idempotency: IdempotencyConfig = field(default_factory=IdempotencyConfig)
+    throttle: ThrottleConfig = field(default_factory=ThrottleConfig)
+    compression: CompressionConfig = field(default_factory=CompressionConfig)
 
 
 class RemoteApiError(Exception):
@@ -46,63 +91,227 @@ class RemoteApiValidationError(RemoteApiError):
     pass
 
 
+class RemoteApiThrottledError(RemoteApiError):
+    """Сервер ограничивает запросы (429/503), повторы не помогли или пауза слишком длинная."""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        response_body: Optional[Dict[str, Any]] = None,
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(message, status_code, response_body)
+        self.retry_after = retry_after
+
+
 class RemoteApiConnectionError(RemoteApiError):
     """Ошибка соединения с сервером."""
 
     pass
 
 
+class CircuitOpenError(RemoteApiConnectionError):
+    """Запрос отклонен без обращения к серверу: circuit breaker эндпоинта открыт."""
+
+    pass
+
+
+class DeadlineExceededError(RemoteApiConnectionError):
+    """Бюджет времени на обработку update исчерпан, запрос прерван."""
+
+    pass
+
+
+class RemoteApiOverloadedError(RemoteApiConnectionError):
+    """Запрос отклонен на стороне клиента: очередь к NMservices переполнена."""
+
+    pass
+
+
 class RemoteApiClient:
     """
     Асинхронный HTTP-клиент для взаимодействия с NMservices API.
 
     Поддерживает:
     - Аутентификацию через X-API-Key header
-    - Автоматические retry при сетевых ошибках
+    - Автоматические retry при сетевых ошибках (экспоненциальная задержка с jitter)
+    - Circuit breaker на каждый эндпоинт
+    - Кеш ответов GET с TTL, LRU и условной ревалидацией (opt-in)
+    - Bulkhead'ы по классам эндпоинтов и приоритетная очередь запросов
+    - Deadline текущего update (nomus.common.deadline): таймауты и retry
+      укорачиваются до оставшегося времени
     - Таймауты запросов
     - Обработку ошибок API
+    - Настраиваемый пул соединений, HTTP/2 и прогрев соединений
+    - Объединение одинаковых одновременных GET-запросов (single-flight)
+    - Быстрый JSON-кодек (msgspec / orjson) и разбор ответов сразу
+      в типизированные dataclass'ы (get(..., response_type=...))
+    - Micro-batching одиночных GET по telegram_id в bulk-запросы (opt-in)
+    - Адаптивный (AIMD) лимит одновременных запросов и token bucket (opt-in)
+    - Hedged-запросы для идемпотентных GET с медленным хвостом задержек (opt-in)
+    - Ключи идемпотентности для POST: безопасные повторы и локальная дедупликация
+    - Повторы после 429/503 с учетом Retry-After и общий для всех корутин
+      cool-down эндпоинта
+    - Сжатие ответов (zstd / br / gzip) и больших тел bulk-запросов
     """
 
-    def __init__(self, config: RemoteApiConfig):
+    def __init__(
+        self,
+        config: RemoteApiConfig,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
         """
         Инициализация клиента.
 
         Args:
             config: Конфигурация подключения к API
+            transport: Альтернативный транспорт httpx (для тестов)
         """
         self.config = config
+        self._transport = transport
         self._client: Optional[httpx.AsyncClient] = None
+        self.pool_stats = PoolStats()
+        self._single_flight = SingleFlight()
+        self._circuit_breakers = CircuitBreakerRegistry(config.circuit_breaker)
+        self._response_cache = ResponseCache(config.cache)
+        self._bulkheads = Bulkheads(config.bulkheads, total_limit=config.pool.max_connections)
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._codec = select_codec(config.json_codec)
+        self._batcher = MicroBatcher(config.batching, self._fetch_bulk)
+        self._bulk_unsupported: Set[str] = set()
+        self._concurrency = ConcurrencyController(config.adaptive_limit)
+        self._hedging = HedgePolicy(config.hedging)
+        self._idempotency = IdempotencyCache(config.idempotency)
+        # Отдельно от GET: объединение POST по ключу не искажает статистику single_flight
+        self._idempotent_posts = SingleFlight()
+        self._cooldowns = EndpointCooldowns()
+        self._compression = Compression(config.compression)
+        log.info("RemoteApiClient JSON codec: %s", self._codec.name)
 
     @property
     def _headers(self) -> Dict[str, str]:
         """Заголовки для запросов с аутентификацией."""
-        return {
+        headers = {
             "X-API-Key": self.config.api_key,
             "Content-Type": "application/json",
         }
+        if self.config.compression.enabled:
+            headers["Accept-Encoding"] = self._compression.accept_encoding
+        return headers
 
     async def _get_client(self) -> httpx.AsyncClient:
         """Получает или создает HTTP-клиент."""
         if self._client is None or self._client.is_closed:
+            pool = self.config.pool
+            use_http2 = pool.http2
+            if use_http2 and not http2_available():
+                log.warning(
+                    "HTTP/2 requested but package 'h2' is not installed, "
+                    "falling back to HTTP/1.1"
+                )
+                use_http2 = False
             self._client = httpx.AsyncClient(
                 base_url=self.config.base_url,
                 headers=self._headers,
-                timeout=httpx.Timeout(self.config.timeout),
+                timeout=httpx.Timeout(self.config.timeout, pool=pool.pool_timeout),
+                limits=pool.build_limits(),
+                http2=use_http2,
+                transport=self._transport,
             )
         return self._client
 
+    async def warm_up(self, connections: Optional[int] = None) -> int:
+        """
+        Заранее открывает соединения с API, чтобы первый пользователь
+        не платил за TCP/TLS handshake.
+
+        Args:
+            connections: Сколько соединений открыть
+                (по умолчанию pool.warmup_connections)
+
+        Returns:
+            Количество успешных прогревочных запросов
+        """
+        count = self.config.pool.warmup_connections if connections is None else connections
+        # Больше keep-alive соединений пул все равно не сохранит
+        count = min(count, self.config.pool.max_keepalive_connections)
+        if count <= 0:
+            return 0
+
+        client = await self._get_client()
+
+        async def _open_one() -> bool:
+            try:
+                response = await client.get(
+                    "/", extensions={"trace": self.pool_stats.start_request()}
+                )
+                await response.aclose()
+                return True
+            except httpx.HTTPError as e:
+                log.debug("Warm-up request failed: %s", e)
+                return False
+
+        results = await asyncio.gather(*(_open_one() for _ in range(count)))
+        opened = sum(results)
+        log.info("Remote API pool warmed up: %d/%d connections", opened, count)
+        return opened
+
+    def stats(self) -> Dict[str, Any]:
+        """Снимок метрик клиента для мониторинга."""
+        return {
+            "pool": self.pool_stats.snapshot(),
+            "single_flight": self._single_flight.snapshot(),
+            "circuit_breakers": self._circuit_breakers.snapshot(),
+            "cache": self._response_cache.snapshot(),
+            "bulkheads": self._bulkheads.snapshot(),
+            "concurrency": self._concurrency.snapshot(),
+            "hedging": self._hedging.snapshot(),
+            "idempotency": {
+                **self._idempotency.snapshot(),
+                "coalesced": self._idempotent_posts.hits,
+                "in_flight": self._idempotent_posts.in_flight,
+            },
+            "throttling": self._cooldowns.snapshot(),
+            "compression": self._compression.snapshot(),
+            "batching": {
+                **self._batcher.snapshot(),
+                "fallback_endpoints": sorted(self._bulk_unsupported),
+            },
+        }
+
+    @property
+    def concurrency_limit(self) -> int:
+        """Текущий адаптивный лимит одновременных запросов."""
+        return self._concurrency.limit
+
+    @property
+    def circuit_breakers(self) -> CircuitBreakerRegistry:
+        """Circuit breaker'ы эндпоинтов (для подписки на смену состояний)."""
+        return self._circuit_breakers
+
     async def close(self) -> None:
         """Закрывает HTTP-клиент."""
+        for task in list(self._background_tasks):
+            task.cancel()
+        # Накопленные пачки отправляются, чтобы ожидающие не зависли
+        await self._batcher.close()
         if self._client and not self._client.is_closed:
             await self._client.aclose()
             self._client = None
 
-    async def _handle_response(self, response: httpx.Response) -> Dict[str, Any]:
+    async def _handle_response(
+        self,
+        response: httpx.Response,
+        response_type: Optional[Type] = None,
+    ) -> Any:
         """
         Обрабатывает ответ от API.
 
         Args:
             response: HTTP-ответ
+            response_type: Тип (dataclass), в который разбирается успешный ответ;
+                None — разбор в dict
 
         Returns:
             Распарсенный JSON-ответ
@@ -110,11 +319,22 @@ class RemoteApiClient:
         Raises:
             RemoteApiAuthError: При ошибке аутентификации (403)
             RemoteApiValidationError: При ошибке валидации (422)
-            RemoteApiError: При других ошибках API
+            RemoteApiThrottledError: Сервер ограничивает запросы (429/503)
+            RemoteApiError: При других ошибках API и при ответе неожиданной структуры
         """
+        if response_type is not None and response.status_code < 400:
+            try:
+                return self._codec.decode(response.content, response_type)
+            except JsonDecodeError as e:
+                raise RemoteApiError(
+                    message=f"Unexpected response body for {response_type.__name__}: {e}",
+                    status_code=response.status_code,
+                    response_body={"raw": response.text},
+                ) from e
+
         try:
-            body = response.json()
-        except Exception:
+            body = self._codec.decode(response.content)
+        except JsonDecodeError:
             body = {"raw": response.text}
 
         if response.status_code == 403:
@@ -131,6 +351,14 @@ class RemoteApiClient:
                 response_body=body,
             )
 
+        if self.config.throttle.enabled and response.status_code in self.config.throttle.statuses:
+            raise RemoteApiThrottledError(
+                message=f"API throttled: {response.status_code}",
+                status_code=response.status_code,
+                response_body=body,
+                retry_after=parse_retry_after(response.headers.get("Retry-After")),
+            )
+
         if response.status_code >= 400:
             raise RemoteApiError(
                 message=f"API error: {response.status_code}",
@@ -140,13 +368,32 @@ class RemoteApiClient:
 
         return body
 
+    @asynccontextmanager
+    async def _deadline_guard(self, endpoint: str) -> AsyncIterator[None]:
+        """Прерывает блок, когда истекает deadline текущего update."""
+        deadline = current_deadline()
+        if deadline is None:
+            yield
+            return
+        if deadline.expired:
+            raise DeadlineExceededError(message=f"Deadline exceeded before {endpoint}")
+        try:
+            async with asyncio.timeout(deadline.remaining()):
+                yield
+        except TimeoutError as e:
+            raise DeadlineExceededError(
+                message=f"Deadline exceeded while waiting for {endpoint}"
+            ) from e
+
     async def _request_with_retry(
         self,
         method: str,
         endpoint: str,
         json_data: Optional[Dict[str, Any]] = None,
         params: Optional[Dict[str, Any]] = None,
-    ) -> Dict[str, Any]:
+        response_type: Optional[Type] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Any:
         """
         Выполняет HTTP-запрос с автоматическими retry.
 
@@ -154,62 +401,563 @@ class RemoteApiClient:
             method: HTTP-метод (GET, POST, etc.)
             endpoint: Путь эндпоинта (например, "/users/register")
             json_data: Данные для отправки в теле запроса
+            response_type: Тип, в который разбирается успешный ответ
+            headers: Дополнительные заголовки запроса
 
         Returns:
             Распарсенный JSON-ответ
 
         Raises:
+            CircuitOpenError: Если circuit breaker эндпоинта открыт
+            DeadlineExceededError: Если истек deadline текущего update
+            RemoteApiOverloadedError: Если очередь bulkhead'а переполнена
             RemoteApiConnectionError: При невозможности установить соединение
             RemoteApiError: При ошибках API
         """
+        response = await self._send(
+            method, endpoint, json_data=json_data, params=params, headers=headers
+        )
+        return await self._handle_response(response, response_type)
+
+    def _attempt_timeout(self) -> httpx.Timeout:
+        """Таймаут одной попытки с учетом оставшегося бюджета update."""
+        timeout = self.config.timeout
+        pool_timeout = self.config.pool.pool_timeout
+        deadline = current_deadline()
+        if deadline is not None:
+            remaining = deadline.remaining()
+            timeout = min(timeout, remaining)
+            pool_timeout = min(pool_timeout, remaining)
+        return httpx.Timeout(timeout, pool=pool_timeout)
+
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        json_data: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """Отправляет запрос; идемпотентные GET при медленном ответе hedge'атся."""
+        if method == "GET" and self._hedging.applies(endpoint):
+            return await self._hedging.run(
+                endpoint,
+                lambda: self._send_with_retry(method, endpoint, params=params, headers=headers),
+            )
+        return await self._send_with_retry(
+            method, endpoint, json_data=json_data, params=params, headers=headers
+        )
+
+    async def _send_with_retry(
+        self,
+        method: str,
+        endpoint: str,
+        json_data: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """
+        Отправляет запрос с retry и circuit breaker, не разбирая ответ.
+
+        Returns:
+            HTTP-ответ (в том числе с кодом ошибки — его разбирает _handle_response)
+        """
+        breaker = self._circuit_breakers.get(endpoint)
         last_exception: Optional[Exception] = None
+        attempts = 0
+        # Неидемпотентный запрос без ключа нельзя повторять, если он мог дойти до сервера
+        retry_safe = method in _IDEMPOTENT_METHODS or bool(
+            headers and self.config.idempotency.header in headers
+        )
+        # Тело сериализуется один раз и переиспользуется во всех попытках
+        content = self._codec.encode(json_data) if json_data is not None else None
+        content, encoding_headers = self._compression.encode_request(method, endpoint, content)
+        if encoding_headers:
+            headers = {**headers, **encoding_headers} if headers else encoding_headers
+
+        throttle = self.config.throttle
 
         for attempt in range(self.config.max_retries):
+            cooldown = self._cooldowns.remaining(endpoint)
+            if cooldown > 0:
+                # Эндпоинт ответил 429/503 — ждут все запросы к нему, а не только повтор
+                deadline = current_deadline()
+                if deadline is not None and deadline.remaining() <= cooldown:
+                    raise DeadlineExceededError(
+                        message=f"Deadline exceeded, {endpoint} is throttled for {cooldown:.2f}s",
+                    )
+                if cooldown > throttle.max_retry_after:
+                    raise RemoteApiThrottledError(
+                        message=f"{endpoint} is throttled for {cooldown:.2f}s",
+                        retry_after=cooldown,
+                    )
+                await self._cooldowns.wait(endpoint)
+
+            if not breaker.allow_request():
+                raise CircuitOpenError(
+                    message=f"Circuit breaker is open for {breaker.name}",
+                )
+
+            attempts = attempt + 1
             try:
                 client = await self._get_client()
-                response = await client.request(
-                    method=method,
-                    url=endpoint,
-                    json=json_data,
-                    params=params,
-                )
-                return await self._handle_response(response)
+                async with self._deadline_guard(endpoint):
+                    async with self._bulkheads.slot(method, endpoint):
+                        async with self._concurrency.slot() as permit:
+                            response = await client.request(
+                                method=method,
+                                url=endpoint,
+                                content=content,
+                                params=params,
+                                headers=headers,
+                                timeout=self._attempt_timeout(),
+                                extensions={"trace": self.pool_stats.start_request()},
+                            )
+                            if response.status_code >= 500 or response.status_code == 429:
+                                permit.mark_overloaded()
+
+            except DeadlineExceededError:
+                breaker.record_ignored()
+                raise
+
+            except BulkheadRejectedError as e:
+                breaker.record_ignored()
+                raise RemoteApiOverloadedError(message=str(e)) from e
 
-            except (httpx.ConnectError, httpx.TimeoutException) as e:
+            except httpx.TransportError as e:
+                # Соединение, таймаут, обрыв чтения/записи, нарушение протокола
+                breaker.record_failure()
+                if isinstance(e, httpx.PoolTimeout):
+                    self.pool_stats.record_pool_timeout()
                 last_exception = e
+                if not retry_safe and not isinstance(e, _NOT_SENT_ERRORS):
+                    break
                 if attempt < self.config.max_retries - 1:
-                    print(
-                        f"[RemoteAPI] Connection failed, retrying "
-                        f"({attempt + 1}/{self.config.max_retries})..."
+                    if breaker.state is CircuitState.OPEN:
+                        # Сервер признан недоступным — не ждем впустую
+                        break
+                    delay = full_jitter_delay(
+                        attempt, self.config.retry_delay, self.config.retry_max_delay
                     )
-                    await asyncio.sleep(self.config.retry_delay)
+                    deadline = current_deadline()
+                    if deadline is not None and deadline.remaining() <= delay:
+                        # До следующей попытки бюджет все равно закончится
+                        raise DeadlineExceededError(
+                            message=f"Deadline exceeded, no time left to retry {endpoint}: {e}",
+                        ) from e
+                    log.warning(
+                        "%s %s failed: %s; retrying in %.2fs (%d/%d)",
+                        method,
+                        endpoint,
+                        e,
+                        delay,
+                        attempt + 1,
+                        self.config.max_retries,
+                    )
+                    await asyncio.sleep(delay)
                 continue
 
-            except RemoteApiError:
-                # Не retry для ошибок API (403, 422, etc.)
+            except BaseException:
+                # Отмена и прочие прерывания не говорят о здоровье сервера
+                breaker.record_ignored()
                 raise
 
+            self._compression.record_response(response)
+            status = response.status_code
+            if throttle.enabled and status in throttle.statuses:
+                if status == 429:
+                    # Сервер жив и отвечает, он лишь ограничивает частоту
+                    breaker.record_ignored()
+                else:
+                    breaker.record_failure()
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                delay = (
+                    retry_after
+                    if retry_after is not None
+                    else full_jitter_delay(
+                        attempt, self.config.retry_delay, self.config.retry_max_delay
+                    )
+                )
+                self._cooldowns.trip(endpoint, delay)
+                # 429 означает, что запрос не обработан, — его можно повторить и без ключа
+                retryable = retry_safe or status == 429
+                if (
+                    retryable
+                    and attempt < self.config.max_retries - 1
+                    and delay <= throttle.max_retry_after
+                    and breaker.state is not CircuitState.OPEN
+                ):
+                    log.info(
+                        "Remote API throttled %s (%s), retrying in %.2fs",
+                        endpoint,
+                        status,
+                        delay,
+                    )
+                    continue
+                return response
+
+            if status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            # Не retry для ошибок API (403, 422, 5xx, etc.)
+            return response
+
         raise RemoteApiConnectionError(
-            message=f"Failed to connect after {self.config.max_retries} attempts: {last_exception}",
-        )
+            message=f"Failed to connect after {attempts} attempts: {last_exception}",
+        ) from last_exception
 
     async def get(
-        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        response_type: Optional[Type] = None,
+    ) -> Any:
+        """
+        GET-запрос к API.
+
+        Одновременные GET с одинаковыми эндпоинтом и параметрами объединяются
+        в один HTTP-запрос, и все вызывающие получают один и тот же
+        распарсенный ответ. Его нельзя изменять на месте — при необходимости
+        делайте копию.
+
+        Если для эндпоинта есть правило кеша (config.cache), ответ берется
+        из кеша, а устаревшая запись обновляется условным запросом.
+
+        Если задан response_type (dataclass, например ServiceCatalog),
+        ответ разбирается сразу в него, минуя промежуточные dict. Экземпляры
+        изменяемые (slots, не frozen) и тоже общие для вызывающих и кеша —
+        их нельзя изменять на месте.
+        """
+        key = make_request_key(endpoint, params)
+        if response_type is not None:
+            # Типизированный и «сырой» ответы кешируются и объединяются раздельно
+            key += (response_type,)
+        rule = self._response_cache.rule_for(endpoint)
+        if rule is None:
+            return await self._coalesce(
+                key, lambda: self._fetch(endpoint, params, response_type)
+            )
+
+        entry, status = self._response_cache.lookup(key)
+        if entry is not None and status == "fresh":
+            return entry.body
+        if entry is not None and status == "stale":
+            self._schedule_revalidation(key, endpoint, params, rule, response_type)
+            return entry.body
+
+        return await self._coalesce(
+            key, lambda: self._fetch_and_cache(key, endpoint, params, rule, response_type)
+        )
+
+    async def _coalesce(
+        self, key: Tuple, fn: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Выполняет GET через single-flight, если он включен."""
+        if not self.config.single_flight:
+            return await fn()
+        # Общий запрос может идти дольше бюджета этого вызывающего — ждем не дольше deadline
+        async with self._deadline_guard(key[0]):
+            return await self._single_flight.do(key, fn)
+
+    def _batch_key(self, endpoint: str, params: Optional[Dict[str, Any]]) -> Any:
+        """telegram_id, если запрос идет через micro-batching, иначе None."""
+        if endpoint in self._bulk_unsupported:
+            return None
+        return self._batcher.batch_key(endpoint, params)
+
+    async def _fetch(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]],
+        response_type: Optional[Type] = None,
+    ) -> Any:
+        """Одиночный GET: через пачку, если эндпоинт объединяется, иначе напрямую."""
+        batch_key = self._batch_key(endpoint, params)
+        if batch_key is not None:
+            return await self._batcher.load(endpoint, batch_key, response_type)
+        return await self._request_with_retry(
+            "GET", endpoint, params=params, response_type=response_type
+        )
+
+    async def _fetch_bulk(
+        self,
+        endpoint: str,
+        keys: List[Any],
+        response_type: Optional[Type] = None,
     ) -> Dict[str, Any]:
-        """GET-запрос к API."""
-        return await self._request_with_retry("GET", endpoint, params=params)
+        """
+        Выполняет пачку одиночных GET одним bulk-запросом.
+
+        Если NMservices не принимает bulk-форму, эндпоинт запоминается и
+        пачка выполняется отдельными запросами.
+
+        Returns:
+            {str(telegram_id): ответ или исключение для этого telegram_id}
+        """
+        batching = self.config.batching
+        response = await self._send(
+            "GET", endpoint, params={batching.bulk_param: keys}
+        )
+        if response.status_code in _BULK_UNSUPPORTED_STATUSES:
+            self._bulk_unsupported.add(endpoint)
+            log.warning(
+                "%s rejected bulk form (HTTP %s), falling back to per-user requests",
+                endpoint,
+                response.status_code,
+            )
+            results = await asyncio.gather(
+                *(
+                    self._request_with_retry(
+                        "GET",
+                        endpoint,
+                        params={batching.key_param: key},
+                        response_type=response_type,
+                    )
+                    for key in keys
+                ),
+                return_exceptions=True,
+            )
+            return {str(key): result for key, result in zip(keys, results)}
+
+        body = await self._handle_response(response)
+        by_key = body.get(BULK_RESPONSE_FIELD) if isinstance(body, dict) else None
+        if not isinstance(by_key, dict):
+            raise RemoteApiError(
+                message=f"Unexpected bulk response from {endpoint}",
+                status_code=response.status_code,
+                response_body=body,
+            )
+
+        results: Dict[str, Any] = {}
+        for key in map(str, keys):
+            item = by_key.get(key)
+            if item is None:
+                results[key] = RemoteApiError(
+                    message=f"No entry for {batching.key_param}={key} in bulk response",
+                    status_code=404,
+                )
+            elif response_type is None:
+                results[key] = item
+            else:
+                try:
+                    results[key] = self._codec.convert(item, response_type)
+                except JsonDecodeError as e:
+                    results[key] = RemoteApiError(
+                        message=f"Unexpected response body for {response_type.__name__}: {e}",
+                        status_code=response.status_code,
+                        response_body=item,
+                    )
+        return results
+
+    async def _fetch_and_cache(
+        self,
+        key: Tuple,
+        endpoint: str,
+        params: Optional[Dict[str, Any]],
+        rule: CacheRule,
+        response_type: Optional[Type] = None,
+    ) -> Any:
+        """Загружает ответ (условно, если есть старая запись) и кладет его в кеш."""
+        generation = self._response_cache.generation
+        if self._batch_key(endpoint, params) is not None:
+            # В пачке нет условных запросов — ответ просто заменяет запись
+            body = await self._fetch(endpoint, params, response_type)
+            if self._response_cache.generation == generation:
+                self._response_cache.store(key, body, httpx.Headers(), rule)
+            return body
+
+        entry = self._response_cache.peek(key)
+        headers = entry.conditional_headers() if entry else None
+        response = await self._send(
+            "GET", endpoint, params=params, headers=headers
+        )
+        # Пока шел запрос, кеш инвалидировали — ответ мог устареть, не кешируем
+        cacheable = self._response_cache.generation == generation
+        if response.status_code == 304 and entry is not None:
+            if cacheable:
+                self._response_cache.refresh(key, entry, response.headers, rule)
+            return entry.body
+
+        body = await self._handle_response(response, response_type)
+        if cacheable:
+            self._response_cache.store(key, body, response.headers, rule)
+        return body
+
+    def invalidate_cached(self, endpoint: str) -> int:
+        """
+        Сбрасывает закешированные ответы эндпоинта, например после события
+        «запись изменена на сервере».
+
+        Идущие GET этого эндпоинта отвязываются от single-flight, а их ответы
+        не попадут в кеш: следующий get() отправит новый запрос.
+
+        Returns:
+            Количество удаленных записей кеша
+        """
+        self._single_flight.forget_matching(lambda key: key[0] == endpoint)
+        return self._response_cache.invalidate(endpoint)
+
+    def _invalidate_resource(self, endpoint: str) -> None:
+        """
+        После изменяющего запроса: сбрасывает кеш ресурса и отвязывает идущие
+        GET к нему — их ответы получены до изменения.
+        """
+        resource = resource_of(endpoint)
+        self._single_flight.forget_matching(lambda key: in_resource(key[0], resource))
+        self._response_cache.invalidate_resource(endpoint)
+
+    def _schedule_revalidation(
+        self,
+        key: Tuple,
+        endpoint: str,
+        params: Optional[Dict[str, Any]],
+        rule: CacheRule,
+        response_type: Optional[Type] = None,
+    ) -> None:
+        """Фоновое обновление устаревшей записи (stale-while-revalidate)."""
+        if key in self._single_flight:
+            return
+        # Фоновое обновление не ограничено бюджетом update, который его запустил
+        task = asyncio.get_running_loop().create_task(
+            self._coalesce(
+                key,
+                lambda: self._fetch_and_cache(key, endpoint, params, rule, response_type),
+            ),
+            context=detached_context(),
+        )
+        self._background_tasks.add(task)
+        task.add_done_callback(self._on_background_done)
+
+    def _on_background_done(self, task: asyncio.Task) -> None:
+        self._background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.warning("Background revalidation failed: %s", task.exception())
+
+    async def stream_lines(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        on_malformed: Optional[Callable[[str, JsonDecodeError], None]] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        GET-запрос с построчным разбором ответа (NDJSON: объект JSON на строку).
+
+        Строки разбираются по мере получения, поэтому большой ответ не
+        держится в памяти целиком. Запрос не повторяется: прерванный поток
+        вызывающий возобновляет сам (например, с последнего курсора).
+
+        Args:
+            on_malformed: Если задан, строка, которая не разбирается как JSON,
+                передается в него и пропускается; иначе поток прерывается
+                JsonDecodeError
+
+        Raises:
+            CircuitOpenError: Если circuit breaker эндпоинта открыт
+            RemoteApiConnectionError: При сетевой ошибке до или во время чтения
+            RemoteApiError: При ответе с кодом ошибки
+        """
+        breaker = self._circuit_breakers.get(endpoint)
+        if not breaker.allow_request():
+            raise CircuitOpenError(message=f"Circuit breaker is open for {breaker.name}")
+        client = await self._get_client()
+        try:
+            async with self._bulkheads.slot("GET", endpoint):
+                async with self._concurrency.slot():
+                    async with client.stream(
+                        "GET",
+                        endpoint,
+                        params=params,
+                        headers={"Accept": "application/x-ndjson"},
+                    ) as response:
+                        if response.status_code >= 400:
+                            await response.aread()
+                            if response.status_code >= 500:
+                                breaker.record_failure()
+                            else:
+                                breaker.record_success()
+                            await self._handle_response(response)
+                        breaker.record_success()
+                        async for line in response.aiter_lines():
+                            if not line.strip():
+                                continue
+                            try:
+                                item = self._codec.decode(line)
+                            except JsonDecodeError as e:
+                                if on_malformed is None:
+                                    raise
+                                on_malformed(line, e)
+                                continue
+                            yield item
+        except BulkheadRejectedError as e:
+            breaker.record_ignored()
+            raise RemoteApiOverloadedError(message=str(e)) from e
+        except httpx.TransportError as e:
+            breaker.record_failure()
+            raise RemoteApiConnectionError(message=f"Stream {endpoint} failed: {e}") from e
 
     async def post(
-        self, endpoint: str, data: Dict[str, Any]
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+        remember: bool = True,
     ) -> Dict[str, Any]:
-        """POST-запрос к API."""
-        return await self._request_with_retry("POST", endpoint, json_data=data)
+        """
+        POST-запрос к API.
+
+        Без idempotency_key запрос повторяется только при ошибках, когда он
+        точно не дошел до сервера (соединение не установлено).
+
+        С idempotency_key ключ передается в заголовке во всех попытках,
+        поэтому запрос повторяется и при таймаутах. Ответ завершенной
+        операции запоминается: повторный вызов с тем же ключом возвращает
+        его без запроса, одновременные вызовы объединяются.
+
+        remember=False — для одноразовых ключей, которые не будут переданы
+        повторно (например, пачки bulk-синхронизации): ключ защищает только
+        повторы внутри вызова, а ответ не занимает место в локальном кеше.
+        """
+        if idempotency_key is None or not remember:
+            headers = (
+                {self.config.idempotency.header: idempotency_key}
+                if idempotency_key is not None
+                else None
+            )
+            try:
+                return await self._request_with_retry(
+                    "POST", endpoint, json_data=data, headers=headers
+                )
+            finally:
+                self._invalidate_resource(endpoint)
+
+        completed = self._idempotency.get(idempotency_key)
+        if completed is not None:
+            return completed
+
+        async def _post_once() -> Dict[str, Any]:
+            try:
+                body = await self._request_with_retry(
+                    "POST",
+                    endpoint,
+                    json_data=data,
+                    headers={self.config.idempotency.header: idempotency_key},
+                )
+            finally:
+                self._invalidate_resource(endpoint)
+            self._idempotency.put(idempotency_key, body)
+            return body
+
+        return await self._idempotent_posts.do(idempotency_key, _post_once)
 
     async def patch(
         self, endpoint: str, data: Dict[str, Any]
     ) -> Dict[str, Any]:
         """PATCH-запрос к API."""
-        return await self._request_with_retry("PATCH", endpoint, json_data=data)
+        try:
+            return await self._request_with_retry("PATCH", endpoint, json_data=data)
+        finally:
+            self._invalidate_resource(endpoint)
 
     async def health_check(self) -> bool:
         """
@@ -0,0 +1,218 @@
+"""
+Кеш ответов GET-запросов RemoteApiClient.
+
+- TTL задается правилами по шаблону пути (fnmatch: "/users/by-telegram/*")
+- Размер ограничен, вытеснение по LRU
+- Для устаревших записей сохраняются ETag / Last-Modified, чтобы
+  повторная загрузка шла условным запросом и могла закончиться 304
+- stale_while_revalidate: в течение этого окна после истечения TTL
+  отдается устаревший ответ, а обновление идет в фоне
+"""
+
+import fnmatch
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import httpx
+
+
+def resource_of(endpoint: str) -> str:
+    """Ресурс эндпоинта — первый сегмент пути: /orders/active → /orders."""
+    return "/" + endpoint.lstrip("/").split("/", 1)[0]
+
+
+def in_resource(endpoint: str, resource: str) -> bool:
+    return endpoint == resource or endpoint.startswith(resource + "/")
+
+
+@dataclass
+class CacheRule:
+    """Правило кеширования для эндпоинтов, подходящих под шаблон."""
+
+    pattern: str
+    ttl: float
+    stale_while_revalidate: float = 0.0
+
+
+@dataclass
+class ResponseCacheConfig:
+    """Параметры кеша ответов."""
+
+    enabled: bool = False
+    max_entries: int = 1000
+    rules: List[CacheRule] = field(default_factory=list)
+
+
+@dataclass
+class CacheEntry:
+    """Закешированный ответ."""
+
+    body: Any  # dict или типизированный ответ (dataclass); общий, не изменять
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+    stale_until: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+    def is_servable_stale(self, now: float) -> bool:
+        return now < self.stale_until
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Заголовки для условного запроса (If-None-Match / If-Modified-Since)."""
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """LRU-кеш ответов с TTL по правилам."""
+
+    def __init__(
+        self,
+        config: ResponseCacheConfig,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.config = config
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.revalidated = 0  # ответы 304 Not Modified
+        self.evictions = 0
+        # Растет при каждой инвалидации: загрузка, начатая до нее,
+        # не должна положить в кеш уже устаревший ответ
+        self.generation = 0
+
+    def rule_for(self, endpoint: str) -> Optional[CacheRule]:
+        """Первое подходящее правило или None, если эндпоинт не кешируется."""
+        if not self.config.enabled:
+            return None
+        path = endpoint.split("?", 1)[0]
+        for rule in self.config.rules:
+            if fnmatch.fnmatchcase(path, rule.pattern):
+                return rule
+        return None
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[CacheEntry], str]:
+        """
+        Ищет запись и классифицирует ее.
+
+        Returns:
+            (запись или None, "fresh" | "stale" | "expired" | "miss")
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, "miss"
+        self._entries.move_to_end(key)
+        now = self._clock()
+        if entry.is_fresh(now):
+            self.hits += 1
+            return entry, "fresh"
+        if entry.is_servable_stale(now):
+            self.stale_hits += 1
+            return entry, "stale"
+        self.misses += 1
+        return entry, "expired"
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """Запись без учета в статистике и без изменения порядка LRU."""
+        return self._entries.get(key)
+
+    def store(
+        self,
+        key: Hashable,
+        body: Any,
+        headers: httpx.Headers,
+        rule: CacheRule,
+    ) -> None:
+        """Сохраняет ответ 200 вместе с его ETag / Last-Modified."""
+        self._put(key, body, rule, headers.get("ETag"), headers.get("Last-Modified"))
+
+    def refresh(
+        self,
+        key: Hashable,
+        entry: CacheEntry,
+        headers: httpx.Headers,
+        rule: CacheRule,
+    ) -> None:
+        """Продлевает запись после 304 Not Modified."""
+        self.revalidated += 1
+        self._put(
+            key,
+            entry.body,
+            rule,
+            headers.get("ETag") or entry.etag,
+            headers.get("Last-Modified") or entry.last_modified,
+        )
+
+    def _put(
+        self,
+        key: Hashable,
+        body: Any,
+        rule: CacheRule,
+        etag: Optional[str],
+        last_modified: Optional[str],
+    ) -> None:
+        now = self._clock()
+        self._entries[key] = CacheEntry(
+            body=body,
+            etag=etag,
+            last_modified=last_modified,
+            expires_at=now + rule.ttl,
+            stale_until=now + rule.ttl + rule.stale_while_revalidate,
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, endpoint: str) -> int:
+        """
+        Удаляет все записи эндпоинта (с любыми параметрами и типом ответа).
+
+        Вызывается, когда известно, что данные эндпоинта на сервере изменились.
+        """
+        self.generation += 1
+        stale_keys = [key for key in self._entries if key[0] == endpoint]
+        for key in stale_keys:
+            del self._entries[key]
+        return len(stale_keys)
+
+    def invalidate_resource(self, endpoint: str) -> int:
+        """
+        Удаляет записи того же ресурса (первый сегмент пути), что и endpoint.
+
+        Вызывается после изменяющих запросов: POST /orders сбрасывает /orders/active.
+        """
+        self.generation += 1
+        resource = resource_of(endpoint)
+        stale_keys = [key for key in self._entries if in_resource(key[0], resource)]
+        for key in stale_keys:
+            del self._entries[key]
+        return len(stale_keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Счетчики для мониторинга."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,120 @@
+"""
+Политика повторов для RemoteApiClient: экспоненциальная задержка с full jitter,
+разбор Retry-After и общий cool-down эндпоинта после ответов 429/503.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, FrozenSet, Optional
+
+from .circuit_breaker import normalize_endpoint
+
+
+def full_jitter_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Задержка перед повтором номер `attempt` (с нуля).
+
+    Экспоненциальный рост base * 2^attempt, ограниченный cap, и случайная
+    величина в [0, предел] — чтобы реплики бота не повторяли запросы синхронно.
+    """
+    ceiling = min(cap, base * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+@dataclass
+class ThrottleConfig:
+    """Обработка ответов «сервер перегружен» (429/503)."""
+
+    enabled: bool = True
+    statuses: FrozenSet[int] = field(default_factory=lambda: frozenset({429, 503}))
+    # Дольше ждать не будем — сразу ошибка. Без Retry-After пауза считается
+    # как обычная задержка retry (full jitter)
+    max_retry_after: float = 30.0
+
+
+def parse_retry_after(
+    value: Optional[str], now: Optional[datetime] = None
+) -> Optional[float]:
+    """
+    Значение заголовка Retry-After в секундах.
+
+    Поддерживаются обе формы RFC 9110: число секунд (дробное тоже
+    принимается) и HTTP-дата. Некорректное значение — None.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (moment - now).total_seconds())
+
+
+class EndpointCooldowns:
+    """
+    Cool-down эндпоинтов, общий для всех корутин процесса.
+
+    Один ответ 429/503 приостанавливает все запросы к эндпоинту (по
+    шаблону пути, как у circuit breaker'а) до истечения Retry-After.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._until: Dict[str, float] = {}
+        self.throttled = 0  # ответов 429/503
+        self.waits = 0  # запросов, ожидавших окончания cool-down
+        self.wait_time = 0.0
+
+    def trip(self, endpoint: str, delay: float) -> None:
+        """Продлевает cool-down эндпоинта минимум на delay секунд."""
+        name = normalize_endpoint(endpoint)
+        self.throttled += 1
+        until = self._clock() + delay
+        if until > self._until.get(name, 0.0):
+            self._until[name] = until
+
+    def remaining(self, endpoint: str) -> float:
+        """Сколько секунд осталось до конца cool-down (0 — запросы разрешены)."""
+        name = normalize_endpoint(endpoint)
+        until = self._until.get(name)
+        if until is None:
+            return 0.0
+        left = until - self._clock()
+        if left <= 0:
+            del self._until[name]
+            return 0.0
+        return left
+
+    async def wait(self, endpoint: str) -> None:
+        """Ждет окончания cool-down; за время ожидания его могут продлить."""
+        delay = self.remaining(endpoint)
+        if delay > 0:
+            self.waits += 1
+        while delay > 0:
+            self.wait_time += delay
+            await asyncio.sleep(delay)
+            delay = self.remaining(endpoint)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "throttled": self.throttled,
+            "waits": self.waits,
+            "wait_time_s": round(self.wait_time, 3),
+            "cooling_down": {
+                name: round(until - self._clock(), 3)
+                for name, until in self._until.items()
+                if until > self._clock()
+            },
+        }
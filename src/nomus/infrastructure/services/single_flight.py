@@ -0,0 +1,91 @@
+"""
+Single-flight: объединение одинаковых одновременных запросов.
+
+Пока по ключу выполняется запрос, все остальные вызовы с тем же ключом
+не отправляют свой запрос, а ждут результат первого.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+def make_request_key(endpoint: str, params: Optional[Dict[str, Any]] = None) -> Tuple:
+    """Ключ запроса: эндпоинт + отсортированные параметры."""
+    if not params:
+        return (endpoint,)
+    items = []
+    for name, value in sorted(params.items()):
+        if isinstance(value, (list, tuple)):
+            value = tuple(value)
+        items.append((name, value))
+    return (endpoint, tuple(items))
+
+
+class SingleFlight:
+    """
+    Группа single-flight вызовов.
+
+    Результат (или исключение) первого вызова получают все ожидающие.
+    Внутренний запрос выполняется в отдельной задаче, поэтому отмена
+    одного из ожидающих не отменяет запрос для остальных.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0  # вызовы, присоединившиеся к уже идущему запросу
+        self.misses = 0  # вызовы, запустившие новый запрос
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполняет fn() или присоединяется к уже выполняющемуся вызову с тем же ключом.
+
+        Args:
+            key: Ключ запроса
+            fn: Фабрика корутины, выполняющей запрос
+
+        Returns:
+            Результат fn(), общий для всех одновременных вызовов
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.hits += 1
+        return await asyncio.shield(task)
+
+    def forget(self, key: Hashable) -> None:
+        """Следующий вызов с этим ключом запустит новый запрос; идущий не отменяется."""
+        self._in_flight.pop(key, None)
+
+    def forget_matching(self, predicate: Callable[[Hashable], bool]) -> int:
+        """forget() для всех ключей, подходящих под predicate."""
+        keys = [key for key in self._in_flight if predicate(key)]
+        for key in keys:
+            del self._in_flight[key]
+        return len(keys)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Исключение уже получили ожидающие; если их не осталось — не логируем как "never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._in_flight
+
+    @property
+    def in_flight(self) -> int:
+        """Количество выполняющихся запросов."""
+        return len(self._in_flight)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Счетчики для мониторинга."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "in_flight": self.in_flight,
+        }
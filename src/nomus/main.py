@@ -9,8 +9,11 @@ load_dotenv()
 
 from nomus.config.settings import Settings
 from nomus.infrastructure.factory import ServiceFactory
+from nomus.infrastructure.database.remote_storage import RemoteStorage
 from nomus.application.services.auth_service import AuthService
 from nomus.application.services.order_service import OrderService
+from nomus.presentation.api.invalidation import InvalidationServer
+from nomus.presentation.bot.middlewares.deadline_middleware import DeadlineMiddleware
 from nomus.presentation.bot.middlewares.l10n_middleware import L10nMiddleware
 from nomus.presentation.bot.middlewares.notification_middleware import NotificationMiddleware
 from nomus.presentation.bot.handlers import (
@@ -35,6 +38,9 @@ class BotApplication:
         self.storage = ServiceFactory.create_storage(settings)
         self.sms_service = ServiceFactory.create_sms_service(settings)
         self.payment_service = ServiceFactory.create_payment_service(settings)
+        self.api_client = ServiceFactory._api_client
+        self._metrics_task: asyncio.Task | None = None
+        self._invalidation_server: InvalidationServer | None = None
 
         # 2. Application Layer
         self.auth_service = AuthService(
@@ -44,7 +50,7 @@ class BotApplication:
             order_repo=self.storage,
             payment_service=self.payment_service,
             user_repo=self.storage,
-            api_client=ServiceFactory._api_client,
+            api_client=self.api_client,
         )
 
         # 3. Presentation Layer
@@ -64,6 +70,9 @@ class BotApplication:
         return logging.getLogger(__name__)
 
     def _setup_middlewares(self):
+        # Бюджет времени на update — первым, чтобы его учитывали все последующие вызовы API
+        if self.settings.bot.update_deadline > 0:
+            self.dp.update.middleware(DeadlineMiddleware(self.settings.bot.update_deadline))
         # Подключаем middleware для локализации, передавая ему storage
         self.dp.update.middleware(
             L10nMiddleware(settings=self.settings, storage=self.storage)
@@ -86,11 +95,38 @@ class BotApplication:
 
     async def on_startup(self, bot: Bot):
         self.log.info("Starting bot...")
+        # Фоновая синхронизация изменений с NMservices (write-behind)
+        await self.storage.start()
+        if self.api_client:
+            # Открываем соединения заранее, чтобы первый пользователь не ждал handshake
+            await self.api_client.warm_up()
+        if self.settings.invalidation.enabled and isinstance(self.storage, RemoteStorage):
+            # NMservices сообщает об изменениях пользователей — кеш не устаревает
+            self._invalidation_server = InvalidationServer(self.storage, self.settings.invalidation)
+            await self._invalidation_server.start()
+        if self.settings.monitoring.enable_metrics:
+            self._metrics_task = asyncio.create_task(self._log_metrics())
 
     async def on_shutdown(self, bot: Bot):
         self.log.info("Bot stopped")
+        if self._metrics_task:
+            self._metrics_task.cancel()
+        if self._invalidation_server:
+            await self._invalidation_server.stop()
+        # Финальная синхронизация — до закрытия HTTP-клиента
+        await self.storage.close()
+        await ServiceFactory.close_api_client()
         await bot.session.close()
 
+    async def _log_metrics(self):
+        """Периодически пишет метрики клиента удаленного API в лог."""
+        while True:
+            await asyncio.sleep(self.settings.monitoring.metrics_interval)
+            if self.api_client:
+                self.log.info("Remote API metrics: %s", self.api_client.stats())
+            if isinstance(self.storage, RemoteStorage):
+                self.log.info("Remote storage metrics: %s", self.storage.stats())
+
     async def run(self):
         try:
             await self.dp.start_polling(
@@ -0,0 +1,156 @@
+"""
+HTTP-эндпоинт инвалидации кеша RemoteStorage.
+
+NMservices вызывает его, когда пользователь меняется на сервере (например,
+админ исправил телефон или язык):
+    POST /invalidate
+    X-Invalidation-Token: <token>
+    {"telegram_id": 777, "version": 12}
+    {"user_id": 1, "version": 13, "action": "refresh"}
+    {"events": [{...}, {...}]}
+    → {"results": ["evicted", "stale", ...]}
+Запись идентифицируется telegram_id или id на сервере (user_id). version —
+монотонная версия записи на сервере: событие, пришедшее после более нового,
+игнорируется (stale). action: evict — вытеснить, refresh — сразу загрузить
+заново; по умолчанию — InvalidationConfig.refresh.
+
+Без токена (пустого или неподставленного ${INVALIDATION_TOKEN}) эндпоинт
+не запускается: иначе любой мог бы сбрасывать кеш бота.
+"""
+
+import hmac
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from nomus.config.settings import InvalidationConfig
+from nomus.infrastructure.database.remote_storage import RemoteStorage
+
+log = logging.getLogger(__name__)
+
+_ACTIONS = ("evict", "refresh")
+
+# ${VAR}, оставшаяся в конфиге, если переменная окружения не задана
+_UNEXPANDED_VAR = re.compile(r"\$\{[^}]+\}")
+
+
+class InvalidationEventError(ValueError):
+    """Событие инвалидации не удалось разобрать."""
+
+
+def _optional_int(event: Dict[str, Any], name: str) -> Optional[int]:
+    value = event.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise InvalidationEventError(f"{name} must be an integer")
+    return value
+
+
+def token_configured(token: str) -> bool:
+    """Токен задан и не является неподставленной переменной окружения."""
+    return bool(token) and not _UNEXPANDED_VAR.search(token)
+
+
+def parse_events(body: Any) -> List[Dict[str, Any]]:
+    """
+    Проверяет тело запроса и возвращает события в виде аргументов invalidate_user.
+
+    Raises:
+        InvalidationEventError: Тело или одно из событий некорректно
+    """
+    events = body.get("events", [body]) if isinstance(body, dict) else None
+    if not isinstance(events, list):
+        raise InvalidationEventError("Expected an event object or {\"events\": [...]}")
+    parsed = []
+    for event in events:
+        if not isinstance(event, dict):
+            raise InvalidationEventError("Event must be an object")
+        telegram_id = _optional_int(event, "telegram_id")
+        user_id = _optional_int(event, "user_id")
+        if telegram_id is None and user_id is None:
+            raise InvalidationEventError("telegram_id or user_id is required")
+        action = event.get("action")
+        if action is not None and action not in _ACTIONS:
+            raise InvalidationEventError(f"action must be one of {', '.join(_ACTIONS)}")
+        parsed.append(
+            {
+                "telegram_id": telegram_id,
+                "user_id": user_id,
+                "version": _optional_int(event, "version"),
+                "action": action,
+            }
+        )
+    return parsed
+
+
+def build_invalidation_app(storage: RemoteStorage, config: InvalidationConfig) -> web.Application:
+    """Создает aiohttp-приложение с эндпоинтом инвалидации."""
+
+    async def invalidate(request: web.Request) -> web.Response:
+        if not token_configured(config.token) or not hmac.compare_digest(
+            request.headers.get("X-Invalidation-Token", ""), config.token
+        ):
+            return web.json_response({"detail": "Invalid token"}, status=403)
+        try:
+            events = parse_events(await request.json())
+        except (json.JSONDecodeError, InvalidationEventError) as e:
+            return web.json_response({"detail": str(e)}, status=422)
+
+        results = []
+        for event in events:
+            action = event["action"] or ("refresh" if config.refresh else "evict")
+            results.append(
+                await storage.invalidate_user(
+                    telegram_id=event["telegram_id"],
+                    user_id=event["user_id"],
+                    version=event["version"],
+                    refresh=action == "refresh",
+                )
+            )
+        log.debug("Invalidation events applied: %s", results)
+        return web.json_response({"results": results})
+
+    app = web.Application()
+    app.router.add_post(config.path, invalidate)
+    return app
+
+
+class InvalidationServer:
+    """Запускает эндпоинт инвалидации рядом с polling'ом бота."""
+
+    def __init__(self, storage: RemoteStorage, config: InvalidationConfig):
+        self.config = config
+        self._runner = web.AppRunner(build_invalidation_app(storage, config), access_log=None)
+        self._started = False
+
+    async def start(self) -> bool:
+        """
+        Returns:
+            False — эндпоинт не запущен: токен не задан
+        """
+        if not token_configured(self.config.token):
+            log.error(
+                "Cache invalidation endpoint is not started: token is not set "
+                "(set INVALIDATION_TOKEN); cached users expire by idle_ttl only"
+            )
+            return False
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.config.host, self.config.port)
+        await site.start()
+        log.info(
+            "Cache invalidation endpoint listening on http://%s:%d%s",
+            self.config.host,
+            self.config.port,
+            self.config.path,
+        )
+        self._started = True
+        return True
+
+    async def stop(self) -> None:
+        if self._started:
+            await self._runner.cleanup()
+            self._started = False
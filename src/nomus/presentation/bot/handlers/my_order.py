@@ -27,7 +27,7 @@ def _format_price(raw: Decimal | str | None) -> str:
     if raw is None:
         return "—"
     try:
-        value = int(Decimal(str(raw)))
+        value = int(raw if isinstance(raw, Decimal) else Decimal(str(raw)))
         return f"{value:,}".replace(",", " ")
     except (InvalidOperation, ValueError):
         return str(raw)
@@ -51,14 +51,14 @@ async def show_my_orders(
     # Build list of order items
     items: list[str] = []
     for order in orders:
-        status_key = _STATUS_KEY_MAP.get(order.get("status", ""), "")
-        status_label = getattr(lexicon, status_key, order.get("status", "—"))
+        status_key = _STATUS_KEY_MAP.get(order.status, "")
+        status_label = getattr(lexicon, status_key, order.status or "—")
 
         item = lexicon.my_orders_item.format(
-            order_id=order.get("order_id", "—"),
-            service_name=order.get("service_name") or "—",
-            amount=_format_price(order.get("total_amount")),
-            address=order.get("address_text") or "—",
+            order_id=order.order_id,
+            service_name=order.service_name or "—",
+            amount=_format_price(order.total_amount),
+            address=order.address_text or "—",
             status=status_label,
         )
         items.append(item)
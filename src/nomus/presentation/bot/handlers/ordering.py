@@ -1,5 +1,6 @@
 import logging
 from decimal import Decimal, InvalidOperation
+from typing import Optional
 
 from aiogram import F, Router
 from aiogram.types import (
@@ -15,6 +16,8 @@ from nomus.presentation.bot.states.ordering import OrderStates
 from nomus.application.services.order_service import OrderService
 from nomus.application.services.auth_service import AuthService
 from nomus.application.services.language_service import get_user_language_with_fallback
+from nomus.common.idempotency import new_idempotency_key
+from nomus.domain.entities.service import Service
 from nomus.domain.interfaces.repo_interface import IUserRepository
 from nomus.presentation.bot.filters.emoji_prefix_equals import EmojiPrefixEquals
 from nomus.presentation.bot.handlers.common import get_main_kb
@@ -30,27 +33,35 @@ def _format_price(raw_price: str | Decimal | int | float | None) -> str:
     if raw_price is None:
         return "—"
     try:
-        value = int(Decimal(str(raw_price)))
+        value = int(raw_price if isinstance(raw_price, Decimal) else Decimal(str(raw_price)))
         return f"{value:,}".replace(",", " ")
     except (InvalidOperation, ValueError):
         return str(raw_price)
 
 
-def _build_services_keyboard(services: list[dict]) -> InlineKeyboardMarkup:
+def _build_services_keyboard(services: list[Service]) -> InlineKeyboardMarkup:
     """Строит inline-клавиатуру со списком услуг."""
     buttons: list[list[InlineKeyboardButton]] = []
     for svc in services:
-        name = svc.get("name", "—")
-        price = _format_price(svc.get("base_price"))
-        duration = svc.get("duration_minutes")
-        duration_text = f" ({duration} min)" if duration else ""
-        label = f"{name} — {price} сум{duration_text}"
+        price = _format_price(svc.base_price)
+        duration_text = f" ({svc.duration_minutes:g} min)" if svc.duration_minutes else ""
+        label = f"{svc.name or '—'} — {price} сум{duration_text}"
         buttons.append(
-            [InlineKeyboardButton(text=label, callback_data=f"svc_{svc['id']}")]
+            [InlineKeyboardButton(text=label, callback_data=f"svc_{svc.id}")]
         )
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+def _service_state(svc: Service) -> dict:
+    """Услуга в виде, пригодном для хранения в FSMContext (только JSON-типы)."""
+    return {
+        "id": svc.id,
+        "name": svc.name or "—",
+        "base_price": str(svc.base_price) if svc.base_price is not None else None,
+        "duration_minutes": svc.duration_minutes,
+    }
+
+
 async def _start_service_selection(
     message: Message,
     state: FSMContext,
@@ -65,7 +76,7 @@ async def _start_service_selection(
         return
 
     # Сохраняем услуги в состоянии для последующей валидации
-    await state.update_data(services={str(s["id"]): s for s in services})
+    await state.update_data(services={str(s.id): _service_state(s) for s in services})
 
     keyboard = _build_services_keyboard(services)
     await message.answer(lexicon.select_service_prompt, reply_markup=keyboard)
@@ -145,7 +156,8 @@ async def process_address(
         return
 
     address = message.text.strip()
-    await state.update_data(address=address)
+    # Один ключ на подтверждаемый заказ: повторное нажатие не создаст дубль
+    await state.update_data(address=address, order_idempotency_key=new_idempotency_key())
 
     # Показываем summary
     data = await state.get_data()
@@ -194,6 +206,7 @@ async def process_order_confirm(
     data = await state.get_data()
     service_id: int = data["service_id"]
     address: str = data["address"]
+    idempotency_key: Optional[str] = data.get("order_idempotency_key")
 
     # Получаем server_user_id
     server_user_id = await order_service.get_server_user_id(callback.from_user.id)
@@ -211,13 +224,17 @@ async def process_order_confirm(
         server_user_id=server_user_id,
         service_id=service_id,
         address_text=address,
+        idempotency_key=idempotency_key,
     )
 
     if result:
         order_id = result.get("order_id", "—")
 
         # Инициируем платёж и показываем кнопку оплаты
-        payment_result = await order_service.initiate_payment(order_id)
+        payment_result = await order_service.initiate_payment(
+            order_id,
+            idempotency_key=f"{idempotency_key}-payment" if idempotency_key else None,
+        )
         if payment_result and payment_result.get("payment_url"):
             payment_url = payment_result["payment_url"]
             pay_keyboard = InlineKeyboardMarkup(
@@ -94,8 +94,8 @@ async def process_phone(
         message.from_user.id, user_data
     )
 
-    # Синхронизируем данные с remote storage (если используется)
-    await storage.flush()
+    # Синхронизация с remote storage — в фоне, обработчик ее не ждет
+    storage.request_flush()
 
     await message.answer(
         lexicon.registration_successful,
@@ -0,0 +1,26 @@
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from nomus.common.deadline import deadline_scope
+
+
+class DeadlineMiddleware(BaseMiddleware):
+    """
+    Задает бюджет времени на обработку одного update.
+
+    Все вызовы NMservices внутри обработки (middleware, handlers, OrderService)
+    укорачивают таймауты и retry до оставшегося времени и прерываются,
+    когда бюджет исчерпан. Должен подключаться первым.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        with deadline_scope(self.seconds):
+            return await handler(event, data)
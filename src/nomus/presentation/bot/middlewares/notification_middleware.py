@@ -98,7 +98,7 @@ def _format_price(raw_price: Any) -> str:
     if raw_price is None:
         return "—"
     try:
-        value = int(Decimal(str(raw_price)))
+        value = int(raw_price if isinstance(raw_price, Decimal) else Decimal(str(raw_price)))
         return f"{value:,}".replace(",", " ")
     except (InvalidOperation, ValueError):
         return str(raw_price)
@@ -167,20 +167,19 @@ class NotificationMiddleware(BaseMiddleware):
             order_ids: list[int] = []
 
             for n in notifications:
-                status = n.get("status", "")
-                template = templates.get(status)
+                template = templates.get(n.status)
                 if not template:
                     continue
 
                 text = template.format(
-                    order_id=n.get("order_id", "—"),
-                    service_name=n.get("service_name") or "—",
-                    amount=_format_price(n.get("total_amount")),
+                    order_id=n.order_id,
+                    service_name=n.service_name or "—",
+                    amount=_format_price(n.total_amount),
                 )
 
                 try:
                     await bot.send_message(telegram_id, text)
-                    order_ids.append(n["order_id"])
+                    order_ids.append(n.order_id)
                 except Exception as e:
                     log.error("Failed to send notification to %s: %s", telegram_id, e)
 
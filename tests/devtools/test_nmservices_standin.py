@@ -0,0 +1,175 @@
+"""
+Тесты локального stand-in'а NMservices: эндпоинты, которые вызывает
+RemoteApiClient, и внедрение задержек и сбоев.
+"""
+
+import random
+import statistics
+import time
+
+import httpx
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from nomus.devtools.fault_injection import FaultInjector, FaultProfile, LatencyProfile
+from nomus.devtools.nmservices_standin import StandInState, build_app
+from nomus.infrastructure.services.remote_api_client import (
+    RemoteApiClient,
+    RemoteApiConfig,
+    RemoteApiError,
+    RemoteApiThrottledError,
+)
+
+
+async def _start_server(app: web.Application) -> TestServer:
+    server = TestServer(app, host="127.0.0.1")
+    await server.start_server()
+    return server
+
+
+def _make_config(server: TestServer) -> RemoteApiConfig:
+    return RemoteApiConfig(
+        base_url=str(server.make_url("")),
+        api_key="test",
+        timeout=5.0,
+        max_retries=2,
+        retry_delay=0.01,
+    )
+
+
+class TestEndpoints:
+    """Сценарий бота целиком против stand-in'а"""
+
+    @pytest.mark.asyncio
+    async def test_registration_order_and_notifications(self):
+        state = StandInState.seeded(users=0)
+        server = await _start_server(build_app(state, api_key="test"))
+        try:
+            async with RemoteApiClient(_make_config(server)) as client:
+                registered = await client.post(
+                    "/users/register",
+                    {"phone_number": "+998901234567", "telegram_id": 777, "language_code": "uz"},
+                )
+                user_id = registered["user_id"]
+                user = await client.get("/users/by-telegram/777")
+                assert user["id"] == user_id and user["language_code"] == "uz"
+
+                await client.patch(f"/users/{user_id}/language", {"language_code": "en"})
+                assert state.users[777]["language_code"] == "en"
+                await client.patch(f"/users/{user_id}", {"latitude": 41.31})
+                assert state.users[777]["latitude"] == 41.31
+
+                services = (await client.get("/services"))["services"]
+                order_data = {
+                    "user_id": user_id,
+                    "service_id": services[0]["id"],
+                    "address_text": "Ташкент",
+                }
+                created = await client.post("/orders", order_data, idempotency_key="op-1")
+                # Повтор с тем же ключом из другого процесса бота не создает второй заказ
+                async with RemoteApiClient(_make_config(server)) as other:
+                    again = await other.post("/orders", order_data, idempotency_key="op-1")
+                assert again == created
+                assert len(state.orders) == 1
+
+                payment = await client.post(
+                    "/payment/initiate", {"order_id": created["order_id"]}
+                )
+                assert payment["payment_url"].endswith(str(created["order_id"]))
+
+                active = await client.get("/orders/active", {"telegram_id": 777})
+                assert [o["order_id"] for o in active["orders"]] == [created["order_id"]]
+
+                state.orders[created["order_id"]].status = "confirmed"
+                pending = await client.get("/orders/pending-notifications", {"telegram_id": 777})
+                assert len(pending["notifications"]) == 1
+                ack = await client.post(
+                    "/orders/notifications/ack",
+                    {"telegram_id": 777, "order_ids": [created["order_id"]]},
+                )
+                assert ack["acked"] == 1
+                pending = await client.get("/orders/pending-notifications", {"telegram_id": 777})
+                assert pending["notifications"] == []
+
+                with pytest.raises(RemoteApiError) as exc_info:
+                    await client.post("/orders", {"user_id": 999_999})
+                assert exc_info.value.status_code == 422
+        finally:
+            await server.close()
+
+        assert state.requests[("POST", "/orders")] == 3
+
+
+class TestFaultInjection:
+    """Задержки, ошибки, 429 и медленная отдача тела"""
+
+    def test_lognormal_latency_matches_percentiles(self):
+        latency = LatencyProfile("lognormal", p50=0.02, p99=0.2)
+        rnd = random.Random(1)
+        samples = sorted(latency.sample(rnd) for _ in range(20_000))
+        assert statistics.median(samples) == pytest.approx(0.02, rel=0.1)
+        assert samples[int(len(samples) * 0.99)] == pytest.approx(0.2, rel=0.2)
+
+    def test_profiles_are_reproducible_and_matched_by_pattern(self):
+        profiles = [
+            FaultProfile(pattern="/orders", method="POST", error_rate=0.5),
+            FaultProfile(pattern="*", latency=LatencyProfile("exponential", p50=0.01)),
+        ]
+        first = FaultInjector(profiles, seed=7)
+        second = FaultInjector(profiles, seed=7)
+        decisions = [first.decide("POST", "/orders").status for _ in range(100)]
+        assert decisions == [second.decide("POST", "/orders").status for _ in range(100)]
+        assert 30 < decisions.count(500) < 70
+        assert first.decide("GET", "/orders").status is None
+
+    @pytest.mark.asyncio
+    async def test_error_rate_and_rate_limit(self):
+        faults = FaultInjector(
+            [
+                FaultProfile(pattern="/services", error_rate=1.0, error_status=503, retry_after=60),
+                FaultProfile(pattern="/users/*", rate_limit=5, retry_after=60),
+            ]
+        )
+        server = await _start_server(build_app(faults=faults))
+        try:
+            async with RemoteApiClient(_make_config(server)) as client:
+                with pytest.raises(RemoteApiThrottledError) as exc_info:
+                    await client.get("/services")
+                assert exc_info.value.status_code == 503
+
+                async with httpx.AsyncClient(base_url=str(server.make_url(""))) as raw:
+                    statuses = [
+                        (await raw.get(f"/users/by-telegram/{i}")).status_code for i in range(1, 9)
+                    ]
+                    stats = (await raw.get("/_standin/stats")).json()
+        finally:
+            await server.close()
+
+        assert statuses.count(429) == 3
+        assert stats["faults"]["throttled"] == 3
+        assert stats["faults"]["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_body_and_disconnect(self):
+        faults = FaultInjector(
+            [
+                FaultProfile(pattern="/orders/active", slow_body_bps=20_000),
+                FaultProfile(pattern="/services", disconnect_rate=1.0),
+            ]
+        )
+        state = StandInState.seeded(users=1, orders_per_user=40)
+        server = await _start_server(build_app(state, faults=faults))
+        try:
+            async with httpx.AsyncClient(base_url=str(server.make_url(""))) as raw:
+                started = time.monotonic()
+                response = await raw.get("/orders/active", params={"telegram_id": 1})
+                elapsed = time.monotonic() - started
+                assert len(response.json()["orders"]) == 40
+                # ~7 KiB при 20 KB/s
+                assert elapsed >= len(response.content) / 20_000 * 0.8
+
+                with pytest.raises(httpx.TransportError):
+                    await raw.get("/services")
+        finally:
+            await server.close()
@@ -0,0 +1,256 @@
+"""
+Тесты шины согласованности кешей RemoteStorage между репликами.
+"""
+
+import asyncio
+import uuid
+from typing import Optional
+
+import httpx
+import pytest
+
+from nomus.devtools.redis_standin import RedisStandIn
+from nomus.infrastructure.database.bulk_sync import BulkSyncConfig
+from nomus.infrastructure.database.coherence import CoherenceBus, CoherenceConfig
+from nomus.infrastructure.database.remote_storage import RemoteStorage, RemoteStorageConfig
+from nomus.infrastructure.database.write_behind import WriteBehindConfig
+from nomus.infrastructure.services.remote_api_client import RemoteApiClient, RemoteApiConfig
+from nomus.infrastructure.services.response_cache import CacheRule, ResponseCacheConfig
+
+
+def _make_client(
+    requests: list, server: Optional[dict] = None, http_cache: bool = False
+) -> RemoteApiClient:
+    """server — поля пользователя на сервере, которые тест меняет по ходу."""
+    server = server if server is not None else {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        if request.method != "GET":
+            return httpx.Response(200, json={"status": "ok", "user_id": 107})
+        telegram_id = int(request.url.path.rsplit("/", 1)[1])
+        return httpx.Response(
+            200,
+            json={
+                "id": 100 + telegram_id,
+                "telegram_id": telegram_id,
+                "phone_number": "+998900000000",
+                "language_code": "ru",
+                **server,
+            },
+        )
+
+    config = RemoteApiConfig(base_url="http://nmservices.test", api_key="test", max_retries=1)
+    if http_cache:
+        config.cache = ResponseCacheConfig(
+            enabled=True, rules=[CacheRule("/users/by-telegram/*", ttl=30)]
+        )
+    client = RemoteApiClient(config, transport=httpx.MockTransport(handler))
+    client.config.single_flight = False
+    return client
+
+
+def _bus_config(**overrides) -> CoherenceConfig:
+    # Свой канал на тест: in-process подписчики общие для всего процесса
+    options = {"enabled": True, "channel": f"test:{uuid.uuid4().hex}", "batch_interval": 0.01}
+    options.update(overrides)
+    return CoherenceConfig(**options)
+
+
+def _replica(client: RemoteApiClient, coherence: CoherenceConfig) -> RemoteStorage:
+    return RemoteStorage(
+        client,
+        RemoteStorageConfig(
+            write_behind=WriteBehindConfig(enabled=False),
+            bulk=BulkSyncConfig(enabled=False),
+            coherence=coherence,
+        ),
+    )
+
+
+async def _until(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+class TestCoherenceBus:
+    @pytest.mark.asyncio
+    async def test_coalesces_changes_per_user_into_one_message(self):
+        config = _bus_config(batch_interval=0.05)
+        received: list = []
+
+        async def apply(events):
+            received.append(events)
+
+        sender = CoherenceBus(config, apply)
+        receiver = CoherenceBus(config, apply)
+        await sender.start()
+        await receiver.start()
+        try:
+            sender.publish(7, {"language_code": "uz"})
+            sender.publish(8, {"language_code": "en"})
+            sender.publish(7, {"phone_number": "+998901111111"})
+            sender.publish(9, {"language_code": "uz"})
+            sender.publish(9, None, version=4)
+            sender.publish(9, {"language_code": "ru"})
+            await _until(lambda: received)
+        finally:
+            await sender.close()
+            await receiver.close()
+        assert received == [
+            [
+                {"telegram_id": 7, "fields": {"language_code": "uz", "phone_number": "+998901111111"}},
+                {"telegram_id": 8, "fields": {"language_code": "en"}},
+                {"telegram_id": 9, "fields": None, "version": 4},
+            ]
+        ]
+        assert (sender.published, sender.coalesced, sender.messages_sent) == (6, 3, 1)
+        assert receiver.received == 3
+
+    @pytest.mark.asyncio
+    async def test_splits_large_batches(self):
+        config = _bus_config(max_batch=2)
+        received: list = []
+
+        async def apply(events):
+            received.append(len(events))
+
+        sender, receiver = CoherenceBus(config, apply), CoherenceBus(config, apply)
+        await sender.start()
+        await receiver.start()
+        for telegram_id in range(5):
+            sender.publish(telegram_id, {"language_code": "uz"})
+        await sender.close()
+        await receiver.close()
+        assert sum(received) == 5 and max(received) == 2
+
+
+class TestReplicaCoherence:
+    @pytest.mark.asyncio
+    async def test_language_change_reaches_other_replica_without_remote_call(self):
+        requests: list = []
+        config = _bus_config()
+        async with _make_client(requests) as client:
+            first, second = _replica(client, config), _replica(client, config)
+            await first.start()
+            await second.start()
+            await first.get_user_by_telegram_id(7)
+            await second.get_user_by_telegram_id(7)
+            requests.clear()
+
+            await first.update_user_language(7, "uz")
+            await _until(lambda: second.stats()["coherence"]["applied"] == 1)
+            assert await second.get_user_language(7) == "uz"
+            # На сервер язык отправляет только реплика-источник
+            assert second.dirty_count() == 0
+            await first.close()
+            await second.close()
+        assert requests == [("PATCH", "/users/107/language")]
+
+    @pytest.mark.asyncio
+    async def test_local_unsynced_fields_win(self):
+        config = _bus_config()
+        async with _make_client([]) as client:
+            first, second = _replica(client, config), _replica(client, config)
+            await first.start()
+            await second.start()
+            await first.get_user_by_telegram_id(7)
+            await second.get_user_by_telegram_id(7)
+            # Локальное изменение, еще не отправленное на сервер
+            await second.save_or_update_user(7, {"language_code": "en"})
+
+            user = await first.get_user_by_telegram_id(7)
+            await first.save_or_update_user(
+                7, {**user, "language_code": "uz", "phone_number": "+998901111111"}
+            )
+            await _until(lambda: second.stats()["coherence"]["applied"] == 1)
+            user = await second.get_user_by_telegram_id(7)
+            assert (user["language_code"], user["phone_number"]) == ("en", "+998901111111")
+
+    @pytest.mark.asyncio
+    async def test_server_invalidation_is_shared_with_replicas(self):
+        requests: list = []
+        config = _bus_config()
+        async with _make_client(requests) as client:
+            first, second = _replica(client, config), _replica(client, config)
+            await first.start()
+            await second.start()
+            await first.get_user_by_telegram_id(7)
+            await second.get_user_by_telegram_id(8)
+            requests.clear()
+
+            assert await first.invalidate_user(telegram_id=7, version=3, refresh=True) == "refreshed"
+            assert await first.invalidate_user(telegram_id=8, version=5) == "not_cached"
+            await _until(lambda: second.stats()["coherence"]["evicted"] == 1)
+            # Событие старее уже полученного через шину отбрасывается
+            assert await second.invalidate_user(telegram_id=8, version=4) == "stale"
+            await second.get_user_by_telegram_id(8)
+            assert requests == [("GET", "/users/by-telegram/7"), ("GET", "/users/by-telegram/8")]
+
+    @pytest.mark.asyncio
+    async def test_evicted_user_is_reloaded_past_http_response_cache(self):
+        # У каждой реплики свой клиент и свой кеш ответов, как в разных процессах
+        server: dict = {}
+        config = _bus_config()
+        first_client = _make_client([], server, http_cache=True)
+        second_client = _make_client([], server, http_cache=True)
+        async with first_client, second_client:
+            first, second = _replica(first_client, config), _replica(second_client, config)
+            await first.start()
+            await second.start()
+            await first.get_user_by_telegram_id(7)
+            await second.get_user_by_telegram_id(7)
+
+            server["language_code"] = "uz"
+            assert await first.invalidate_user(telegram_id=7, version=2) == "evicted"
+            await _until(lambda: second.stats()["coherence"]["evicted"] == 1)
+            assert await second.get_user_language(7) == "uz"
+            await first.close()
+            await second.close()
+
+
+class TestRedisTransport:
+    @pytest.mark.asyncio
+    async def test_replicas_share_changes_through_redis(self):
+        redis = RedisStandIn(password="secret")
+        await redis.start()
+        config = _bus_config(backend="redis", url=redis.url, reconnect_delay=0.05)
+        try:
+            async with _make_client([]) as client:
+                first, second = _replica(client, config), _replica(client, config)
+                await first.start()
+                await second.start()
+                await first.get_user_by_telegram_id(7)
+                await second.get_user_by_telegram_id(7)
+
+                await first.update_user_language(7, "uz")
+                await _until(lambda: second.stats()["coherence"]["applied"] == 1)
+                assert await second.get_user_language(7) == "uz"
+                await first.flush()
+
+                # Соединения рвутся — подписка восстанавливается, публикация переподключается
+                redis.disconnect_all()
+                await _until(lambda: redis.commands["SUBSCRIBE"] == 4)
+                await second.update_user_language(7, "en")
+                await _until(lambda: first.stats()["coherence"]["applied"] == 1)
+                assert await first.get_user_language(7) == "en"
+                await first.close()
+                await second.close()
+        finally:
+            await redis.close()
+        assert redis.commands["AUTH"] >= 6
+
+    @pytest.mark.asyncio
+    async def test_unreachable_redis_drops_events_without_failing(self):
+        redis = RedisStandIn()
+        await redis.start()
+        port = redis.port
+        await redis.close()
+        config = _bus_config(backend="redis", url=f"redis://127.0.0.1:{port}/0", reconnect_delay=0.01)
+        bus = CoherenceBus(config, lambda events: asyncio.sleep(0))
+        await bus.start()
+        bus.publish(7, {"language_code": "uz"})
+        await bus.close()
+        assert (bus.messages_sent, bus.errors) == (0, 1)
@@ -0,0 +1,166 @@
+"""
+Unit-тесты JSON-кодека RemoteApiClient и типизированного разбора ответов.
+"""
+
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from nomus.application.services.order_service import OrderService
+from nomus.domain.entities.order import ActiveOrder, ActiveOrderList, PendingNotifications
+from nomus.domain.entities.service import Service, ServiceCatalog
+from nomus.infrastructure.services.json_codec import (
+    CODEC_PREFERENCE,
+    JsonDecodeError,
+    codec_available,
+    select_codec,
+)
+from nomus.infrastructure.services.remote_api_client import (
+    RemoteApiClient,
+    RemoteApiConfig,
+    RemoteApiError,
+)
+
+_AVAILABLE = [name for name in CODEC_PREFERENCE if codec_available(name)]
+
+_ORDERS = (
+    b'{"orders": [{"order_id": 7, "status": "confirmed", "service_name": null,'
+    b' "total_amount": "150000.00", "address_text": "Tashkent", "extra": [1, 2]},'
+    b' {"order_id": 8, "total_amount": 90000}]}'
+)
+
+
+@pytest.mark.parametrize("name", _AVAILABLE)
+class TestJsonCodec:
+    """Одинаковое поведение всех установленных бэкендов"""
+
+    def test_typed_decode(self, name):
+        result = select_codec(name).decode(_ORDERS, ActiveOrderList)
+
+        assert result.orders[0] == ActiveOrder(
+            order_id=7,
+            status="confirmed",
+            service_name=None,
+            total_amount=Decimal("150000.00"),
+            address_text="Tashkent",
+        )
+        assert result.orders[1].status == ""
+        assert result.orders[1].total_amount == Decimal(90000)
+
+    def test_nullable_and_float_fields_do_not_reject_whole_list(self, name):
+        codec = select_codec(name)
+        orders = codec.decode(
+            b'{"orders": [{"order_id": 7, "status": null}, {"order_id": 8, "status": "paid"}]}',
+            ActiveOrderList,
+        )
+        assert [order.status for order in orders.orders] == [None, "paid"]
+        notifications = codec.decode(
+            b'{"notifications": [{"order_id": 7, "status": null}]}', PendingNotifications
+        )
+        assert notifications.notifications[0].status is None
+
+        catalog = codec.decode(
+            b'{"services": [{"id": 1, "name": null, "duration_minutes": 60.0},'
+            b' {"id": 2, "name": "Massage", "duration_minutes": 90}]}',
+            ServiceCatalog,
+        )
+        assert catalog.services == [
+            Service(id=1, name=None, duration_minutes=60.0),
+            Service(id=2, name="Massage", duration_minutes=90),
+        ]
+
+    def test_untyped_decode(self, name):
+        body = select_codec(name).decode(_ORDERS)
+        assert body["orders"][0]["extra"] == [1, 2]
+
+    def test_schema_mismatch(self, name):
+        codec = select_codec(name)
+        with pytest.raises(JsonDecodeError):
+            codec.decode(b'{"orders": [{"status": "pending"}]}', ActiveOrderList)
+        with pytest.raises(JsonDecodeError):
+            codec.decode(b'{"orders": [{"order_id": "7"}]}', ActiveOrderList)
+        with pytest.raises(JsonDecodeError):
+            codec.decode(b"<html>", ActiveOrderList)
+
+    def test_encode_round_trip(self, name):
+        codec = select_codec(name)
+        data = {"order_id": 1, "amount": Decimal("10.50"), "text": "Заказ"}
+        assert select_codec("stdlib").decode(codec.encode(data)) == {
+            "order_id": 1,
+            "amount": "10.50",
+            "text": "Заказ",
+        }
+
+
+class TestTypedResponses:
+    """Типизированные ответы RemoteApiClient и OrderService"""
+
+    @pytest.mark.asyncio
+    async def test_order_service_returns_typed_structs(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/services":
+                return httpx.Response(
+                    200,
+                    json={
+                        "services": [
+                            {"id": 1, "name": "A", "base_price": "100.00", "is_active": True},
+                            {"id": 2, "name": "B", "is_active": False},
+                        ]
+                    },
+                )
+            if request.url.path == "/orders/active":
+                return httpx.Response(200, content=_ORDERS)
+            return httpx.Response(
+                200, json={"notifications": [{"order_id": 7, "status": "completed"}]}
+            )
+
+        config = RemoteApiConfig(base_url="http://nmservices.test", api_key="test")
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            service = OrderService(order_repo=None, payment_service=None, api_client=client)
+
+            services = await service.get_services()
+            assert [s.id for s in services] == [1]
+            assert services[0].base_price == Decimal("100.00")
+
+            orders = await service.get_active_orders(42)
+            assert [o.order_id for o in orders] == [7, 8]
+
+            notifications = await service.get_pending_notifications(42)
+            assert notifications[0].status == "completed"
+
+    @pytest.mark.asyncio
+    async def test_typed_and_raw_responses_are_cached_separately(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"notifications": []})
+
+        config = RemoteApiConfig(base_url="http://nmservices.test", api_key="test")
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            typed = await client.get("/orders/pending-notifications", response_type=PendingNotifications)
+            raw = await client.get("/orders/pending-notifications")
+        assert typed == PendingNotifications(notifications=[])
+        assert raw == {"notifications": []}
+
+    @pytest.mark.asyncio
+    async def test_unexpected_body_raises_api_error(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"services": "oops"})
+
+        config = RemoteApiConfig(base_url="http://nmservices.test", api_key="test")
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            with pytest.raises(RemoteApiError) as exc_info:
+                await client.get("/services", response_type=ServiceCatalog)
+        assert exc_info.value.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_request_body_is_encoded_by_codec(self):
+        bodies: list = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            bodies.append(request.content)
+            return httpx.Response(200, json={"status": "ok"})
+
+        config = RemoteApiConfig(base_url="http://nmservices.test", api_key="test")
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            await client.post("/orders", {"user_id": 1, "address_text": "Ташкент"})
+        assert select_codec("stdlib").decode(bodies[0]) == {"user_id": 1, "address_text": "Ташкент"}
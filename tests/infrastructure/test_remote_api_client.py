@@ -0,0 +1,1014 @@
+"""
+Unit-тесты RemoteApiClient без реального NMservices.
+
+Сервер поднимается локально через aiohttp (входит в зависимости aiogram)
+или подменяется httpx.MockTransport.
+"""
+
+import asyncio
+import gzip
+import time
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from nomus.application.services.order_service import OrderService
+from nomus.common.deadline import deadline_scope
+from nomus.devtools.nmservices_standin import StandInState, build_app
+from nomus.domain.entities.order import ActiveOrderList
+from nomus.infrastructure.services.adaptive_limit import (
+    AdaptiveLimitConfig,
+    AdaptiveLimiter,
+    TokenBucket,
+)
+from nomus.infrastructure.services.bulkhead import (
+    BulkheadClass,
+    BulkheadConfig,
+    BulkheadRoute,
+    Bulkheads,
+)
+from nomus.infrastructure.services.circuit_breaker import (
+    CircuitBreakerConfig,
+    CircuitBreakerRegistry,
+    CircuitState,
+)
+from nomus.infrastructure.services.compression import CompressionConfig, encoding_available
+from nomus.infrastructure.services.connection_pool import PoolConfig
+from nomus.infrastructure.services.hedging import HedgingConfig
+from nomus.infrastructure.services.micro_batcher import BatchingConfig
+from nomus.infrastructure.services.remote_api_client import (
+    CircuitOpenError,
+    DeadlineExceededError,
+    RemoteApiClient,
+    RemoteApiConfig,
+    RemoteApiConnectionError,
+    RemoteApiError,
+    RemoteApiOverloadedError,
+    RemoteApiThrottledError,
+)
+from nomus.infrastructure.services.response_cache import CacheRule, ResponseCacheConfig
+from nomus.infrastructure.services.retry_policy import full_jitter_delay, parse_retry_after
+
+
+async def _start_server(app: web.Application) -> TestServer:
+    server = TestServer(app, host="127.0.0.1")
+    await server.start_server()
+    return server
+
+
+def _make_config(base_url: str, **kwargs) -> RemoteApiConfig:
+    return RemoteApiConfig(
+        base_url=base_url,
+        api_key="test",
+        timeout=5.0,
+        max_retries=2,
+        retry_delay=0.01,
+        **kwargs,
+    )
+
+
+class TestConnectionPool:
+    """Пул соединений, прогрев и статистика ожидания"""
+
+    @pytest.mark.asyncio
+    async def test_warm_up_opens_connections(self):
+        async def root(request: web.Request) -> web.Response:
+            await asyncio.sleep(0.05)
+            return web.json_response({"message": "NoMus API is running"})
+
+        app = web.Application()
+        app.router.add_get("/", root)
+        server = await _start_server(app)
+        try:
+            config = _make_config(
+                str(server.make_url("")),
+                pool=PoolConfig(max_keepalive_connections=3, warmup_connections=3),
+            )
+            async with RemoteApiClient(config) as client:
+                opened = await client.warm_up()
+                assert opened == 3
+                assert client.pool_stats.new_connections == 3
+
+                # Следующий запрос идет по уже открытому соединению
+                await client.get("/")
+                stats = client.stats()["pool"]
+                assert stats["new_connections"] == 3
+                assert stats["reused_connections"] == 1
+                assert stats["wait"]["count"] == 4
+        finally:
+            await server.close()
+
+    @pytest.mark.asyncio
+    async def test_warm_up_capped_by_keepalive(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={})
+
+        config = _make_config(
+            "http://nmservices.test",
+            pool=PoolConfig(max_keepalive_connections=2, warmup_connections=10),
+        )
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            assert await client.warm_up() == 2
+            assert await client.warm_up(0) == 0
+
+    @pytest.mark.asyncio
+    async def test_http2_falls_back_without_h2(self, monkeypatch, caplog):
+        monkeypatch.setattr(
+            "nomus.infrastructure.services.remote_api_client.http2_available",
+            lambda: False,
+        )
+        config = _make_config("http://nmservices.test", pool=PoolConfig(http2=True))
+        client = RemoteApiClient(config)
+        try:
+            await client._get_client()
+            assert "falling back to HTTP/1.1" in caplog.text
+        finally:
+            await client.close()
+
+
+class TestSingleFlight:
+    """Объединение одинаковых одновременных GET-запросов"""
+
+    @staticmethod
+    def _slow_transport(calls: list) -> httpx.MockTransport:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(str(request.url))
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"services": [{"id": 1}]})
+
+        return httpx.MockTransport(handler)
+
+    @pytest.mark.asyncio
+    async def test_identical_gets_share_one_request(self):
+        calls: list = []
+        config = _make_config("http://nmservices.test")
+        async with RemoteApiClient(config, transport=self._slow_transport(calls)) as client:
+            results = await asyncio.gather(*(client.get("/services") for _ in range(20)))
+
+        assert len(calls) == 1
+        assert all(r is results[0] for r in results)
+        assert client.stats()["single_flight"] == {"hits": 19, "misses": 1, "in_flight": 0}
+
+    @pytest.mark.asyncio
+    async def test_different_params_are_not_merged(self):
+        calls: list = []
+        config = _make_config("http://nmservices.test")
+        async with RemoteApiClient(config, transport=self._slow_transport(calls)) as client:
+            await asyncio.gather(
+                client.get("/orders/active", params={"telegram_id": 1}),
+                client.get("/orders/active", params={"telegram_id": 2}),
+                client.get("/orders/active", params={"telegram_id": 1}),
+            )
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        calls: list = []
+        config = _make_config("http://nmservices.test")
+        async with RemoteApiClient(config, transport=self._slow_transport(calls)) as client:
+            first = asyncio.create_task(client.get("/services"))
+            second = asyncio.create_task(client.get("/services"))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            result = await second
+        assert result == {"services": [{"id": 1}]}
+        assert len(calls) == 1
+
+
+class TestCircuitBreaker:
+    """Circuit breaker и экспоненциальная задержка retry"""
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_fails_fast(self):
+        calls: list = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.path)
+            raise httpx.ConnectError("connection refused", request=request)
+
+        config = _make_config(
+            "http://nmservices.test",
+            circuit_breaker=CircuitBreakerConfig(failure_threshold=2, recovery_timeout=60),
+        )
+        transitions: list = []
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            client.circuit_breakers.add_listener(
+                lambda name, old, new: transitions.append((name, new))
+            )
+            with pytest.raises(RemoteApiConnectionError):
+                await client.get("/users/by-telegram/1")
+            assert len(calls) == 2
+
+            # Другой telegram_id — тот же эндпоинт, breaker уже открыт
+            with pytest.raises(CircuitOpenError):
+                await client.get("/users/by-telegram/2")
+            assert len(calls) == 2
+
+            # Другие эндпоинты не затронуты
+            with pytest.raises(RemoteApiConnectionError):
+                await client.get("/services")
+            assert len(calls) == 4
+
+        assert transitions[0] == ("/users/by-telegram/{id}", CircuitState.OPEN)
+        endpoints = client.stats()["circuit_breakers"]["endpoints"]
+        assert endpoints["/users/by-telegram/{id}"]["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_broken_connection_is_retried_and_wrapped(self):
+        calls: list = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.method)
+            if len(calls) == 1:
+                raise httpx.ReadError("connection reset", request=request)
+            if request.method == "POST":
+                raise httpx.RemoteProtocolError("peer closed connection", request=request)
+            return httpx.Response(200, json={"telegram_id": 1})
+
+        config = _make_config("http://nmservices.test")
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            # GET безопасно повторить после обрыва
+            assert await client.get("/users/by-telegram/1") == {"telegram_id": 1}
+            assert calls == ["GET", "GET"]
+            # POST без ключа мог дойти до сервера — не повторяется, но ошибка клиентская
+            with pytest.raises(RemoteApiConnectionError) as exc_info:
+                await client.post("/orders", {"user_id": 1})
+            assert isinstance(exc_info.value.__cause__, httpx.RemoteProtocolError)
+            assert calls == ["GET", "GET", "POST"]
+
+    def test_half_open_probe_closes_or_reopens(self):
+        now = [0.0]
+        registry = CircuitBreakerRegistry(
+            CircuitBreakerConfig(failure_threshold=1, recovery_timeout=10),
+            clock=lambda: now[0],
+        )
+        breaker = registry.get("/services")
+        breaker.record_failure()
+        assert breaker.state is CircuitState.OPEN
+        assert not breaker.allow_request()
+
+        now[0] = 11.0
+        assert breaker.allow_request()
+        assert breaker.state is CircuitState.HALF_OPEN
+        # Пробный запрос уже идет — остальные отклоняются
+        assert not breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state is CircuitState.OPEN
+
+        now[0] = 22.0
+        assert breaker.allow_request()
+        breaker.record_success()
+        assert breaker.state is CircuitState.CLOSED
+        assert registry.snapshot()["transitions"] == 5
+
+    def test_full_jitter_delay_is_bounded(self):
+        for attempt in range(10):
+            delay = full_jitter_delay(attempt, base=1.0, cap=5.0)
+            assert 0 <= delay <= min(5.0, 2 ** attempt)
+
+
+class TestResponseCache:
+    """Кеш ответов GET: TTL, ревалидация, stale-while-revalidate, LRU"""
+
+    @staticmethod
+    def _etag_transport(calls: list) -> httpx.MockTransport:
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304, headers={"ETag": '"v1"'})
+            return httpx.Response(
+                200, json={"services": [{"id": 1}]}, headers={"ETag": '"v1"'}
+            )
+
+        return httpx.MockTransport(handler)
+
+    @staticmethod
+    def _cache_config(*rules: CacheRule, max_entries: int = 100) -> ResponseCacheConfig:
+        return ResponseCacheConfig(enabled=True, max_entries=max_entries, rules=list(rules))
+
+    @pytest.mark.asyncio
+    async def test_get_in_flight_during_post_is_not_cached(self):
+        orders: list = []
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.method == "POST":
+                orders.append(len(orders) + 1)
+                return httpx.Response(200, json={"status": "ok", "order_id": orders[-1]})
+            snapshot = list(orders)
+            await release.wait()
+            return httpx.Response(200, json={"orders": snapshot})
+
+        config = _make_config(
+            "http://nmservices.test",
+            cache=self._cache_config(CacheRule(pattern="/orders/active", ttl=30)),
+        )
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            before = asyncio.ensure_future(client.get("/orders/active"))
+            await asyncio.sleep(0.01)
+            await client.post("/orders", {"user_id": 1})
+            # Запрос после POST не присоединяется к начатому до него
+            after = asyncio.ensure_future(client.get("/orders/active"))
+            await asyncio.sleep(0.01)
+            release.set()
+            assert (await before)["orders"] == []
+            assert (await after)["orders"] == [1]
+            assert (await client.get("/orders/active"))["orders"] == [1]
+
+    @pytest.mark.asyncio
+    async def test_fresh_hit_and_conditional_revalidation(self):
+        calls: list = []
+        config = _make_config(
+            "http://nmservices.test",
+            cache=self._cache_config(CacheRule(pattern="/services", ttl=0.05)),
+        )
+        async with RemoteApiClient(config, transport=self._etag_transport(calls)) as client:
+            first = await client.get("/services")
+            second = await client.get("/services")
+            assert calls == [None]
+            assert second is first
+
+            await asyncio.sleep(0.06)
+            third = await client.get("/services")
+            assert calls == [None, '"v1"']
+            assert third == first
+
+            stats = client.stats()["cache"]
+            assert stats["hits"] == 1
+            assert stats["revalidated"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_while_revalidate_serves_stale(self):
+        calls: list = []
+        config = _make_config(
+            "http://nmservices.test",
+            cache=self._cache_config(
+                CacheRule(pattern="/services", ttl=0.01, stale_while_revalidate=10)
+            ),
+        )
+        async with RemoteApiClient(config, transport=self._etag_transport(calls)) as client:
+            await client.get("/services")
+            await asyncio.sleep(0.02)
+            await client.get("/services")
+            # Устаревший ответ отдан сразу, обновление идет в фоне
+            assert client.stats()["cache"]["stale_hits"] == 1
+            await asyncio.sleep(0.01)
+            assert calls == [None, '"v1"']
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_and_uncached_endpoints(self):
+        calls: list = []
+        config = _make_config(
+            "http://nmservices.test",
+            cache=self._cache_config(
+                CacheRule(pattern="/users/by-telegram/*", ttl=60), max_entries=2
+            ),
+        )
+        async with RemoteApiClient(config, transport=self._etag_transport(calls)) as client:
+            for telegram_id in (1, 2, 3):
+                await client.get(f"/users/by-telegram/{telegram_id}")
+            await client.get("/users/by-telegram/1")  # вытеснен
+            await client.get("/services")  # нет правила
+            await client.get("/services")
+            assert len(calls) == 6
+            assert client.stats()["cache"]["evictions"] == 2
+
+    @pytest.mark.asyncio
+    async def test_write_invalidates_resource(self):
+        calls: list = []
+        config = _make_config(
+            "http://nmservices.test",
+            cache=self._cache_config(CacheRule(pattern="/orders/active", ttl=60)),
+        )
+        async with RemoteApiClient(config, transport=self._etag_transport(calls)) as client:
+            await client.get("/orders/active", params={"telegram_id": 1})
+            await client.post("/orders", {"user_id": 1})
+            await client.get("/orders/active", params={"telegram_id": 1})
+            assert calls == [None, None, None]
+
+
+class TestDeadline:
+    """Бюджет времени update ограничивает таймауты и retry"""
+
+    @pytest.mark.asyncio
+    async def test_slow_response_is_cancelled_at_deadline(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(1)
+            return httpx.Response(200, json={})
+
+        config = _make_config("http://nmservices.test")
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            started = time.monotonic()
+            with deadline_scope(0.05):
+                with pytest.raises(DeadlineExceededError):
+                    await client.post("/orders", {"user_id": 1})
+            assert time.monotonic() - started < 0.5
+
+    @pytest.mark.asyncio
+    async def test_retry_skipped_when_budget_is_short(self):
+        calls: list = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.path)
+            raise httpx.ConnectError("connection refused", request=request)
+
+        config = _make_config("http://nmservices.test")
+        config.max_retries = 5
+        config.retry_delay = 10.0
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            with deadline_scope(0.1):
+                with pytest.raises(DeadlineExceededError):
+                    await client.get("/services")
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_order_service_skips_calls_after_deadline(self):
+        class _FailingClient:
+            async def post(self, endpoint, data):
+                raise AssertionError("must not be called")
+
+        service = OrderService(order_repo=None, payment_service=None, api_client=_FailingClient())
+        with deadline_scope(0):
+            assert await service.create_order(1, 1, "addr") is None
+            assert await service.initiate_payment(1) is None
+
+
+class TestBulkheads:
+    """Bulkhead'ы по классам эндпоинтов и приоритетная очередь"""
+
+    @pytest.mark.asyncio
+    async def test_background_storm_does_not_block_orders(self):
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/orders/pending-notifications":
+                await release.wait()
+            return httpx.Response(200, json={"ok": True})
+
+        config = _make_config("http://nmservices.test")
+        config.bulkheads = BulkheadConfig(
+            classes={
+                "critical": BulkheadClass(max_concurrent=2, priority=0),
+                "interactive": BulkheadClass(max_concurrent=2, priority=1),
+                "background": BulkheadClass(max_concurrent=2, priority=2),
+            },
+        )
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            storm = [
+                asyncio.create_task(
+                    client.get("/orders/pending-notifications", {"telegram_id": i})
+                )
+                for i in range(10)
+            ]
+            await asyncio.sleep(0.01)
+
+            result = await asyncio.wait_for(client.post("/orders", {"user_id": 1}), 1)
+            assert result == {"ok": True}
+
+            stats = client.stats()["bulkheads"]["classes"]
+            assert stats["background"]["in_flight"] == 2
+            assert stats["background"]["queued"] == 8
+            assert stats["background"]["max_queue_depth"] == 8
+            assert stats["critical"]["wait"]["count"] == 1
+
+            release.set()
+            await asyncio.gather(*storm)
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_request(self):
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await release.wait()
+            return httpx.Response(200, json={})
+
+        config = _make_config("http://nmservices.test")
+        config.bulkheads = BulkheadConfig(
+            classes={
+                "interactive": BulkheadClass(max_concurrent=1),
+                "background": BulkheadClass(max_concurrent=1, priority=2, max_queue=1),
+            },
+        )
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            first = asyncio.create_task(client.get("/orders/pending-notifications", {"telegram_id": 1}))
+            second = asyncio.create_task(client.get("/orders/pending-notifications", {"telegram_id": 2}))
+            await asyncio.sleep(0.01)
+
+            with pytest.raises(RemoteApiOverloadedError):
+                await client.get("/orders/pending-notifications", {"telegram_id": 3})
+            assert client.stats()["bulkheads"]["classes"]["background"]["rejected"] == 1
+            # Отказ на стороне клиента не считается сбоем NMservices
+            breaker = client.circuit_breakers.get("/orders/pending-notifications")
+            assert breaker.consecutive_failures == 0
+
+            release.set()
+            await asyncio.gather(first, second)
+
+    @pytest.mark.asyncio
+    async def test_gate_admits_by_priority(self):
+        config = BulkheadConfig(
+            max_concurrent=1,
+            classes={
+                "critical": BulkheadClass(max_concurrent=5, priority=0),
+                "background": BulkheadClass(max_concurrent=5, priority=2),
+            },
+            default_class="background",
+            routes=[BulkheadRoute(method="POST", pattern="/orders", bulkhead="critical")],
+        )
+        bulkheads = Bulkheads(config, total_limit=100)
+        order: list = []
+
+        async def call(method: str, endpoint: str, tag: str) -> None:
+            async with bulkheads.slot(method, endpoint):
+                order.append(tag)
+                await asyncio.sleep(0.01)
+
+        holder = asyncio.create_task(call("GET", "/services", "holder"))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(call("GET", "/services", f"bg{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        waiters.append(asyncio.create_task(call("POST", "/orders", "critical")))
+        await asyncio.gather(holder, *waiters)
+
+        assert order[0] == "holder"
+        assert order[1] == "critical"
+
+
+class TestMicroBatching:
+    """Объединение одиночных GET по telegram_id в bulk-запросы"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_share_one_bulk_request(self):
+        state = StandInState.seeded(users=50, orders_per_user=2)
+        server = await _start_server(build_app(state))
+        try:
+            config = _make_config(
+                str(server.make_url("")),
+                batching=BatchingConfig(enabled=True, window=0.02, max_batch=100),
+            )
+            async with RemoteApiClient(config) as client:
+                service = OrderService(order_repo=None, payment_service=None, api_client=client)
+                results = await asyncio.gather(
+                    *(service.get_active_orders(telegram_id) for telegram_id in range(1, 51))
+                )
+
+                for telegram_id, orders in zip(range(1, 51), results):
+                    expected = state.active_orders(telegram_id)["orders"]
+                    assert [o.order_id for o in orders] == [o["order_id"] for o in expected]
+                assert state.requests[("GET", "/orders/active")] == 1
+                assert client.stats()["batching"]["max_batch_size"] == 50
+        finally:
+            await server.close()
+
+    @pytest.mark.asyncio
+    async def test_max_batch_splits_requests(self):
+        state = StandInState.seeded(users=10, orders_per_user=1)
+        server = await _start_server(build_app(state))
+        try:
+            config = _make_config(
+                str(server.make_url("")),
+                batching=BatchingConfig(enabled=True, window=0.5, max_batch=4),
+            )
+            async with RemoteApiClient(config) as client:
+                started = time.monotonic()
+                await asyncio.gather(
+                    *(
+                        client.get("/orders/pending-notifications", {"telegram_id": i})
+                        for i in range(1, 9)
+                    )
+                )
+                # Полные пачки уходят сразу, не дожидаясь окна
+                assert time.monotonic() - started < 0.4
+            assert state.requests[("GET", "/orders/pending-notifications")] == 2
+        finally:
+            await server.close()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_when_bulk_is_not_supported(self):
+        paths: list = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            paths.append(str(request.url.params))
+            if "telegram_ids" in request.url.params:
+                return httpx.Response(422, json={"detail": "telegram_id is required"})
+            telegram_id = int(request.url.params["telegram_id"])
+            return httpx.Response(200, json={"orders": [{"order_id": telegram_id}]})
+
+        config = _make_config(
+            "http://nmservices.test",
+            batching=BatchingConfig(enabled=True, window=0.01),
+        )
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            first = await asyncio.gather(
+                *(
+                    client.get("/orders/active", {"telegram_id": i}, response_type=ActiveOrderList)
+                    for i in (1, 2)
+                )
+            )
+            assert [r.orders[0].order_id for r in first] == [1, 2]
+
+            # Эндпоинт запомнен — дальше запросы идут без попытки bulk
+            await client.get("/orders/active", {"telegram_id": 3})
+            assert client.stats()["batching"]["fallback_endpoints"] == ["/orders/active"]
+        assert sum("telegram_ids" in p for p in paths) == 1
+        assert len(paths) == 4
+
+
+class TestAdaptiveLimit:
+    """AIMD-лимит одновременных запросов и token bucket"""
+
+    @pytest.mark.asyncio
+    async def test_aimd_decreases_once_per_window_and_grows_back(self):
+        now = [0.0]
+        limiter = AdaptiveLimiter(
+            AdaptiveLimitConfig(enabled=True, initial_limit=10, min_limit=2, max_limit=12),
+            clock=lambda: now[0],
+        )
+        permits = [await limiter.acquire() for _ in range(10)]
+
+        # Все 10 запросов начаты до уменьшения — лимит уменьшается один раз
+        for permit in permits:
+            permit.mark_overloaded()
+            limiter.release(permit)
+        assert limiter.limit == 7
+        assert limiter.decreases == 1
+
+        # Быстрые ответы при заполненном лимите — аддитивный рост
+        for _ in range(60):
+            now[0] += 0.01
+            batch = [await limiter.acquire() for _ in range(limiter.limit)]
+            for permit in batch:
+                limiter.release(permit)
+        assert limiter.limit == 12
+        assert limiter.increases == 5
+
+    @pytest.mark.asyncio
+    async def test_slow_responses_count_as_overload(self):
+        now = [0.0]
+        limiter = AdaptiveLimiter(
+            AdaptiveLimitConfig(enabled=True, initial_limit=10, latency_threshold=0.5),
+            clock=lambda: now[0],
+        )
+        permit = await limiter.acquire()
+        now[0] += 1.0
+        limiter.release(permit)
+        assert limiter.limit == 7
+
+    @pytest.mark.asyncio
+    async def test_client_respects_limit_and_exports_it(self):
+        active = 0
+        peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            if request.url.params.get("fail"):
+                return httpx.Response(503, json={})
+            return httpx.Response(200, json={})
+
+        config = _make_config("http://nmservices.test")
+        config.single_flight = False
+        config.adaptive_limit = AdaptiveLimitConfig(
+            enabled=True, initial_limit=4, min_limit=1, max_limit=4
+        )
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            await asyncio.gather(*(client.get("/services") for _ in range(20)))
+            assert peak == 4
+
+            with pytest.raises(RemoteApiError):
+                await client.get("/services", {"fail": 1})
+            assert client.concurrency_limit < 4
+            assert client.stats()["concurrency"]["limit"] == client.concurrency_limit
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_caps_rate(self):
+        now = [0.0]
+        bucket = TokenBucket(rate=10, burst=2, clock=lambda: now[0])
+        delays = [bucket.reserve() for _ in range(5)]
+        assert delays == pytest.approx([0.0, 0.0, 0.1, 0.2, 0.3])
+        now[0] += 1.0
+        assert bucket.reserve() == 0.0
+
+
+class TestHedging:
+    """Hedged-запросы для идемпотентных GET"""
+
+    @staticmethod
+    def _client(handler, **hedging) -> RemoteApiClient:
+        config = _make_config("http://nmservices.test")
+        config.single_flight = False
+        config.hedging = HedgingConfig(
+            enabled=True, min_samples=5, min_delay=0.01, percentile=90.0, **hedging
+        )
+        return RemoteApiClient(config, transport=httpx.MockTransport(handler))
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged(self):
+        calls = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            if calls == 11:
+                await asyncio.sleep(2)  # «медленная реплика»
+            return httpx.Response(200, json={"telegram_id": 1, "call": calls})
+
+        async with self._client(handler, max_hedge_ratio=1.0) as client:
+            for _ in range(10):
+                await client.get("/users/by-telegram/1")
+
+            started = time.monotonic()
+            body = await client.get("/users/by-telegram/1")
+            assert time.monotonic() - started < 1
+            assert body["call"] == 12
+
+            stats = client.stats()["hedging"]
+            assert stats["fired"] == 1
+            assert stats["won"] == 1
+            assert "/users/by-telegram/{id}" in stats["delay_ms"]
+
+    @pytest.mark.asyncio
+    async def test_hedge_rate_is_capped(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(0.05 if request.url.params.get("slow") else 0)
+            return httpx.Response(200, json={})
+
+        async with self._client(handler, max_hedge_ratio=0.1) as client:
+            for _ in range(10):
+                await client.get("/services")
+            await asyncio.gather(*(client.get("/services", {"slow": 1}) for _ in range(10)))
+
+            stats = client.stats()["hedging"]
+            # 20 запросов * 0.1 = бюджет на 2 hedge'а
+            assert stats["fired"] == 2
+            assert stats["skipped_budget"] == 8
+
+    @pytest.mark.asyncio
+    async def test_non_idempotent_requests_are_not_hedged(self):
+        calls = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.02)
+            return httpx.Response(200, json={"status": "ok"})
+
+        async with self._client(handler, max_hedge_ratio=1.0, endpoints=["*"]) as client:
+            for _ in range(10):
+                await client.post("/orders", {"user_id": 1})
+        assert calls == 10
+        assert client.stats()["hedging"]["fired"] == 0
+
+
+class TestIdempotency:
+    """Ключи идемпотентности для POST"""
+
+    @pytest.mark.asyncio
+    async def test_key_is_kept_across_timeout_retries(self):
+        keys: list = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            keys.append(request.headers.get("Idempotency-Key"))
+            if len(keys) == 1:
+                raise httpx.ReadTimeout("timed out", request=request)
+            return httpx.Response(200, json={"status": "ok", "order_id": 7})
+
+        config = _make_config("http://nmservices.test")
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            body = await client.post("/orders", {"user_id": 1}, idempotency_key="op-1")
+        assert body["order_id"] == 7
+        assert keys == ["op-1", "op-1"]
+
+    @pytest.mark.asyncio
+    async def test_one_off_key_is_not_remembered(self):
+        keys: list = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            keys.append(request.headers.get("Idempotency-Key"))
+            if len(keys) == 1:
+                raise httpx.ReadTimeout("timed out", request=request)
+            return httpx.Response(200, json={"status": "ok", "results": []})
+
+        config = _make_config("http://nmservices.test")
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            await client.post("/users/bulk", {"users": []}, idempotency_key="b-1", remember=False)
+            assert client.stats()["idempotency"]["entries"] == 0
+        assert keys == ["b-1", "b-1"]
+
+    @pytest.mark.asyncio
+    async def test_completed_operation_is_not_resent(self):
+        calls = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"status": "ok", "order_id": calls})
+
+        config = _make_config("http://nmservices.test")
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            # Двойное нажатие: одновременные вызовы и повтор после завершения
+            first, second = await asyncio.gather(
+                client.post("/orders", {"user_id": 1}, idempotency_key="op-1"),
+                client.post("/orders", {"user_id": 1}, idempotency_key="op-1"),
+            )
+            third = await client.post("/orders", {"user_id": 1}, idempotency_key="op-1")
+            other = await client.post("/orders", {"user_id": 1}, idempotency_key="op-2")
+
+        assert first == second == third == {"status": "ok", "order_id": 1}
+        assert other["order_id"] == 2
+        assert calls == 2
+        stats = client.stats()
+        assert (stats["idempotency"]["hits"], stats["idempotency"]["coalesced"]) == (1, 1)
+        # POST не учитываются в статистике объединения GET
+        assert stats["single_flight"]["misses"] == 0
+
+    @pytest.mark.asyncio
+    async def test_post_without_key_is_not_retried_after_read_timeout(self):
+        calls = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        config = _make_config("http://nmservices.test")
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            with pytest.raises(RemoteApiConnectionError):
+                await client.post("/orders", {"user_id": 1})
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_order_service_sends_key(self):
+        keys: list = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            keys.append(request.headers.get("Idempotency-Key"))
+            return httpx.Response(200, json={"status": "ok", "order_id": 5})
+
+        config = _make_config("http://nmservices.test")
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            service = OrderService(None, None, api_client=client)
+            await service.create_order(1, 2, "addr", idempotency_key="op-1")
+            await service.create_order(1, 2, "addr", idempotency_key="op-1")
+            await service.initiate_payment(5)
+        assert keys[0] == "op-1"
+        assert len(keys) == 2 and keys[1]
+
+
+class TestThrottling:
+    """Повторы после 429/503 и общий cool-down эндпоинта"""
+
+    def test_parse_retry_after(self):
+        now = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after("Thu, 01 Jan 2026 12:00:05 GMT", now) == 5.0
+        assert parse_retry_after("Thu, 01 Jan 2026 11:00:00 GMT", now) == 0.0
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after(None) is None
+
+    @pytest.mark.asyncio
+    async def test_429_is_retried_after_retry_after(self):
+        sent: list = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            sent.append(time.monotonic())
+            if len(sent) == 1:
+                return httpx.Response(429, headers={"Retry-After": "0.2"}, json={})
+            return httpx.Response(200, json={"status": "ok", "order_id": 1})
+
+        config = _make_config("http://nmservices.test")
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            # 429: запрос не обработан — повторяется даже POST без ключа
+            body = await client.post("/orders", {"user_id": 1})
+        assert body["order_id"] == 1
+        assert sent[1] - sent[0] >= 0.2
+        assert client.stats()["throttling"]["throttled"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cooldown_is_shared_across_requests(self):
+        calls: list = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append((request.url.path, time.monotonic()))
+            if len(calls) == 1:
+                return httpx.Response(503, headers={"Retry-After": "1"}, json={})
+            return httpx.Response(200, json={"id": 1})
+
+        config = _make_config("http://nmservices.test")
+        config.single_flight = False
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            first = asyncio.ensure_future(client.get("/users/by-telegram/1"))
+            await asyncio.sleep(0.05)
+            started = time.monotonic()
+            # Другой пользователь — тот же эндпоинт: ждет окончания cool-down
+            await client.get("/users/by-telegram/2")
+            assert time.monotonic() - started >= 0.9
+            await first
+            # Другие эндпоинты не затронуты
+            started = time.monotonic()
+            await client.get("/services")
+            assert time.monotonic() - started < 0.5
+
+        assert client.stats()["throttling"]["waits"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_long_cooldown_fails_fast(self):
+        calls = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            return httpx.Response(429, headers={"Retry-After": "120"}, json={})
+
+        config = _make_config("http://nmservices.test")
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            with pytest.raises(RemoteApiThrottledError) as exc_info:
+                await client.get("/services")
+            assert exc_info.value.retry_after == 120.0
+            # Следующий запрос не идет в сеть, пока длится cool-down
+            with pytest.raises(RemoteApiThrottledError):
+                await client.get("/services")
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_cooldown_respects_deadline(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(429, headers={"Retry-After": "5"}, json={})
+
+        config = _make_config("http://nmservices.test")
+        config.max_retries = 1
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            with pytest.raises(RemoteApiThrottledError):
+                await client.get("/services")
+            # Cool-down длиннее оставшегося бюджета update — ждать бессмысленно
+            with pytest.raises(DeadlineExceededError):
+                with deadline_scope(1):
+                    await client.get("/services")
+
+
+class TestCompression:
+    """Сжатие ответов и тел bulk-запросов"""
+
+    @pytest.mark.asyncio
+    async def test_large_responses_are_compressed(self):
+        state = StandInState.seeded(users=3, orders_per_user=50)
+        server = await _start_server(build_app(state, compress_min_size=1024))
+        try:
+            config = _make_config(str(server.make_url("")))
+            async with RemoteApiClient(config) as client:
+                body = await client.get("/orders/active", {"telegram_id": 1})
+                assert len(body["orders"]) > 0
+                await client.get("/services")
+                stats = client.stats()["compression"]
+        finally:
+            await server.close()
+
+        assert "gzip" in stats["accept_encoding"]
+        assert stats["responses"] == 2
+        # /services меньше порога и уходит как есть; /orders/active сжат
+        assert stats["compressed_responses"] == 1
+        assert stats["wire_bytes"] < stats["decoded_bytes"]
+
+    @pytest.mark.asyncio
+    async def test_bulk_request_body_is_compressed_above_threshold(self):
+        received: list = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            encoding = request.headers.get("Content-Encoding")
+            raw = gzip.decompress(request.content) if encoding else request.content
+            received.append((request.url.path, encoding, len(raw)))
+            return httpx.Response(200, json={"status": "ok"})
+
+        config = _make_config(
+            "http://nmservices.test",
+            compression=CompressionConfig(request_encoding="gzip", request_min_size=1000),
+        )
+        users = [{"telegram_id": i, "phone_number": f"+9989000{i:05d}"} for i in range(100)]
+        async with RemoteApiClient(config, transport=httpx.MockTransport(handler)) as client:
+            await client.post("/users/bulk", {"users": users})
+            await client.post("/users/bulk", {"users": users[:2]})
+            await client.post("/orders", {"users": users})
+
+        assert received[0][:2] == ("/users/bulk", "gzip")
+        assert received[1][1] is None  # меньше порога
+        assert received[2][1] is None  # не bulk-эндпоинт
+        assert client.stats()["compression"]["request_bytes_saved"] > 0
+
+    def test_zstd_requires_httpx_decoder(self, monkeypatch):
+        # Пакеты сжатия «установлены» — решает версия httpx
+        monkeypatch.setattr(
+            "nomus.infrastructure.services.compression._module_available",
+            lambda *names: names[0],
+        )
+        monkeypatch.setattr(httpx, "__version__", "0.27.0")
+        assert not encoding_available("zstd")
+        assert encoding_available("br")
+        monkeypatch.setattr(httpx, "__version__", "0.27.1")
+        assert encoding_available("zstd")
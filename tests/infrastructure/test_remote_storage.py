@@ -0,0 +1,745 @@
+"""
+Тесты RemoteStorage: фоновая синхронизация (write-behind), параллельный
+и bulk-flush, журнал изменений, delta-синхронизация и вытеснение из кеша.
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from nomus.devtools.nmservices_standin import StandInState, build_app
+
+from nomus.infrastructure.database.bulk_sync import BulkSyncConfig, chunk_records
+from nomus.infrastructure.database.cache_warmup import WarmupConfig
+from nomus.infrastructure.database.journal import Journal, JournalConfig
+from nomus.infrastructure.database.remote_storage import RemoteStorage, RemoteStorageConfig
+from nomus.infrastructure.database.user_cache import UserCacheConfig
+from nomus.infrastructure.database.write_behind import WriteBehindConfig
+from nomus.infrastructure.services.remote_api_client import RemoteApiClient, RemoteApiConfig
+
+
+def _make_client(handler) -> RemoteApiClient:
+    config = RemoteApiConfig(
+        base_url="http://nmservices.test", api_key="test", max_retries=2, retry_delay=0.01
+    )
+    return RemoteApiClient(config, transport=httpx.MockTransport(handler))
+
+
+async def _start_server(app: web.Application) -> TestServer:
+    server = TestServer(app, host="127.0.0.1")
+    await server.start_server()
+    return server
+
+
+def _standin_config(server: TestServer) -> RemoteApiConfig:
+    return RemoteApiConfig(
+        base_url=str(server.make_url("")), api_key="test", max_retries=2, retry_delay=0.01
+    )
+
+
+def _recorder():
+    received: list = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        received.append((request.url.path, json.loads(request.content)))
+        return httpx.Response(200, json={"status": "ok", "user_id": 1})
+
+    return received, handler
+
+
+def _storage(
+    client: RemoteApiClient, flush_concurrency: int = 0, bulk: bool = False, **write_behind
+) -> RemoteStorage:
+    return RemoteStorage(
+        client,
+        RemoteStorageConfig(
+            write_behind=WriteBehindConfig(**write_behind),
+            flush_concurrency=flush_concurrency,
+            bulk=BulkSyncConfig(enabled=bulk, max_records=3),
+        ),
+    )
+
+
+def _user(telegram_id: int) -> dict:
+    return {"telegram_id": telegram_id, "phone_number": f"+99890000{telegram_id:04d}"}
+
+
+class TestWriteBehind:
+    """Фоновый flush по интервалу, порогу и при остановке"""
+
+    @pytest.mark.asyncio
+    async def test_flush_on_dirty_threshold(self):
+        received, handler = _recorder()
+        async with _make_client(handler) as client:
+            storage = _storage(client, interval=60, max_dirty=3)
+            await storage.start()
+            for telegram_id in range(1, 4):
+                await storage.save_or_update_user(telegram_id, _user(telegram_id))
+            for _ in range(50):
+                if len(received) == 3:
+                    break
+                await asyncio.sleep(0.01)
+            assert sorted(body["telegram_id"] for _, body in received) == [1, 2, 3]
+            assert storage.dirty_count() == 0
+            assert storage.stats()["write_behind"]["early_flushes"] == 1
+            await storage.close()
+
+    @pytest.mark.asyncio
+    async def test_flush_on_interval(self):
+        received, handler = _recorder()
+        async with _make_client(handler) as client:
+            storage = _storage(client, interval=0.05, max_dirty=1000)
+            await storage.start()
+            await storage.save_or_update_user(1, _user(1))
+            await asyncio.sleep(0.2)
+            assert [path for path, _ in received] == ["/users/register"]
+            await storage.close()
+
+    @pytest.mark.asyncio
+    async def test_close_drains_pending_changes(self):
+        received, handler = _recorder()
+        async with _make_client(handler) as client:
+            storage = _storage(client, interval=60, max_dirty=1000)
+            await storage.start()
+            await storage.save_or_update_user(1, _user(1))
+            await storage.save_or_update_order("o-1", {"order_id": "o-1", "telegram_id": 1})
+            assert received == []
+            await storage.close()
+        assert [path for path, _ in received] == ["/users/register", "/orders"]
+        assert storage.dirty_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_changes_during_flush_stay_dirty(self):
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            started.set()
+            await release.wait()
+            return httpx.Response(200, json={"status": "ok"})
+
+        async with _make_client(handler) as client:
+            storage = _storage(client, enabled=False)
+            await storage.save_or_update_user(1, _user(1))
+            flush = asyncio.ensure_future(storage.flush())
+            await started.wait()
+            await storage.save_or_update_user(2, _user(2))
+            release.set()
+            await flush
+            assert storage.dirty_count() == 1
+
+    @pytest.mark.asyncio
+    async def test_request_flush_does_not_block(self):
+        received, handler = _recorder()
+        async with _make_client(handler) as client:
+            storage = _storage(client, enabled=False)
+            await storage.save_or_update_user(1, _user(1))
+            storage.request_flush()
+            assert received == []
+            await storage.close()
+        assert len(received) == 1
+
+
+class TestParallelFlush:
+    """flush отправляет записи параллельно и возвращает неудачные в dirty"""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        in_flight = 0
+        peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200, json={"status": "ok"})
+
+        async with _make_client(handler) as client:
+            storage = _storage(client, flush_concurrency=4, enabled=False)
+            for telegram_id in range(1, 21):
+                await storage.save_or_update_user(telegram_id, _user(telegram_id))
+            await storage.flush()
+            assert peak == 4
+            assert storage.dirty_count() == 0
+            assert storage.stats()["flush"]["synced"] == 20
+
+    @pytest.mark.asyncio
+    async def test_transient_failures_stay_dirty(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if json.loads(request.content)["telegram_id"] % 2:
+                return httpx.Response(500, json={"detail": "boom"})
+            return httpx.Response(200, json={"status": "ok"})
+
+        async with _make_client(handler) as client:
+            client.config.max_retries = 1
+            storage = _storage(client, enabled=False)
+            for telegram_id in range(1, 7):
+                await storage.save_or_update_user(telegram_id, _user(telegram_id))
+            await storage.flush()
+            assert storage._dirty_users == {1, 3, 5}
+            stats = storage.stats()["flush"]
+            assert (stats["synced"], stats["failed"]) == (3, 3)
+
+    @pytest.mark.asyncio
+    async def test_rejected_records_are_dropped(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(422, json={"detail": "invalid phone"})
+
+        async with _make_client(handler) as client:
+            storage = _storage(client, enabled=False)
+            await storage.save_or_update_user(1, _user(1))
+            await storage.flush()
+            assert storage.dirty_count() == 0
+            assert storage.stats()["flush"]["dropped"] == 1
+
+
+class TestBulkSync:
+    """flush пачками через /users/bulk и /orders/bulk"""
+
+    def test_chunks_by_count_and_size(self):
+        records = [(n, {"telegram_id": n, "note": "x" * 40}) for n in range(10)]
+        assert [len(c) for c in chunk_records(records, max_records=4, max_bytes=10_000)] == [4, 4, 2]
+        assert [len(c) for c in chunk_records(records, max_records=100, max_bytes=150)] == [2] * 5
+        # Запись больше max_bytes уходит отдельной пачкой
+        assert [len(c) for c in chunk_records(records[:2], max_records=100, max_bytes=10)] == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_flush_uses_bulk_endpoints(self):
+        state = StandInState.seeded(users=0)
+        server = await _start_server(build_app(state))
+        try:
+            async with RemoteApiClient(_standin_config(server)) as client:
+                storage = _storage(client, bulk=True, enabled=False)
+                for telegram_id in range(1, 8):
+                    await storage.save_or_update_user(telegram_id, _user(telegram_id))
+                # Без телефона сервер отвергает запись — она не должна мешать остальным
+                await storage.save_or_update_user(8, {"telegram_id": 8})
+                await storage.flush()
+                assert storage.dirty_count() == 0
+                stats = storage.stats()["flush"]
+                assert (stats["synced"], stats["dropped"], stats["bulk_requests"]) == (7, 1, 3)
+                # Одноразовые ключи пачек не вытесняют заказы из кеша идемпотентности
+                assert client.stats()["idempotency"]["entries"] == 0
+        finally:
+            await server.close()
+        assert sorted(state.users) == list(range(1, 8))
+        assert state.requests[("POST", "/users/register")] == 0
+
+    @pytest.mark.asyncio
+    async def test_falls_back_when_bulk_not_advertised(self):
+        state = StandInState.seeded(users=0)
+        server = await _start_server(build_app(state, bulk=False))
+        try:
+            async with RemoteApiClient(_standin_config(server)) as client:
+                storage = _storage(client, bulk=True, enabled=False)
+                for telegram_id in range(1, 5):
+                    await storage.save_or_update_user(telegram_id, _user(telegram_id))
+                await storage.flush()
+                await storage.save_or_update_user(5, _user(5))
+                await storage.flush()
+                assert storage.stats()["bulk"]["probes"] == 1
+        finally:
+            await server.close()
+        assert state.requests[("POST", "/users/register")] == 5
+        assert sorted(state.users) == [1, 2, 3, 4, 5]
+
+    @pytest.mark.asyncio
+    async def test_rejected_bulk_endpoint_falls_back(self):
+        paths: list = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            paths.append(request.url.path)
+            if request.url.path == "/capabilities":
+                return httpx.Response(200, json={"bulk_endpoints": ["/users/bulk"]})
+            if request.url.path == "/users/bulk":
+                return httpx.Response(404, json={"detail": "Not Found"})
+            return httpx.Response(200, json={"status": "ok"})
+
+        async with _make_client(handler) as client:
+            storage = _storage(client, bulk=True, enabled=False)
+            await storage.save_or_update_user(1, _user(1))
+            await storage.flush()
+            await storage.save_or_update_user(2, _user(2))
+            await storage.flush()
+        assert paths == ["/capabilities", "/users/bulk", "/users/register", "/users/register"]
+        assert storage.dirty_count() == 0
+
+
+class TestJournal:
+    """Журнал изменений переживает перезапуск и очищается после flush"""
+
+    @staticmethod
+    def _storage(client: RemoteApiClient, path) -> RemoteStorage:
+        return RemoteStorage(
+            client,
+            RemoteStorageConfig(
+                write_behind=WriteBehindConfig(enabled=False),
+                bulk=BulkSyncConfig(enabled=False),
+                journal=JournalConfig(enabled=True, path=str(path / "storage.wal")),
+            ),
+        )
+
+    @pytest.mark.asyncio
+    async def test_unflushed_changes_survive_restart(self, tmp_path):
+        received, handler = _recorder()
+        async with _make_client(handler) as client:
+            storage = self._storage(client, tmp_path)
+            await storage.start()
+            await storage.save_or_update_user(1, _user(1))
+            await storage.save_or_update_user(2, _user(2))
+            await storage.update_user_language(1, "uz")
+            await storage.save_or_update_order("o-1", {"order_id": "o-1", "telegram_id": 1})
+            await storage.delete_user(2)
+            # Процесс «падает» до flush
+            await storage._journal.close()
+
+            restarted = self._storage(client, tmp_path)
+            await restarted.start()
+            assert restarted._dirty_users == {1} and restarted._dirty_orders == {"o-1"}
+            user = await restarted.get_user_by_telegram_id(1)
+            assert user["language_code"] == "uz"
+            await restarted.close()
+        assert sorted(path for path, _ in received) == ["/orders", "/users/register"]
+
+    @pytest.mark.asyncio
+    async def test_successful_flush_truncates_journal(self, tmp_path):
+        received, handler = _recorder()
+        async with _make_client(handler) as client:
+            storage = self._storage(client, tmp_path)
+            await storage.start()
+            await storage.save_or_update_user(1, _user(1))
+            await storage.flush()
+            assert storage.stats()["journal"]["sealed_segments"] == 0
+            await storage.close()
+
+            restarted = self._storage(client, tmp_path)
+            await restarted.start()
+            assert restarted.dirty_count() == 0
+            await restarted.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_journal(self, tmp_path):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(503, json={"detail": "maintenance"})
+
+        async with _make_client(handler) as client:
+            client.config.max_retries = 1
+            storage = self._storage(client, tmp_path)
+            await storage.start()
+            await storage.save_or_update_user(1, _user(1))
+            await storage.flush()
+            assert storage.dirty_count() == 1
+            assert storage.stats()["journal"]["sealed_segments"] == 1
+            await storage._journal.close()
+
+            restarted = self._storage(client, tmp_path)
+            await restarted.start()
+            assert restarted._dirty_users == {1}
+            await restarted._journal.close()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_changes_share_fsync(self, tmp_path):
+        received, handler = _recorder()
+        async with _make_client(handler) as client:
+            storage = self._storage(client, tmp_path)
+            await storage.start()
+            await asyncio.gather(
+                *(storage.save_or_update_user(n, _user(n)) for n in range(1, 51))
+            )
+            stats = storage.stats()["journal"]
+            assert stats["appends"] == 50
+            assert stats["commits"] < 10
+            await storage._journal.close()
+
+    def test_torn_last_line_is_skipped(self, tmp_path):
+        path = tmp_path / "storage.wal"
+        path.write_bytes(
+            b'{"kind": "user", "id": 1, "data": {"telegram_id": 1}}\n{"kind": "user", "id": 2, "da'
+        )
+        journal = Journal(JournalConfig(enabled=True, path=str(path)))
+        entries = journal.open()
+        assert [(e.kind, e.id) for e in entries] == [("user", 1)]
+        journal._file.close()
+
+
+class TestDeltaSync:
+    """Известным серверу пользователям flush отправляет только измененные поля"""
+
+    @staticmethod
+    def _handler(received: list, patch_status: int = 200):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content)
+            received.append((request.method, request.url.path, body))
+            if request.method == "PATCH" and patch_status != 200:
+                return httpx.Response(patch_status, json={"detail": "nope"})
+            return httpx.Response(200, json={"status": "ok", "user_id": 5})
+
+        return handler
+
+    @staticmethod
+    async def _registered(storage: RemoteStorage) -> None:
+        await storage.save_or_update_user(1, {**_user(1), "server_user_id": 5})
+        await storage.flush()
+
+    @pytest.mark.asyncio
+    async def test_changed_fields_are_patched(self):
+        received: list = []
+        async with _make_client(self._handler(received)) as client:
+            storage = _storage(client, enabled=False)
+            await self._registered(storage)
+            await storage.save_or_update_user(1, {"latitude": 41.31, "longitude": 69.24})
+            await storage.flush()
+            assert storage.stats()["flush"]["deltas"] == 1
+        assert [(method, path) for method, path, _ in received] == [
+            ("POST", "/users/register"),
+            ("PATCH", "/users/5"),
+        ]
+        assert received[1][2] == {"latitude": 41.31, "longitude": 69.24}
+
+    @pytest.mark.asyncio
+    async def test_user_loaded_from_server_is_patched_by_id(self):
+        received: list = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.method == "GET":
+                # У загруженных с сервера пользователей id на сервере — в "id"
+                return httpx.Response(200, json={**_user(1), "id": 5, "language_code": "ru"})
+            received.append((request.method, request.url.path, json.loads(request.content)))
+            return httpx.Response(200, json={"status": "ok", "user_id": 5})
+
+        async with _make_client(handler) as client:
+            storage = _storage(client, enabled=False)
+            await storage.get_user_by_telegram_id(1)
+            await storage.update_user_language(1, "uz")
+            await storage.save_or_update_user(1, {"latitude": 41.31})
+            await storage.flush()
+        assert received == [
+            ("PATCH", "/users/5/language", {"language_code": "uz"}),
+            ("PATCH", "/users/5", {"latitude": 41.31}),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_unchanged_save_is_not_synced(self):
+        received: list = []
+        async with _make_client(self._handler(received)) as client:
+            storage = _storage(client, enabled=False)
+            await self._registered(storage)
+            await storage.save_or_update_user(1, _user(1))
+            assert storage.dirty_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_language_synced_immediately_is_not_flushed_again(self):
+        received: list = []
+        async with _make_client(self._handler(received)) as client:
+            storage = _storage(client, enabled=False)
+            await self._registered(storage)
+            await storage.update_user_language(1, "uz")
+            assert storage.dirty_count() == 0
+            await storage.flush()
+        assert [path for _, path, _ in received] == ["/users/register", "/users/5/language"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_user_on_server_is_registered_in_full(self):
+        received: list = []
+        async with _make_client(self._handler(received, patch_status=404)) as client:
+            storage = _storage(client, enabled=False)
+            await self._registered(storage)
+            await storage.save_or_update_user(1, {"latitude": 41.31})
+            await storage.flush()
+            assert storage.dirty_count() == 0
+        assert [(method, path) for method, path, _ in received][1:] == [
+            ("PATCH", "/users/5"),
+            ("POST", "/users/register"),
+        ]
+        assert received[-1][2]["phone_number"] == _user(1)["phone_number"]
+
+    @pytest.mark.asyncio
+    async def test_failed_delta_keeps_changed_fields(self):
+        received: list = []
+        async with _make_client(self._handler(received, patch_status=500)) as client:
+            client.config.max_retries = 1
+            storage = _storage(client, enabled=False)
+            await self._registered(storage)
+            await storage.save_or_update_user(1, {"latitude": 41.31})
+            await storage.flush()
+            await storage.save_or_update_user(1, {"longitude": 69.24})
+            await storage.flush()
+        assert received[-1][:2] == ("PATCH", "/users/5")
+        assert received[-1][2] == {"latitude": 41.31, "longitude": 69.24}
+
+
+class TestUserCacheEviction:
+    """Кеш пользователей ограничен по размеру и простою, dirty не вытесняются"""
+
+    @staticmethod
+    def _storage(client: RemoteApiClient, **user_cache) -> RemoteStorage:
+        return RemoteStorage(
+            client,
+            RemoteStorageConfig(
+                write_behind=WriteBehindConfig(enabled=False),
+                bulk=BulkSyncConfig(enabled=False),
+                user_cache=UserCacheConfig(**user_cache),
+            ),
+        )
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_clean_users_are_evicted(self):
+        received, handler = _recorder()
+        async with _make_client(handler) as client:
+            storage = self._storage(client, max_users=3, idle_ttl=0)
+            for telegram_id in range(1, 4):
+                await storage.save_or_update_user(telegram_id, _user(telegram_id))
+            await storage.flush()
+            await storage.get_user_by_telegram_id(1)  # 1 снова недавний
+            await storage.save_or_update_user(4, _user(4))
+            assert sorted(storage._cache.users) == [1, 3, 4]
+            stats = storage.stats()["user_cache"]
+            assert (stats["entries"], stats["evictions"], stats["hits"]) == (3, 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_dirty_users_are_not_evicted(self):
+        received, handler = _recorder()
+        async with _make_client(handler) as client:
+            storage = self._storage(client, max_users=2, idle_ttl=0)
+            for telegram_id in range(1, 5):
+                await storage.save_or_update_user(telegram_id, _user(telegram_id))
+            assert sorted(storage._cache.users) == [1, 2, 3, 4]
+            await storage.flush()
+            assert len(received) == 4
+            assert len(storage._cache.users) == 2
+
+    @pytest.mark.asyncio
+    async def test_idle_users_expire(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.method == "GET":
+                return httpx.Response(404, json={"detail": "User not found"})
+            return httpx.Response(200, json={"status": "ok"})
+
+        async with _make_client(handler) as client:
+            storage = self._storage(client, max_users=0, idle_ttl=60)
+            clock = [0.0]
+            storage._user_index._clock = lambda: clock[0]
+            await storage.save_or_update_user(1, _user(1))
+            await storage.flush()
+            clock[0] = 61.0
+            await storage.save_or_update_user(2, _user(2))
+            assert sorted(storage._cache.users) == [2]
+            assert await storage.get_user_by_telegram_id(1) is None
+            stats = storage.stats()["user_cache"]
+            assert (stats["expirations"], stats["misses"]) == (1, 1)
+
+
+class TestNegativeCache:
+    """404 по telegram_id запоминается на negative_ttl"""
+
+    @staticmethod
+    def _counting(status: int):
+        calls: list = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.path)
+            if request.method == "GET":
+                return httpx.Response(status, json={"detail": "User not found"})
+            return httpx.Response(200, json={"status": "ok"})
+
+        return calls, handler
+
+    @pytest.mark.asyncio
+    async def test_unknown_user_is_looked_up_once(self):
+        calls, handler = self._counting(404)
+        async with _make_client(handler) as client:
+            storage = _storage(client, enabled=False)
+            for _ in range(5):
+                assert await storage.get_user_by_telegram_id(42) is None
+                assert await storage.get_user_language(42) is None
+            assert calls == ["/users/by-telegram/42"]
+            assert storage.stats()["not_found_cache"]["hits"] == 9
+
+    @pytest.mark.asyncio
+    async def test_saving_user_invalidates_entry(self):
+        calls, handler = self._counting(404)
+        async with _make_client(handler) as client:
+            storage = _storage(client, enabled=False)
+            assert await storage.get_user_by_telegram_id(42) is None
+            await storage.save_or_update_user(42, _user(42))
+            await storage.delete_user(42)
+            assert await storage.get_user_by_telegram_id(42) is None
+            assert calls == ["/users/by-telegram/42", "/users/by-telegram/42"]
+
+    @pytest.mark.asyncio
+    async def test_entry_expires_and_errors_are_not_cached(self):
+        calls, handler = self._counting(500)
+        async with _make_client(handler) as client:
+            client.config.max_retries = 1
+            storage = _storage(client, enabled=False)
+            await storage.get_user_by_telegram_id(42)
+            await storage.get_user_by_telegram_id(42)
+            assert len(calls) == 2
+
+        calls, handler = self._counting(404)
+        async with _make_client(handler) as client:
+            storage = _storage(client, enabled=False)
+            clock = [0.0]
+            storage._not_found._clock = lambda: clock[0]
+            await storage.get_user_by_telegram_id(42)
+            clock[0] = 31.0
+            await storage.get_user_by_telegram_id(42)
+            assert len(calls) == 2
+
+
+class TestUserLoadSingleFlight:
+    """Одновременные промахи по одному telegram_id — одна загрузка"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_load(self):
+        calls: list = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.path)
+            await asyncio.sleep(0.02)
+            telegram_id = int(request.url.path.rsplit("/", 1)[1])
+            return httpx.Response(
+                200, json={"id": 100 + telegram_id, "telegram_id": telegram_id, "language_code": "uz"}
+            )
+
+        async with _make_client(handler) as client:
+            client.config.single_flight = False  # дедупликация именно в RemoteStorage
+            storage = _storage(client, enabled=False)
+            results = await asyncio.gather(
+                *(storage.get_user_by_telegram_id(7) for _ in range(5)),
+                *(storage.get_user_language(7) for _ in range(5)),
+                storage.get_user_by_telegram_id(8),
+            )
+            assert [r["id"] for r in results[:5]] == [107] * 5
+            assert results[5:10] == ["uz"] * 5
+            assert sorted(calls) == ["/users/by-telegram/7", "/users/by-telegram/8"]
+            assert storage.stats()["user_loads"]["hits"] == 9
+
+    @pytest.mark.asyncio
+    async def test_local_save_during_load_wins(self):
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await release.wait()
+            return httpx.Response(200, json={"id": 107, "telegram_id": 7, "language_code": "ru"})
+
+        async with _make_client(handler) as client:
+            storage = _storage(client, enabled=False)
+            load = asyncio.ensure_future(storage.get_user_by_telegram_id(7))
+            await asyncio.sleep(0.01)
+            await storage.save_or_update_user(7, {**_user(7), "language_code": "uz"})
+            release.set()
+            user = await load
+            assert user["language_code"] == "uz"
+            assert await storage.get_user_language(7) == "uz"
+
+
+class TestCacheWarmup:
+    """Прогрев кеша активными пользователями при старте"""
+
+    @staticmethod
+    def _warm_storage(client: RemoteApiClient, **warmup) -> RemoteStorage:
+        return RemoteStorage(
+            client,
+            RemoteStorageConfig(
+                write_behind=WriteBehindConfig(enabled=False),
+                bulk=BulkSyncConfig(enabled=False),
+                warmup=WarmupConfig(enabled=True, page_size=10, **warmup),
+            ),
+        )
+
+    @pytest.mark.asyncio
+    async def test_loads_all_pages_before_start_returns(self):
+        state = StandInState.seeded(users=25)
+        server = await _start_server(build_app(state))
+        try:
+            async with RemoteApiClient(_standin_config(server)) as client:
+                storage = self._warm_storage(client, ready_percent=100.0)
+                await storage.start()
+                warmup = storage.stats()["warmup"]
+                assert (warmup["loaded"], warmup["total"], warmup["pages"]) == (25, 25, 3)
+                for telegram_id in state.users:
+                    user = await storage.get_user_by_telegram_id(telegram_id)
+                    assert user["id"] == state.users[telegram_id]["id"]
+                await storage.close()
+        finally:
+            await server.close()
+        assert state.requests[("GET", "/users/active")] == 3
+        assert state.requests[("GET", "/users/by-telegram/{telegram_id}")] == 0
+
+    @pytest.mark.asyncio
+    async def test_stops_at_cache_capacity_and_keeps_local_changes(self):
+        state = StandInState.seeded(users=25)
+        server = await _start_server(build_app(state))
+        first = next(iter(state.users))
+        try:
+            async with RemoteApiClient(_standin_config(server)) as client:
+                storage = self._warm_storage(client, max_users=12, ready_percent=100.0)
+                await storage.save_or_update_user(first, {**_user(first), "language_code": "uz"})
+                await storage.start()
+                assert storage.stats()["warmup"]["loaded"] == 12
+                assert await storage.get_user_language(first) == "uz"
+                await storage.close()
+        finally:
+            await server.close()
+        assert state.requests[("GET", "/users/active")] == 2
+
+    @pytest.mark.asyncio
+    async def test_missing_endpoint_is_skipped(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(404, json={"detail": "Not Found"})
+
+        async with _make_client(handler) as client:
+            storage = self._warm_storage(client, ready_percent=50.0)
+            await storage.start()
+            warmup = storage.stats()["warmup"]
+            assert warmup["done"] and warmup["failed"]
+            assert warmup["loaded"] == 0
+            await storage.close()
+
+    @pytest.mark.asyncio
+    async def test_malformed_lines_are_skipped(self):
+        page = (
+            b'{"total": 2}\n'
+            b'{"id": 107, "telegram_id": 7, "language_code": "uz"}\n'
+            b'{"id": 108, "telegram_id": \n'
+            b'[1, 2]\n'
+            b'{"total": "many"}\n'
+            b'{"id": 109, "telegram_id": 9, "language_code": "ru"}\n'
+            b'{"next_cursor": null}\n'
+        )
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(
+                200, content=page, headers={"Content-Type": "application/x-ndjson"}
+            )
+
+        async with _make_client(handler) as client:
+            storage = self._warm_storage(client, ready_percent=100.0, ready_timeout=5.0)
+            await storage.start()
+            warmup = storage.stats()["warmup"]
+            assert (warmup["loaded"], warmup["skipped_lines"]) == (2, 3)
+            assert warmup["done"] and not warmup["failed"]
+            assert await storage.get_user_language(9) == "ru"
+            await storage.close()
+
+    @pytest.mark.asyncio
+    async def test_unexpected_error_marks_warmup_failed(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            raise RuntimeError("boom")
+
+        async with _make_client(handler) as client:
+            storage = self._warm_storage(client, ready_percent=100.0, ready_timeout=5.0)
+            started = asyncio.get_running_loop().time()
+            await storage.start()
+            # Готовность не ждет весь ready_timeout
+            assert asyncio.get_running_loop().time() - started < 1.0
+            warmup = storage.stats()["warmup"]
+            assert warmup["done"] and warmup["failed"]
+            await storage.close()
@@ -0,0 +1,238 @@
+"""
+Тесты инвалидации кеша RemoteStorage: события от NMservices через HTTP-эндпоинт.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from nomus.config.settings import InvalidationConfig
+from nomus.infrastructure.database.bulk_sync import BulkSyncConfig
+from nomus.infrastructure.database.remote_storage import RemoteStorage, RemoteStorageConfig
+from nomus.infrastructure.database.write_behind import WriteBehindConfig
+from nomus.infrastructure.services.remote_api_client import RemoteApiClient, RemoteApiConfig
+from nomus.infrastructure.services.response_cache import CacheRule, ResponseCacheConfig
+from nomus.presentation.api.invalidation import InvalidationServer, build_invalidation_app
+
+
+class FakeServer:
+    """NMservices, в котором язык пользователя меняет админ."""
+
+    def __init__(self):
+        self.language = "ru"
+        self.requests = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if request.method == "POST":
+            return httpx.Response(200, json={"status": "ok", "user_id": 107})
+        language = self.language
+        await self.release.wait()
+        telegram_id = int(request.url.path.rsplit("/", 1)[1])
+        return httpx.Response(
+            200,
+            json={"id": 100 + telegram_id, "telegram_id": telegram_id, "language_code": language},
+        )
+
+
+def _client(server: FakeServer, http_cache: bool = False) -> RemoteApiClient:
+    config = RemoteApiConfig(base_url="http://nmservices.test", api_key="test", max_retries=1)
+    if http_cache:
+        # Как в production: ответы /users/by-telegram/* кешируются на 30 секунд
+        config.cache = ResponseCacheConfig(
+            enabled=True, rules=[CacheRule("/users/by-telegram/*", ttl=30)]
+        )
+    client = RemoteApiClient(config, transport=httpx.MockTransport(server.handler))
+    client.config.single_flight = False
+    return client
+
+
+def _storage(client: RemoteApiClient) -> RemoteStorage:
+    return RemoteStorage(
+        client,
+        RemoteStorageConfig(
+            write_behind=WriteBehindConfig(enabled=False), bulk=BulkSyncConfig(enabled=False)
+        ),
+    )
+
+
+async def _ingress(storage: RemoteStorage, **config) -> TestClient:
+    app = build_invalidation_app(storage, InvalidationConfig(enabled=True, **config))
+    client = TestClient(TestServer(app, host="127.0.0.1"))
+    await client.start_server()
+    return client
+
+
+class TestInvalidateUser:
+    @pytest.mark.asyncio
+    async def test_evicts_by_telegram_id_and_user_id(self):
+        server = FakeServer()
+        async with _client(server) as client:
+            storage = _storage(client)
+            assert await storage.get_user_language(7) == "ru"
+            server.language = "uz"
+            assert await storage.invalidate_user(telegram_id=7) == "evicted"
+            assert await storage.get_user_language(7) == "uz"
+
+            server.language = "en"
+            assert await storage.invalidate_user(user_id=107) == "evicted"
+            assert await storage.get_user_language(7) == "en"
+            assert await storage.invalidate_user(user_id=999) == "not_cached"
+            assert server.requests == 3
+
+    @pytest.mark.asyncio
+    async def test_user_id_matches_users_registered_in_bot(self):
+        server = FakeServer()
+        async with _client(server) as client:
+            storage = _storage(client)
+            # Как после registration.process_phone: id — это telegram_id,
+            # id на сервере — в server_user_id
+            await storage.save_or_update_user(
+                7, {"id": 7, "telegram_id": 7, "server_user_id": 107, "language_code": "ru"}
+            )
+            await storage.save_or_update_user(
+                107, {"id": 107, "telegram_id": 107, "server_user_id": 555, "language_code": "ru"}
+            )
+            await storage.flush()
+            server.language = "uz"
+            assert await storage.invalidate_user(user_id=107) == "evicted"
+            assert await storage.get_user_language(7) == "uz"
+            # Пользователь, чей telegram_id совпал с id на сервере, не тронут
+            assert (await storage.get_user_by_telegram_id(107))["server_user_id"] == 555
+
+    @pytest.mark.asyncio
+    async def test_out_of_order_versions_are_ignored(self):
+        server = FakeServer()
+        async with _client(server) as client:
+            storage = _storage(client)
+            await storage.get_user_by_telegram_id(7)
+            assert await storage.invalidate_user(telegram_id=7, version=5, refresh=True) == "refreshed"
+            # Событие версии 4 пришло позже версии 5 — уже учтено
+            assert await storage.invalidate_user(telegram_id=7, version=4) == "stale"
+            assert await storage.invalidate_user(telegram_id=7, version=5) == "stale"
+            assert await storage.invalidate_user(telegram_id=7, version=6) == "evicted"
+            stats = storage.stats()["invalidation"]
+            assert (stats["refreshed"], stats["stale"], stats["evicted"]) == (1, 2, 1)
+
+    @pytest.mark.asyncio
+    async def test_unsynced_user_is_evicted_after_flush(self):
+        server = FakeServer()
+        async with _client(server) as client:
+            storage = _storage(client)
+            await storage.save_or_update_user(7, {"telegram_id": 7, "phone_number": "+998900000007"})
+            assert await storage.invalidate_user(telegram_id=7) == "deferred"
+            # Локальные изменения не потеряны, пока не отправлены
+            assert (await storage.get_user_by_telegram_id(7))["phone_number"] == "+998900000007"
+            await storage.flush()
+            assert await storage.get_user_language(7) == "ru"
+            assert server.requests == 2  # регистрация + загрузка серверной версии
+
+    @pytest.mark.asyncio
+    async def test_load_in_flight_during_invalidation_is_not_cached(self):
+        server = FakeServer()
+        async with _client(server) as client:
+            storage = _storage(client)
+            server.release.clear()
+            load = asyncio.ensure_future(storage.get_user_by_telegram_id(7))
+            await asyncio.sleep(0.01)
+            server.language = "uz"
+            assert await storage.invalidate_user(telegram_id=7) == "not_cached"
+            server.release.set()
+            assert (await load)["language_code"] == "ru"
+            assert await storage.get_user_language(7) == "uz"
+
+    @pytest.mark.asyncio
+    async def test_reload_bypasses_http_response_cache(self):
+        server = FakeServer()
+        async with _client(server, http_cache=True) as client:
+            storage = _storage(client)
+            assert await storage.get_user_language(7) == "ru"
+            server.language = "uz"
+            assert await storage.invalidate_user(telegram_id=7, version=2, refresh=True) == "refreshed"
+            assert await storage.get_user_language(7) == "uz"
+            server.language = "en"
+            assert await storage.invalidate_user(telegram_id=7, version=3) == "evicted"
+            assert await storage.get_user_language(7) == "en"
+            assert server.requests == 3
+
+    @pytest.mark.asyncio
+    async def test_response_in_flight_during_invalidation_is_not_cached_by_client(self):
+        server = FakeServer()
+        async with _client(server, http_cache=True) as client:
+            storage = _storage(client)
+            server.release.clear()
+            load = asyncio.ensure_future(storage.get_user_by_telegram_id(7))
+            await asyncio.sleep(0.01)
+            server.language = "uz"
+            assert await storage.invalidate_user(telegram_id=7) == "not_cached"
+            server.release.set()
+            assert (await load)["language_code"] == "ru"
+            assert await storage.get_user_language(7) == "uz"
+            assert client.stats()["cache"]["entries"] == 1
+
+
+class TestInvalidationEndpoint:
+    @pytest.mark.asyncio
+    async def test_applies_batch_of_events(self):
+        server = FakeServer()
+        async with _client(server) as client:
+            storage = _storage(client)
+            await storage.get_user_by_telegram_id(7)
+            await storage.get_user_by_telegram_id(8)
+            ingress = await _ingress(storage, token="secret")
+            try:
+                events = {
+                    "events": [
+                        {"telegram_id": 7, "version": 2},
+                        {"telegram_id": 7, "version": 1},
+                        {"user_id": 108, "action": "refresh"},
+                    ]
+                }
+                response = await ingress.post(
+                    "/invalidate", json=events, headers={"X-Invalidation-Token": "secret"}
+                )
+                assert response.status == 200
+                assert (await response.json())["results"] == ["evicted", "stale", "refreshed"]
+            finally:
+                await ingress.close()
+
+    @pytest.mark.asyncio
+    async def test_rejects_bad_token_and_malformed_events(self):
+        async with _client(FakeServer()) as client:
+            ingress = await _ingress(_storage(client), token="secret")
+            try:
+                response = await ingress.post("/invalidate", json={"telegram_id": 7})
+                assert response.status == 403
+                headers = {"X-Invalidation-Token": "secret"}
+                for body in ({"version": 3}, {"telegram_id": "7"}, {"telegram_id": 7, "action": "x"}):
+                    response = await ingress.post("/invalidate", json=body, headers=headers)
+                    assert response.status == 422, body
+                response = await ingress.post("/invalidate", data=b"{", headers=headers)
+                assert response.status == 422
+            finally:
+                await ingress.close()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("token", ["", "${INVALIDATION_TOKEN}"])
+    async def test_missing_token_disables_endpoint(self, token):
+        async with _client(FakeServer()) as client:
+            storage = _storage(client)
+            server = InvalidationServer(
+                storage, InvalidationConfig(enabled=True, port=0, token=token)
+            )
+            assert await server.start() is False
+            await server.stop()
+
+            # Даже если приложение запущено в обход InvalidationServer
+            ingress = await _ingress(storage, token=token)
+            try:
+                response = await ingress.post(
+                    "/invalidate", json={"telegram_id": 7}, headers={"X-Invalidation-Token": token}
+                )
+                assert response.status == 403
+            finally:
+                await ingress.close()